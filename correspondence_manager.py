@@ -1,9 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import pandas as pd
-import re
 from typing import Callable, Optional
 
+from radiator_filter import contains_any, keyword_pattern
+
+# Таблица соответствия: явные не-радиаторы и ключевые слова радиаторов (по наименованию в нижнем регистре)
+_EXCLUSION_PATTERN = keyword_pattern([
+    'арматура', 'фитинг', 'муфта', 'переходник', 
+    "Ридан", 'PE-Xa', 'сшитого полиэтилена', "RLV",
+    'полотенцесушитель', 'работы', 
+    'гидравлическое', 'пусконаладочные', 'электрический'
+])
+_RADIATOR_PATTERN = keyword_pattern([
+    'радиатор', 'radiator', 'vc', 'vk', 'cv', 'oc', 'ov',
+    'k-profil', 'classic', 'prado', 'compact', 'ventil',
+    'тип', 'type', 'evra', 'purmo', 'royal', 'thermo', 'oasis'
+])
+
 class CorrespondenceManager:
     """
     Менеджер таблицы соответствия для подбора аналогов METEOR
@@ -58,44 +72,28 @@ class CorrespondenceManager:
             (correspondence_df["Источник"] == "Ожидает ручного подбора")
         ]
         
-        def is_radiator_row(row):
-            try:
-                name = str(row["Наименование"]).lower()
-                
-                # ЯВНО ИСКЛЮЧАЕМ не-радиаторы
-                exclusion_keywords = [
-                    'арматура', 'фитинг', 'муфта', 'переходник', 
-                    "Ридан", 'PE-Xa', 'сшитого полиэтилена', "RLV",
-                    'полотенцесушитель', 'работы', 
-                    'гидравлическое', 'пусконаладочные', 'электрический'
-                ]
-                
-                if any(keyword in name for keyword in exclusion_keywords):
-                    return False
-                
-                # Ключевые слова радиаторов
-                radiator_keywords = [
-                    'радиатор', 'radiator', 'vc', 'vk', 'cv', 'oc', 'ov',
-                    'k-profil', 'classic', 'prado', 'compact', 'ventil',
-                    'тип', 'type', 'evra', 'purmo', 'royal', 'thermo', 'oasis'
-                ]
-                
-                # Проверяем форматы названий
-                has_radiator_format = (
-                    bool(re.search(r'(cv|vc|oc|ov)\s*\d+\s*\d+x\d+', name)) or
-                    bool(re.search(r'\d+[\-\s\/x]+\d+[\-\s\/x]+\d+', name)) or
-                    ('тип' in name and any(char.isdigit() for char in name))
-                )
-                
-                has_radiator_keyword = any(keyword in name for keyword in radiator_keywords)
-                
-                return has_radiator_keyword or has_radiator_format
-            except Exception as e:
-                print(f"[ERROR] Ошибка в фильтрации строки: {e}")
-                return False
+        if "Наименование" not in filtered_df.columns:
+            print("[ERROR] Ошибка в фильтрации строк: нет столбца 'Наименование'")
+            return filtered_df.iloc[0:0]
+        
+        # Маски по всему столбцу сразу (radiator_filter): одно выражение на каждый список слов
+        name = filtered_df["Наименование"].astype(object).where(
+            filtered_df["Наименование"].notna(), 'nan').astype(str).str.lower()
+        
+        # ЯВНО ИСКЛЮЧАЕМ не-радиаторы
+        excluded = contains_any(name, _EXCLUSION_PATTERN)
+        
+        # Проверяем форматы названий
+        has_radiator_format = (
+            name.str.contains(r'(?:cv|vc|oc|ov)\s*\d+\s*\d+x\d+', regex=True) |
+            name.str.contains(r'\d+[\-\s\/x]+\d+[\-\s\/x]+\d+', regex=True) |
+            (name.str.contains('тип', regex=False) & name.str.contains(r'\d', regex=True))
+        )
+        
+        has_radiator_keyword = contains_any(name, _RADIATOR_PATTERN)
         
         # Применяем фильтр
-        final_df = filtered_df[filtered_df.apply(is_radiator_row, axis=1)]
+        final_df = filtered_df[~excluded & (has_radiator_keyword | has_radiator_format)]
         
         print(f"[INFO] В таблицу соответствия включено {len(final_df)} радиаторов (отфильтровано {len(correspondence_df) - len(final_df)} не-радиаторов)")
         return final_df
@@ -248,6 +246,10 @@ class CorrespondenceManager:
         style.configure("Correspondence.Treeview.Heading", font=("Segoe UI", 9, "bold"))
         
         columns = ("Наименование", "Кол-во", "Наименование METEOR", "Артикул METEOR", "Источник")
+        # Спецификация собрана с нескольких листов книги - показываем лист каждой строки
+        has_sheet = "Лист" in final_df.columns
+        if has_sheet:
+            columns += ("Лист",)
         self._correspondence_tree = ttk.Treeview(
             table_container, 
             columns=columns, 
@@ -263,7 +265,8 @@ class CorrespondenceManager:
             "Кол-во": {"width": 100, "anchor": "center"},
             "Наименование METEOR": {"width": 400, "anchor": "w"},
             "Артикул METEOR": {"width": 150, "anchor": "center"},
-            "Источник": {"width": 250, "anchor": "w"}
+            "Источник": {"width": 250, "anchor": "w"},
+            "Лист": {"width": 150, "anchor": "w"}
         }
         
         for col in columns:
@@ -283,6 +286,8 @@ class CorrespondenceManager:
                 meteor_art,
                 source
             )
+            if has_sheet:
+                values += (row["Лист"],)
             
             item_id = self._correspondence_tree.insert("", "end", values=values)
             
@@ -407,6 +412,8 @@ class CorrespondenceManager:
                 'Артикул METEOR': meteor_art,
                 'Источник подбора': source
             })
+            if len(values) > 5:
+                correspondence_data[-1]['Лист'] = values[5]
             
             if not meteor_art or not str(meteor_art).strip() or qty <= 0:
                 continue
@@ -624,6 +631,8 @@ class CorrespondenceManager:
                     'Артикул METEOR': meteor_art,
                     'Источник подбора': source
                 })
+                if len(values) > 5:
+                    correspondence_data[-1]['Лист'] = values[5]
             if correspondence_data:
                 self._saved_correspondence_data = pd.DataFrame(correspondence_data)
 
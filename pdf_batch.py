@@ -0,0 +1,358 @@
+# pdf_batch.py
+import os
+import sys
+import json
+import time
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from pdf_parser import PDFParser, CancellationToken, PARSER_VERSION
+
+MANIFEST_NAME = "radiatool_batch_manifest.jsonl"
+REPORT_NAME = "radiatool_batch_report.xlsx"
+
+# Статусы файла в манифесте: готовые при возобновлении не обрабатываются повторно
+DONE_STATUSES = ("success", "empty")
+
+
+def find_pdf_files(root: str, recursive: bool = True) -> List[str]:
+    """PDF-файлы каталога (с подкаталогами при recursive) в стабильном порядке"""
+    pdf_files = []
+    if recursive:
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names.sort()
+            pdf_files.extend(os.path.join(dir_path, name) for name in sorted(file_names)
+                             if name.lower().endswith(".pdf"))
+    else:
+        pdf_files = [os.path.join(root, name) for name in sorted(os.listdir(root))
+                     if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(root, name))]
+    return pdf_files
+
+
+def _file_fingerprint(file_path: str) -> Dict[str, int]:
+    """Размер и время изменения файла - по ним запись манифеста считается актуальной"""
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class BatchManifest:
+    """
+    Манифест пакетной обработки (JSON Lines): по строке на каждый обработанный файл.
+    Строка дописывается сразу после файла - запись манифеста не зависит от размера архива,
+    а прерванный запуск продолжается с места остановки. При чтении последняя строка файла
+    перекрывает предыдущие; оборванная при сбое строка пропускается.
+    Запись устаревает, если файл изменился или сменилась версия парсера
+    """
+
+    def __init__(self, path: Optional[str]):
+        """:param path: Путь к файлу манифеста (None = только в памяти, на диск ничего не пишется)"""
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        self.files[entry['key']] = entry['record']
+                    except (ValueError, KeyError, TypeError):
+                        print(f"[BATCH] ⚠️ Пропущена повреждённая строка манифеста {self.path}")
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"[BATCH] ⚠️ Не удалось прочитать манифест {self.path}, начинаем заново: {e}")
+            self.files = {}
+            return
+        # Перекрытые и повреждённые строки убираются один раз при загрузке
+        if lines > len(self.files):
+            self.rewrite()
+
+    def rewrite(self):
+        """Атомарная перезапись текущими записями: сначала во временный файл, затем замена"""
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, record in self.files.items():
+                    f.write(self._line(key, record))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[BATCH] ❌ Не удалось записать манифест {self.path}: {e}")
+
+    def clear(self):
+        """Начать манифест заново (обработка без возобновления)"""
+        self.files = {}
+        if self.path is not None and os.path.exists(self.path):
+            self.rewrite()
+
+    @staticmethod
+    def _line(key: str, record: Dict[str, Any]) -> str:
+        return json.dumps({'key': key, 'record': record}, ensure_ascii=False) + "\n"
+
+    def is_done(self, key: str, file_path: str) -> bool:
+        record = self.files.get(key)
+        if not record or record.get('status') not in DONE_STATUSES:
+            return False
+        if record.get('parser_version') != PARSER_VERSION:
+            return False
+        try:
+            fingerprint = _file_fingerprint(file_path)
+        except OSError:
+            return False
+        return record.get('size') == fingerprint['size'] and record.get('mtime_ns') == fingerprint['mtime_ns']
+
+    def put(self, key: str, record: Dict[str, Any]):
+        """Запись результата файла: одна строка в конец манифеста"""
+        self.files[key] = record
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(self._line(key, record))
+        except OSError as e:
+            print(f"[BATCH] ❌ Не удалось записать манифест {self.path}: {e}")
+
+
+def parse_file_for_batch(file_path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Обработка одного PDF (в рабочем процессе или в текущем).
+    Возвращает JSON-совместимую запись для манифеста и отчёта
+    :param options: Настройки PDFParser (use_cache, cache_dir, page_time_budget, bounded_memory,
+                    memory_ceiling_mb, debug_mode, use_ocr, use_triage, use_table_region)
+                    и quiet - подавлять вывод парсера
+    """
+    record: Dict[str, Any] = {'parser_version': PARSER_VERSION}
+    started = time.monotonic()
+    try:
+        record.update(_file_fingerprint(file_path))
+        with contextlib.ExitStack() as stack:
+            if options.get('quiet'):
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            parser = PDFParser(use_cache=options.get('use_cache', True), cache_dir=options.get('cache_dir'),
+                               page_time_budget=options.get('page_time_budget'),
+                               bounded_memory=options.get('bounded_memory', False),
+                               memory_ceiling_mb=options.get('memory_ceiling_mb'),
+                               debug_mode=options.get('debug_mode', False),
+                               use_ocr=options.get('use_ocr', True))
+            parser.use_triage = options.get('use_triage', True)
+            parser.use_table_region = options.get('use_table_region', True)
+            pages_skipped = 0
+            final = None
+            for event in parser.iter_parse(file_path, extract_radiators=False):
+                if event['page'] is None:
+                    final = event
+                elif event['tables'] is None:
+                    pages_skipped += 1
+            result_df = final['result']
+            radiators = parser.extract_radiators_from_dataframe(result_df) if not result_df.empty else []
+        record.update({
+            'status': 'success' if not result_df.empty else 'empty',
+            'pages_total': final['total'],
+            'pages_skipped': pages_skipped,
+            'pages_over_budget': [int(page) for page in final.get('pages_over_budget', [])],
+            'rows': int(result_df.shape[0]),
+            'columns': int(result_df.shape[1]),
+            'radiator_rows': len(radiators),
+            'radiators': [{'name': item['name'], 'quantity': int(item['quantity']),
+                           'source_page': str(item['source_page']), 'original_row': item['original_row']}
+                          for item in radiators],
+            'peak_rss_mb': final.get('peak_rss_mb'),
+        })
+    except Exception as e:
+        # Сообщение парсера может содержать трассировку - в отчёт идут первая и последняя строки
+        lines = [line for line in str(e).splitlines() if line.strip()] or [""]
+        message = lines[0] if len(lines) == 1 else f"{lines[0]} ... {lines[-1]}"
+        record.update({'status': 'error', 'error': f"{type(e).__name__}: {message}",
+                       'traceback': traceback.format_exc(limit=5)})
+    record['seconds'] = round(time.monotonic() - started, 2)
+    record['finished'] = datetime.now().isoformat(timespec='seconds')
+    return record
+
+
+def write_batch_report(report_path: str, root: str, files: Dict[str, Dict[str, Any]]):
+    """Сводная книга Excel: лист 'Сводка' (по файлам) и лист 'Радиаторы' (найденные позиции)"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Сводка"
+    headers = ["Файл", "Статус", "Время, с", "Страниц", "Пропущено страниц", "Сверх лимита времени",
+               "Строк таблиц", "Позиций радиаторов", "Пик памяти, МБ", "Обработан", "Ошибка"]
+    ws.append(headers)
+    for key in sorted(files):
+        record = files[key]
+        ws.append([
+            key, record.get('status'), record.get('seconds'), record.get('pages_total'),
+            record.get('pages_skipped'), ", ".join(str(page) for page in record.get('pages_over_budget', [])),
+            record.get('rows'), record.get('radiator_rows'),
+            round(record['peak_rss_mb']) if record.get('peak_rss_mb') else None,
+            record.get('finished'), record.get('error'),
+        ])
+    totals_row = ws.max_row + 2
+    ws.cell(row=totals_row, column=1, value=f"Итого файлов: {len(files)} ({root})").font = Font(bold=True)
+    for status in ("success", "empty", "error"):
+        totals_row += 1
+        ws.cell(row=totals_row, column=1, value=status)
+        ws.cell(row=totals_row, column=2, value=sum(1 for r in files.values() if r.get('status') == status))
+    ws.cell(row=totals_row + 1, column=1, value="Время, с")
+    ws.cell(row=totals_row + 1, column=2, value=round(sum(r.get('seconds') or 0 for r in files.values()), 1))
+
+    ws_rad = wb.create_sheet("Радиаторы")
+    ws_rad.append(["Файл", "Страница", "Радиатор", "Количество", "Исходная строка"])
+    for key in sorted(files):
+        for item in files[key].get('radiators', []):
+            ws_rad.append([key, item['source_page'], item['name'], item['quantity'], item['original_row']])
+
+    for sheet, widths in ((ws, [60, 10, 10, 9, 12, 14, 12, 12, 12, 20, 60]), (ws_rad, [60, 10, 30, 12, 80])):
+        for col_idx, width in enumerate(widths, 1):
+            sheet.column_dimensions[get_column_letter(col_idx)].width = width
+        for cell in sheet[1]:
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        sheet.freeze_panes = "A2"
+    wb.save(report_path)
+
+
+def batch_process(root: str,
+                  workers: Optional[int] = None,
+                  max_in_flight: Optional[int] = None,
+                  recursive: bool = True,
+                  resume: bool = True,
+                  manifest_path: Optional[str] = None,
+                  report_path: Optional[str] = None,
+                  parser_options: Optional[Dict[str, Any]] = None,
+                  cancel_token: Optional[CancellationToken] = None,
+                  save_manifest: bool = True,
+                  save_report: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Пакетная обработка дерева каталогов с PDF в пуле процессов.
+    В работе одновременно не больше max_in_flight файлов; результат каждого файла сразу
+    записывается в манифест, при повторном запуске готовые файлы пропускаются.
+    В конце строится сводная книга Excel по всем файлам манифеста.
+
+    :param root: Каталог с PDF
+    :param workers: Число рабочих процессов (None = число ядер, 1 = в текущем процессе)
+    :param max_in_flight: Максимум файлов в работе одновременно (None = 2 * workers)
+    :param recursive: Обходить подкаталоги
+    :param resume: Пропускать файлы, уже обработанные по манифесту (иначе манифест начинается заново)
+    :param manifest_path: Путь к манифесту (None = <root>/radiatool_batch_manifest.jsonl)
+    :param report_path: Путь к сводной книге (None = <root>/radiatool_batch_report.xlsx)
+    :param parser_options: Настройки PDFParser для каждого файла (см. parse_file_for_batch)
+    :param cancel_token: Токен отмены - новые файлы не запускаются, начатые дорабатываются
+    :param save_manifest: Вести манифест на диске (False - только в памяти, без возобновления)
+    :param save_report: Записать сводную книгу Excel
+    :return: Записи манифеста по файлам текущего дерева: относительный путь -> запись
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"❌ Директория не существует: {root}")
+    workers = max(1, workers or os.cpu_count() or 1)
+    max_in_flight = max(workers, max_in_flight or 2 * workers)
+    manifest = BatchManifest((manifest_path or os.path.join(root, MANIFEST_NAME)) if save_manifest else None)
+    if not resume:
+        manifest.clear()
+    options = {'use_cache': True, 'quiet': workers > 1}
+    options.update(parser_options or {})
+
+    pdf_files = find_pdf_files(root, recursive)
+    keys = {file_path: os.path.relpath(file_path, root).replace(os.sep, '/') for file_path in pdf_files}
+    pending = [file_path for file_path in pdf_files if not manifest.is_done(keys[file_path], file_path)]
+    print(f"[BATCH] 📂 {root}: PDF файлов {len(pdf_files)}, к обработке {len(pending)}, "
+          f"уже готово {len(pdf_files) - len(pending)} (процессов: {workers})")
+
+    def finish(file_path: str, record: Dict[str, Any]):
+        manifest.put(keys[file_path], record)
+        status_icon = {'success': '✅', 'empty': '⚠️', 'error': '❌'}.get(record['status'], '•')
+        print(f"[BATCH] {status_icon} {keys[file_path]}: {record['status']}, {record['seconds']} с"
+              f"{', ' + record['error'] if record.get('error') else ''}")
+
+    def cancelled() -> bool:
+        return cancel_token is not None and cancel_token.cancelled
+
+    try:
+        if workers == 1:
+            for file_path in pending:
+                if cancelled():
+                    break
+                finish(file_path, parse_file_for_batch(file_path, options))
+        elif pending:
+            queue = iter(pending)
+            executor = ProcessPoolExecutor(max_workers=workers)
+            in_flight = {}
+            try:
+                while True:
+                    while len(in_flight) < max_in_flight and not cancelled():
+                        file_path = next(queue, None)
+                        if file_path is None:
+                            break
+                        in_flight[executor.submit(parse_file_for_batch, file_path, options)] = file_path
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_path = in_flight.pop(future)
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            # Рабочий процесс упал целиком (нехватка памяти, сбой библиотеки)
+                            record = {'parser_version': PARSER_VERSION, 'status': 'error',
+                                      'error': f"{type(e).__name__}: {e}", 'seconds': None,
+                                      'finished': datetime.now().isoformat(timespec='seconds')}
+                        finish(file_path, record)
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+    except KeyboardInterrupt:
+        print("[BATCH] ⏹️ Прервано - готовые файлы сохранены в манифесте, повторный запуск продолжит обработку")
+        raise
+    finally:
+        results = {keys[file_path]: manifest.files[keys[file_path]]
+                   for file_path in pdf_files if keys[file_path] in manifest.files}
+        if results and save_report:
+            report = report_path or os.path.join(root, REPORT_NAME)
+            try:
+                write_batch_report(report, root, results)
+                print(f"[BATCH] 📊 Сводный отчёт: {report}")
+            except Exception as e:
+                print(f"[BATCH] ❌ Не удалось записать отчёт {report}: {e}")
+
+    counts = {status: sum(1 for r in results.values() if r.get('status') == status)
+              for status in ("success", "empty", "error")}
+    print(f"[BATCH] ✅ Успешно: {counts['success']}, ⚠️ пустые: {counts['empty']}, ❌ ошибки: {counts['error']}")
+    return results
+
+
+# ============ ЗАПУСК ИЗ КОМАНДНОЙ СТРОКИ (НОЧНАЯ ОБРАБОТКА АРХИВА) ============
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Пакетная обработка PDF-спецификаций")
+    arg_parser.add_argument("root", help="Каталог с PDF (обходится с подкаталогами)")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Число процессов (по умолчанию - число ядер)")
+    arg_parser.add_argument("--in-flight", type=int, default=None, help="Максимум файлов в работе одновременно")
+    arg_parser.add_argument("--no-recursive", action="store_true", help="Только файлы самого каталога")
+    arg_parser.add_argument("--restart", action="store_true", help="Не продолжать по манифесту, обработать всё заново")
+    arg_parser.add_argument("--manifest", default=None, help="Путь к манифесту")
+    arg_parser.add_argument("--report", default=None, help="Путь к сводной книге Excel")
+    arg_parser.add_argument("--page-time-budget", type=float, default=60, help="Лимит времени на страницу, с")
+    args = arg_parser.parse_args()
+
+    batch_results = batch_process(args.root, workers=args.workers, max_in_flight=args.in_flight,
+                                  recursive=not args.no_recursive, resume=not args.restart,
+                                  manifest_path=args.manifest, report_path=args.report,
+                                  parser_options={'page_time_budget': args.page_time_budget})
+    sys.exit(1 if any(r.get('status') == 'error' for r in batch_results.values()) else 0)
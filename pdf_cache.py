@@ -0,0 +1,205 @@
+# pdf_cache.py
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Optional, List, Dict
+
+import pandas as pd
+
+
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    SHA-1 содержимого файла (читается блоками, файл целиком в память не загружается).
+    Одинаковый файл под другим именем или в другой папке даёт тот же хэш
+    """
+    sha = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class PDFParseCache:
+    """
+    Дисковый кэш результатов парсинга PDF по страницам.
+    Хранит вердикт релевантности страницы и извлечённые таблицы.
+    Ключ: хэш содержимого PDF + номер страницы + версия парсера + режим (стратегия) извлечения.
+
+    Структура каталога:
+        <cache_dir>/v<версия>/<хэш>/p00012.verdict.json
+        <cache_dir>/v<версия>/<хэш>/p00012.<режим>.json
+    Каждая страница - отдельный файл, поэтому параллельные процессы не мешают друг другу.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, parser_version: str = "1"):
+        """
+        :param cache_dir: Каталог кэша (по умолчанию cache/pdf рядом с .exe или скриптом)
+        :param parser_version: Версия парсера - при её смене старые записи не используются
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "cache", "pdf")
+        self.cache_dir = cache_dir
+        self.parser_version = str(parser_version)
+
+    # ============ ПУТИ ============
+    def _document_dir(self, file_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"v{self.parser_version}", file_hash)
+
+    def _page_path(self, file_hash: str, page_num: int, suffix: str) -> str:
+        return os.path.join(self._document_dir(file_hash), f"p{page_num:05d}.{suffix}.json")
+
+    # ============ ЧТЕНИЕ / ЗАПИСЬ ============
+    def _read_json(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[CACHE] Повреждённая запись кэша {path}: {e}")
+            return None
+
+    def _write_json(self, path: str, data: Dict):
+        """Атомарная запись: сначала во временный файл, затем замена"""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[CACHE] Не удалось записать кэш {path}: {e}")
+
+    # ============ ВЕРДИКТЫ РЕЛЕВАНТНОСТИ ============
+    def get_verdict(self, file_hash: str, page_num: int) -> Optional[bool]:
+        """Вердикт 'обрабатывать ли страницу' или None, если страница ещё не проверялась"""
+        data = self._read_json(self._page_path(file_hash, page_num, "verdict"))
+        if data is None:
+            return None
+        return bool(data.get('relevant'))
+
+    def put_verdict(self, file_hash: str, page_num: int, relevant: bool):
+        self._write_json(self._page_path(file_hash, page_num, "verdict"), {'relevant': bool(relevant)})
+
+    # ============ ТАБЛИЦЫ СТРАНИЦ ============
+    def get_tables(self, file_hash: str, page_num: int, mode: str) -> Optional[List[pd.DataFrame]]:
+        """Таблицы страницы для режима извлечения или None, если в кэше их нет"""
+        data = self._read_json(self._page_path(file_hash, page_num, mode))
+        if data is None:
+            return None
+        try:
+            return [pd.DataFrame(table['data'], columns=table['columns']) for table in data['tables']]
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[CACHE] Некорректные таблицы в кэше (стр. {page_num}, {mode}): {e}")
+            return None
+
+    def put_tables(self, file_hash: str, page_num: int, mode: str, tables: List[pd.DataFrame]):
+        data = {
+            'tables': [
+                {'columns': [str(col) for col in df.columns], 'data': df.values.tolist()}
+                for df in tables
+            ]
+        }
+        self._write_json(self._page_path(file_hash, page_num, mode), data)
+
+    # ============ ОБСЛУЖИВАНИЕ ============
+    def clear(self, file_hash: Optional[str] = None):
+        """Удаляет кэш одного документа или весь кэш"""
+        target = self._document_dir(file_hash) if file_hash else self.cache_dir
+        shutil.rmtree(target, ignore_errors=True)
+
+
+class ThumbnailCache:
+    """
+    Дисковый кэш миниатюр страниц PDF (PNG) для окна выбора страниц.
+    Ключ: хэш содержимого PDF + номер страницы + размер миниатюры.
+    Размер кэша ограничен: при превышении удаляются давно не открывавшиеся миниатюры
+    (время последнего чтения - mtime файла).
+
+    Структура каталога:
+        <cache_dir>/<хэш>/p00012.140x180.png
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 200 * 1024 * 1024):
+        """
+        :param cache_dir: Каталог кэша (по умолчанию cache/thumbnails рядом с .exe или скриптом)
+        :param max_bytes: Предельный суммарный размер кэша в байтах
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "cache", "thumbnails")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, file_hash: str, page_num: int, size: str) -> str:
+        return os.path.join(self.cache_dir, file_hash, f"p{page_num:05d}.{size}.png")
+
+    def get(self, file_hash: str, page_num: int, size: str) -> Optional[bytes]:
+        """PNG миниатюры или None, если её нет в кэше. Чтение обновляет время использования"""
+        path = self._path(file_hash, page_num, size)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"[CACHE] Не удалось прочитать миниатюру {path}: {e}")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def contains(self, file_hash: str, page_num: int, size: str) -> bool:
+        """Есть ли миниатюра в кэше (файл не читается, время использования не меняется)"""
+        return os.path.exists(self._path(file_hash, page_num, size))
+
+    def put(self, file_hash: str, page_num: int, size: str, png_data: bytes):
+        """Атомарная запись миниатюры"""
+        path = self._path(file_hash, page_num, size)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(png_data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[CACHE] Не удалось записать миниатюру {path}: {e}")
+
+    def evict(self):
+        """Удаляет давно не использованные миниатюры, пока кэш не уложится в max_bytes"""
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        # Пустые каталоги документов
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.rmdir(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def clear(self, file_hash: Optional[str] = None):
+        """Удаляет миниатюры одного документа или весь кэш"""
+        target = os.path.join(self.cache_dir, file_hash) if file_hash else self.cache_dir
+        shutil.rmtree(target, ignore_errors=True)
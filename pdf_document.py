@@ -0,0 +1,120 @@
+# pdf_document.py
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from pdf_cache import file_content_hash
+
+# PyMuPDF - быстрый подсчёт страниц, миниатюры, быстрый отбор страниц (необязательная зависимость)
+try:
+    import fitz  # PyMuPDF
+    HAS_FITZ = True
+except ImportError:
+    HAS_FITZ = False
+
+
+def _page_count_pdfminer(file_path: str) -> int:
+    """Число страниц из каталога документа (/Pages /Count) - дерево страниц не обходится"""
+    from pdfminer.pdfparser import PDFParser as PDFMinerParser
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdftypes import resolve1
+    with open(file_path, 'rb') as fp:
+        document = PDFDocument(PDFMinerParser(fp))
+        return int(resolve1(resolve1(document.catalog['Pages'])['Count']))
+
+
+class PDFDocumentSession:
+    """
+    Сессия работы с одним PDF: каждый backend (PyMuPDF, pdfplumber) открывает файл не больше одного раза,
+    открытые документы общие для подсчёта страниц, окна выбора страниц и парсера.
+    Число страниц берётся из таблицы перекрёстных ссылок и каталога без разбора страниц,
+    поэтому большой файл на медленном сетевом диске отвечает сразу.
+
+    Документ PyMuPDF не потокобезопасен - работа с ним только внутри with session.fitz_document() as doc.
+    Документы закрываются в close() / при выходе из with
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._fitz_doc = None
+        self._fitz_lock = threading.RLock()
+        self._plumber_pdf = None
+        self._plumber_lock = threading.Lock()
+        self._page_count: Optional[int] = None
+        self._content_hash: Optional[str] = None
+
+    # ============ ЧИСЛО СТРАНИЦ ============
+    @property
+    def page_count(self) -> Optional[int]:
+        """Количество страниц (None - файл не удалось прочитать ни одним backend)"""
+        if self._page_count is None:
+            self._page_count = self._read_page_count()
+        return self._page_count
+
+    def _read_page_count(self) -> Optional[int]:
+        if HAS_FITZ:
+            try:
+                with self.fitz_document() as doc:
+                    return doc.page_count
+            except Exception as e:
+                print(f"[PDF] PyMuPDF не открыл {self.file_path}: {e}")
+        try:
+            return _page_count_pdfminer(self.file_path)
+        except Exception as e:
+            print(f"[PDF] Не удалось определить количество страниц {self.file_path}: {e}")
+        return None
+
+    # ============ ОТКРЫТЫЕ ДОКУМЕНТЫ ============
+    @contextmanager
+    def fitz_document(self):
+        """Документ PyMuPDF (открывается при первом обращении) под блокировкой сессии"""
+        if not HAS_FITZ:
+            raise RuntimeError("PyMuPDF (fitz) не установлен")
+        with self._fitz_lock:
+            if self._fitz_doc is None:
+                self._fitz_doc = fitz.open(self.file_path)
+            yield self._fitz_doc
+
+    def plumber(self):
+        """Документ pdfplumber (открывается при первом обращении)"""
+        with self._plumber_lock:
+            if self._plumber_pdf is None:
+                import pdfplumber
+                self._plumber_pdf = pdfplumber.open(self.file_path)
+            return self._plumber_pdf
+
+    def reopen_plumber(self):
+        """Закрывает и заново открывает документ pdfplumber (сброс внутренних кэшей pdfminer)"""
+        with self._plumber_lock:
+            if self._plumber_pdf is not None:
+                self._plumber_pdf.close()
+                self._plumber_pdf = None
+        return self.plumber()
+
+    def content_hash(self) -> str:
+        """Хэш содержимого файла (ключ дисковых кэшей), считается один раз на сессию"""
+        if self._content_hash is None:
+            self._content_hash = file_content_hash(self.file_path)
+        return self._content_hash
+
+    def close(self):
+        with self._fitz_lock:
+            if self._fitz_doc is not None:
+                self._fitz_doc.close()
+                self._fitz_doc = None
+        with self._plumber_lock:
+            if self._plumber_pdf is not None:
+                self._plumber_pdf.close()
+                self._plumber_pdf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def get_page_count(file_path: str) -> Optional[int]:
+    """Количество страниц PDF без разбора страниц (None - файл не читается)"""
+    with PDFDocumentSession(file_path) as session:
+        return session.page_count
@@ -0,0 +1,174 @@
+# pdf_memory.py
+import os
+import sys
+import pickle
+import shutil
+import tempfile
+from typing import Optional, List, Dict
+
+import pandas as pd
+
+# psutil - точное измерение памяти процесса (необязательная зависимость)
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# pyarrow - движок parquet для pandas (необязательная зависимость, не в requirements.txt: по умолчанию pickle)
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Текущий объём резидентной памяти процесса (RSS) в МБ.
+    Без psutil: /proc на Linux, GetProcessMemoryInfo на Windows. None - если определить нельзя
+    """
+    try:
+        if HAS_PSUTIL:
+            return psutil.Process().memory_info().rss / 1024 / 1024
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize / 1024 / 1024
+    except Exception:
+        return None
+    return None
+
+
+class MemoryMonitor:
+    """Отслеживает пик памяти процесса и превышение заданного лимита RSS"""
+
+    # После освобождения памяти следующее - не раньше, чем через столько проверок (если память не опускалась)
+    RELEASE_COOLDOWN_CHECKS = 20
+
+    def __init__(self, ceiling_mb: Optional[float] = None,
+                 release_cooldown: int = RELEASE_COOLDOWN_CHECKS):
+        """
+        :param ceiling_mb: Лимит RSS в МБ (None = без лимита, только учёт пика)
+        :param release_cooldown: Минимум проверок release_due() между освобождениями памяти
+        """
+        self.ceiling_mb = ceiling_mb
+        self.release_cooldown = release_cooldown
+        self.peak_mb: Optional[float] = None
+        self.last_mb: Optional[float] = None
+        self._checks_since_release: Optional[int] = None
+
+    def sample(self) -> Optional[float]:
+        """Замер текущей памяти с обновлением пика"""
+        rss = current_rss_mb()
+        if rss is not None:
+            self.last_mb = rss
+            if self.peak_mb is None or rss > self.peak_mb:
+                self.peak_mb = rss
+        return rss
+
+    def over_ceiling(self) -> bool:
+        """Замер памяти и проверка лимита"""
+        rss = self.sample()
+        return bool(self.ceiling_mb) and rss is not None and rss > self.ceiling_mb
+
+    def release_due(self) -> bool:
+        """
+        Пора ли освобождать память (переоткрывать PDF): лимит превышен и после прошлого освобождения
+        память опускалась ниже лимита или прошло release_cooldown проверок. Без этого при RSS,
+        стабильно выше лимита, документ переоткрывался бы на каждой странице
+        """
+        over = self.over_ceiling()
+        if self._checks_since_release is not None:
+            self._checks_since_release += 1
+        if not over:
+            # Память опустилась - следующее превышение обрабатывается сразу
+            self._checks_since_release = None
+            return False
+        if self._checks_since_release is not None and self._checks_since_release < self.release_cooldown:
+            return False
+        self._checks_since_release = 0
+        return True
+
+
+class SpilledPage:
+    """Таблицы одной страницы, выгруженные на диск (загружаются только при сборке результата)"""
+
+    def __init__(self, spill: 'TableSpill', page_num: int, count: int):
+        self.spill = spill
+        self.page_num = page_num
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def load(self) -> List[pd.DataFrame]:
+        return self.spill.get(self.page_num)
+
+
+class TableSpill:
+    """
+    Временное хранилище таблиц страниц на диске: в памяти парсера остаются только ссылки.
+    Формат по умолчанию - pickle: pyarrow не входит в requirements.txt и сборку программы.
+    Если pyarrow установлен, таблицы пишутся в parquet (колоночный формат).
+    Каталог удаляется при close() / выходе из with
+    """
+
+    def __init__(self, prefix: str = "radiatool_spill_"):
+        self.dir = tempfile.mkdtemp(prefix=prefix)
+        self._files: Dict[int, List[str]] = {}
+
+    def put(self, page_num: int, tables: List[pd.DataFrame]) -> SpilledPage:
+        paths = []
+        for table_idx, df in enumerate(tables):
+            base = os.path.join(self.dir, f"p{page_num:05d}_{table_idx}")
+            path = None
+            if HAS_PYARROW:
+                try:
+                    df.to_parquet(base + ".parquet")
+                    path = base + ".parquet"
+                except Exception:
+                    # Смешанные типы в столбце parquet не поддерживает - сохраняем как есть
+                    path = None
+            if path is None:
+                path = base + ".pkl"
+                with open(path, 'wb') as f:
+                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            paths.append(path)
+        self._files[page_num] = paths
+        return SpilledPage(self, page_num, len(paths))
+
+    def get(self, page_num: int) -> List[pd.DataFrame]:
+        tables = []
+        for path in self._files.get(page_num, []):
+            if path.endswith(".parquet"):
+                tables.append(pd.read_parquet(path))
+            else:
+                with open(path, 'rb') as f:
+                    tables.append(pickle.load(f))
+        return tables
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,172 @@
+# pdf_ocr.py
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, List, Dict
+
+# PyMuPDF - поиск страниц-сканов и рендер страницы для OCR (необязательная зависимость)
+try:
+    import fitz  # PyMuPDF
+    HAS_FITZ = True
+except ImportError:
+    HAS_FITZ = False
+
+# Доля площади страницы, которую должно закрывать изображение, чтобы страница считалась сканом
+IMAGE_PAGE_MIN_COVERAGE = 0.85
+
+# Типичные пути установки Tesseract в Windows (в PATH его обычно не добавляют)
+_WINDOWS_TESSERACT_PATHS = [
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+]
+
+
+def find_tesseract() -> Optional[str]:
+    """
+    Путь к программе tesseract: переменная окружения TESSERACT_CMD, PATH,
+    стандартные пути Windows. None - OCR недоступен
+    """
+    candidates = [os.environ.get("TESSERACT_CMD"), shutil.which("tesseract")]
+    if sys.platform == "win32":
+        candidates.extend(_WINDOWS_TESSERACT_PATHS)
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def find_image_only_pages(file_path: str, page_nums: List[int], doc=None) -> Dict[int, str]:
+    """
+    Страницы-сканы: без текстового слоя, с одним изображением почти на всю страницу.
+    Проверка через PyMuPDF без декодирования изображений.
+    :param doc: Уже открытый документ PyMuPDF (None = файл открывается на время проверки)
+    :return: Номер страницы -> хэш исходных байтов изображения (ключ кэша OCR)
+    """
+    if not HAS_FITZ or not page_nums:
+        return {}
+    if doc is None:
+        with fitz.open(file_path) as own_doc:
+            return find_image_only_pages(file_path, page_nums, own_doc)
+    image_pages = {}
+    for page_num in page_nums:
+        page = doc[page_num - 1]
+        if page.get_text("text").strip():
+            continue
+        images = page.get_images(full=True)
+        if len(images) != 1:
+            continue
+        xref = images[0][0]
+        page_area = abs(page.rect)
+        image_area = sum(abs(rect & page.rect) for rect in page.get_image_rects(xref))
+        if not page_area or image_area / page_area < IMAGE_PAGE_MIN_COVERAGE:
+            continue
+        image_pages[page_num] = hashlib.sha1(doc.xref_stream_raw(xref) or b"").hexdigest()
+    return image_pages
+
+
+class OCRQueue:
+    """
+    Очередь OCR страниц-сканов через локальный Tesseract в отдельном пуле потоков
+    (каждая страница - отдельный процесс tesseract, потоки только ждут его завершения).
+    Результат - одностраничный PDF с текстовым слоем (как у *_ocred.pdf), который обрабатывается
+    обычным парсером. Результаты кэшируются по хэшу изображения страницы
+    """
+
+    def __init__(self, tesseract_cmd: str, cache_dir: Optional[str] = None,
+                 workers: Optional[int] = None, languages: str = "rus+eng",
+                 dpi: int = 300, timeout: float = 300):
+        """
+        :param tesseract_cmd: Путь к программе tesseract (find_tesseract())
+        :param cache_dir: Каталог кэша OCR (None = временный каталог, удаляется при close())
+        :param workers: Число одновременных процессов tesseract (None = ядер - 1)
+        :param languages: Языки распознавания Tesseract
+        :param dpi: Разрешение рендера страницы
+        :param timeout: Лимит времени на распознавание одной страницы в секундах
+        """
+        self.tesseract_cmd = tesseract_cmd
+        self._temporary = cache_dir is None
+        self.cache_dir = tempfile.mkdtemp(prefix="radiatool_ocr_") if cache_dir is None else cache_dir
+        self.languages = languages
+        self.dpi = dpi
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers or max(1, (os.cpu_count() or 1) - 1),
+                                            thread_name_prefix="ocr")
+        # Запущенные процессы tesseract - при close() они завершаются, не дожидаясь распознавания
+        self._processes: set = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _result_path(self, image_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{image_hash}.{self.languages}.{self.dpi}.pdf")
+
+    def submit(self, file_path: str, page_num: int, image_hash: str) -> Future:
+        """Ставит страницу в очередь. Результат Future - путь к PDF с текстовым слоем"""
+        return self._executor.submit(self._recognize, file_path, page_num, image_hash)
+
+    def _recognize(self, file_path: str, page_num: int, image_hash: str) -> str:
+        result_path = self._result_path(image_hash)
+        if os.path.exists(result_path):
+            return result_path
+        os.makedirs(self.cache_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix="ocr_page_", dir=self.cache_dir)
+        try:
+            image_path = os.path.join(work_dir, "page.png")
+            with fitz.open(file_path) as doc:
+                pix = doc[page_num - 1].get_pixmap(dpi=self.dpi)
+                pix.save(image_path)
+            output_base = os.path.join(work_dir, "page")
+            # Параллельность даёт пул - каждому процессу tesseract один поток
+            env = dict(os.environ, OMP_THREAD_LIMIT="1")
+            creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Очередь OCR закрыта")
+                process = subprocess.Popen(
+                    [self.tesseract_cmd, image_path, output_base, "-l", self.languages,
+                     "--dpi", str(self.dpi), "pdf"],
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, creationflags=creationflags)
+                self._processes.add(process)
+            try:
+                _, stderr = process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+            finally:
+                with self._lock:
+                    self._processes.discard(process)
+            if process.returncode != 0 or not os.path.exists(output_base + ".pdf"):
+                stderr = stderr.decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"tesseract завершился с кодом {process.returncode}: {stderr[-300:]}")
+            os.replace(output_base + ".pdf", result_path)
+            return result_path
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def close(self):
+        """
+        Отменяет ещё не начатые страницы и завершает запущенные процессы tesseract
+        (отмена парсинга не ждёт распознавания страниц); временный кэш удаляется
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._closed = True
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        # Потоки пула только ждали процессы - после их завершения остаётся дорисовать рендер страницы
+        self._executor.shutdown(wait=True)
+        if self._temporary:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -6,6 +6,13 @@ import threading
 from typing import List, Optional, Set, Dict, Any
 import traceback
 import queue
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pdf_cache import ThumbnailCache
+from pdf_document import PDFDocumentSession
+from pdf_scoring import page_relevance_level
 
 # Попытка импорта библиотек для работы с PDF и изображениями
 try:
@@ -73,8 +80,30 @@ class PdfPageSelector:
     Окно для выбора страниц PDF с миниатюрами и ручным вводом диапазонов
     """
     
+    # Размер миниатюры и сетки
+    THUMB_WIDTH = 140
+    THUMB_HEIGHT = 180
+    THUMB_COLUMNS = 10
+    # Отступ вокруг миниатюры в сетке и число строк, создаваемых сверх видимых (сверху и снизу)
+    THUMB_PADDING = 10
+    THUMB_BUFFER_ROWS = 2
+    # Координаты свободного виджета пула (за пределами области прокрутки)
+    OFFSCREEN = (-10000, -10000)
+    # Опрос очереди готовых миниатюр (мс) и время на подстановку миниатюр за один опрос (с):
+    # миниатюры из кэша приходят сразу все, GUI при этом не должен замирать
+    THUMB_POLL_MS = 50
+    THUMB_POLL_BUDGET = 0.03
+    # Сколько строк готовых миниатюр (PhotoImage) держать в памяти сверх страниц с виджетами.
+    # Остальные восстанавливаются из дискового кэша, когда страница снова попадает в вид
+    THUMB_MEMORY_EXTRA_ROWS = 4
+    # Элемент очереди миниатюр: изображение страницы лежит в дисковом кэше и читается при показе
+    THUMB_ON_DISK = "on_disk"
+    # Цвет отметки оценки страницы: 2 - вероятная спецификация, 1 - возможная
+    SCORE_BADGE_COLORS = {2: "#2e9e44", 1: "#e0a800"}
+    
     def __init__(self, parent, total_pages: int, pdf_path: str, 
-                 title: str = "Выбор страниц PDF", initial_selection: List[int] = None):
+                 title: str = "Выбор страниц PDF", initial_selection: List[int] = None,
+                 session=None, use_thumbnail_cache: bool = True, auto_select: bool = True):
         """
         Инициализация окна выбора страниц
         
@@ -84,12 +113,19 @@ class PdfPageSelector:
             pdf_path: путь к PDF файлу
             title: заголовок окна
             initial_selection: начальный выбор страниц (по умолчанию пустой)
+            session: открытый документ (pdf_document.PDFDocumentSession) - PDF не открывается повторно
+            use_thumbnail_cache: брать миниатюры из дискового кэша и сохранять новые
+            auto_select: выбирать вероятные страницы спецификаций по мере фоновой оценки
+                         (пока пользователь сам не изменил выбор; не действует при initial_selection)
         """
         self.parent = parent
         self.total_pages = total_pages
         self.pdf_path = pdf_path
         self.title = title
         self.initial_selection = initial_selection or []
+        self.session = session
+        self._own_session = None
+        self.thumbnail_cache = ThumbnailCache() if use_thumbnail_cache else None
         
         # Результат
         self.result = {"pages": None, "confirmed": False}
@@ -98,8 +134,42 @@ class PdfPageSelector:
         self.selected_pages: Set[int] = set(self.initial_selection)
         
         # Миниатюры
-        self.thumbnail_images: Dict[int, Any] = {}  # page_num -> PhotoImage
-        self.thumbnail_widgets: Dict[int, Dict[str, Any]] = {}  # page_num -> widget_dict
+        # Готовые PhotoImage (page_num -> PhotoImage) в порядке использования: в памяти только
+        # страницы с виджетами и несколько строк вокруг, память не растёт с числом страниц
+        self.thumbnail_images: "OrderedDict[int, Any]" = OrderedDict()
+        # Страницы, миниатюра которых уже готова (в памяти или в дисковом кэше)
+        self._thumb_ready: Set[int] = set()
+        self._file_hash: Optional[str] = None
+        # Виртуальная сетка: виджеты есть только у страниц видимых строк (page_num -> widget_dict),
+        # виджеты ушедших из вида строк возвращаются в пул и получают новые страницы
+        self.thumbnail_widgets: Dict[int, Dict[str, Any]] = {}
+        self._free_slots: List[Dict[str, Any]] = []
+        self._cell_width = 0
+        self._cell_height = 0
+        
+        # Фоновый рендер: поток рендерит страницы в PIL-изображения и кладёт их в очередь,
+        # поток GUI создаёт из них PhotoImage. Видимые страницы рендерятся первыми
+        self._thumb_queue: queue.Queue = queue.Queue()
+        self._render_lock = threading.Lock()
+        self._render_pending: Set[int] = set()
+        self._render_priority: List[int] = []
+        self._render_cursor = 1
+        self._render_failed: Set[int] = set()
+        self._render_stop = threading.Event()
+        self._render_thread = None
+        # Поток рендера работает (под _render_lock): вытесненные миниатюры без кэша ставятся ему в очередь
+        self._render_running = False
+        self._thumbnails_done = 0
+        self._poll_id = None
+        self._viewport_timer = None
+        
+        # Фоновая оценка страниц (pdf_scoring.page_relevance_level): page_num -> 0/1/2.
+        # Автовыбор вероятных спецификаций - пока пользователь не менял выбор сам
+        self.page_scores: Dict[int, int] = {}
+        self._score_queue: queue.Queue = queue.Queue()
+        self._score_thread = None
+        self._score_poll_id = None
+        self._selection_touched = bool(self.initial_selection) or not auto_select
         
         # Окно
         self.dialog = None
@@ -113,7 +183,7 @@ class PdfPageSelector:
         self.range_var = None
         self.stats_label = None
         self.canvas = None
-        self.thumbnails_frame = None
+        self._vsb = None
         
         # Таймер для автоматического применения
         self._apply_timer = None
@@ -260,8 +330,12 @@ class PdfPageSelector:
         self.canvas = tk.Canvas(canvas_frame, bg="#f0f0f0", highlightthickness=0)
         vsb = ttk.Scrollbar(canvas_frame, orient="vertical", command=self.canvas.yview)
         hsb = ttk.Scrollbar(canvas_frame, orient="horizontal", command=self.canvas.xview)
+        self._vsb = vsb
         
-        self.canvas.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        # Прокрутка и изменение размера меняют видимые строки: виджеты переиспользуются,
+        # миниатюры видимых страниц рендерятся первыми
+        self.canvas.configure(yscrollcommand=self._on_canvas_yscroll, xscrollcommand=hsb.set)
+        self.canvas.bind("<Configure>", lambda e: self._on_viewport_change())
         
         # Размещаем элементы
         self.canvas.grid(row=0, column=0, sticky="nsew")
@@ -271,10 +345,6 @@ class PdfPageSelector:
         canvas_frame.grid_rowconfigure(0, weight=1)
         canvas_frame.grid_columnconfigure(0, weight=1)
         
-        # Внутренний фрейм для миниатюр
-        self.thumbnails_frame = ttk.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.thumbnails_frame, anchor="nw")
-        
         # Нижняя часть - статистика и кнопки (поднимаем на 30px выше)
         bottom_frame = ttk.Frame(main_frame)
         bottom_frame.pack(side="bottom", fill="x", pady=(30, 30))  # Увеличили нижний отступ
@@ -334,135 +404,342 @@ class PdfPageSelector:
         btn_cancel.pack(side="left", padx=(10, 40), expand=True)
     
     def _initialize_dialog(self):
-        """Инициализирует диалог с загрузкой миниатюр"""
-        # Сначала создаем все виджеты
+        """Инициализирует диалог: сетка с заглушками сразу, миниатюры подставляются по мере рендера"""
         self._create_widgets()
+        self._create_thumbnail_widgets()
         
-        # Показываем сообщение о загрузке
-        loading_label = ttk.Label(self.dialog, text="Загрузка миниатюр...", 
-                                  font=("Segoe UI", 12, "bold"))
-        loading_label.place(relx=0.5, rely=0.5, anchor="center")
-        self.dialog.update()
+        # Настраиваем прокрутку колесиком мыши
+        self._setup_mousewheel_scroll()
+        
+        # Устанавливаем фокус на диалог
+        self.dialog.after(200, lambda: self.dialog.focus_set())
         
-        # Загружаем миниатюры в отдельном потоке
-        self._load_thumbnails_async(loading_label)
+        self._start_thumbnail_rendering()
+        self._start_page_scoring()
     
-    def _load_thumbnails_async(self, loading_label):
-        """Загружает миниатюры в отдельном потоке"""
-        result_queue = queue.Queue()
+    # ============ ФОНОВЫЙ РЕНДЕР МИНИАТЮР ============
+    def _start_thumbnail_rendering(self):
+        """Запускает поток рендера миниатюр и опрос очереди готовых изображений"""
+        if not HAS_PDF_LIBS:
+            print("[INFO] Используются заглушки для миниатюр")
+            return
         
-        def thumbnail_worker():
+        self._document_session()
+        self._render_pending = set(range(1, self.total_pages + 1))
+        self._render_running = True
+        self._render_thread = threading.Thread(target=self._render_worker, daemon=True)
+        self._render_thread.start()
+        self._poll_id = self.dialog.after(self.THUMB_POLL_MS, self._poll_thumbnails)
+        self._schedule_viewport_update()
+    
+    def _next_render_page(self) -> Optional[int]:
+        """Следующая страница для рендера: сначала видимые, затем по порядку. None - все отрисованы"""
+        with self._render_lock:
+            while self._render_priority:
+                page_num = self._render_priority.pop(0)
+                if page_num in self._render_pending:
+                    self._render_pending.discard(page_num)
+                    return page_num
+            while self._render_cursor <= self.total_pages:
+                page_num = self._render_cursor
+                self._render_cursor += 1
+                if page_num in self._render_pending:
+                    self._render_pending.discard(page_num)
+                    return page_num
+            self._render_running = False
+            return None
+    
+    def _render_worker(self):
+        """Фоновый поток: рендер страниц в PIL-изображения (объекты Tk здесь не создаются)"""
+        try:
+            # Сначала все миниатюры из дискового кэша - повторно открытый PDF показывается сразу
+            file_hash = self._document_hash()
+            self._file_hash = file_hash
+            if file_hash:
+                self._load_cached_thumbnails(file_hash)
+            
+            # Открываем PDF (или берём уже открытый документ сессии)
+            with self._open_document():
+                pass
+            
+            self._render_pages()
+        except Exception as e:
+            print(f"[ERROR] Ошибка загрузки миниатюр: {e}")
+            with self._render_lock:
+                self._render_running = False
+            self._thumb_queue.put((None, None))
+    
+    def _render_pages(self):
+        """Рендер страниц очереди, пока она не опустеет; новые миниатюры сохраняются в дисковый кэш"""
+        file_hash = self._file_hash
+        rendered = 0
+        while not self._render_stop.is_set():
+            page_num = self._next_render_page()
+            if page_num is None:
+                break
             try:
-                success = self._load_thumbnails()
-                result_queue.put(("success", success))
+                # Документ занят только на время одной страницы - его делит с рендером оценка страниц
+                with self._open_document() as pdf_document:
+                    image, png_data = self._render_thumbnail(pdf_document, page_num)
             except Exception as e:
-                result_queue.put(("error", str(e)))
+                print(f"[ERROR] Ошибка загрузки миниатюры страницы {page_num}: {e}")
+                image = png_data = None
+            # Сначала в кэш: вытесненную из памяти миниатюру GUI читает оттуда
+            if png_data and file_hash:
+                self.thumbnail_cache.put(file_hash, page_num, self._thumb_size_key(), png_data)
+                rendered += 1
+            self._thumb_queue.put((page_num, image))
+        
+        if rendered:
+            self.thumbnail_cache.evict()
+    
+    def _request_render(self, page_num: int):
+        """Миниатюры нет ни в памяти, ни в дисковом кэше - страница снова рендерится (первой)"""
+        if self._render_stop.is_set() or page_num in self._render_failed:
+            return
+        with self._render_lock:
+            if page_num in self._render_pending:
+                return
+            self._render_pending.add(page_num)
+            self._render_priority.insert(0, page_num)
+            # Первый проход рендера мог уже закончиться - запускаем поток заново
+            start_thread = not self._render_running
+            self._render_running = True
+        if start_thread:
+            self._render_thread = threading.Thread(target=self._render_pages, daemon=True)
+            self._render_thread.start()
+    
+    def _thumb_size_key(self) -> str:
+        return f"{self.THUMB_WIDTH}x{self.THUMB_HEIGHT}"
+    
+    def _document_hash(self) -> Optional[str]:
+        """Хэш содержимого PDF - ключ кэша миниатюр (None - кэш не используется)"""
+        if self.thumbnail_cache is None:
+            return None
+        try:
+            return self._document_session().content_hash()
+        except OSError as e:
+            print(f"[WARNING] Кэш миниатюр не используется: {e}")
+            return None
+    
+    def _load_cached_thumbnails(self, file_hash: str):
+        """
+        Страницы с миниатюрой в дисковом кэше не рендерятся: в очередь идёт только отметка,
+        изображение читается, когда страница попадает в вид
+        """
+        size_key = self._thumb_size_key()
+        cached = 0
+        for page_num in range(1, self.total_pages + 1):
+            if self._render_stop.is_set():
+                return
+            if not self.thumbnail_cache.contains(file_hash, page_num, size_key):
+                continue
+            with self._render_lock:
+                self._render_pending.discard(page_num)
+            self._thumb_queue.put((page_num, self.THUMB_ON_DISK))
+            cached += 1
+        if cached:
+            print(f"[INFO] Миниатюры из кэша: {cached} из {self.total_pages}")
+    
+    def _render_thumbnail(self, pdf_document, page_num: int):
+        """
+        Рендерит страницу сразу в размер миниатюры (без промежуточного PPM и LANCZOS)
+        
+        Returns:
+            (PIL-изображение, PNG для кэша или None, если кэш выключен)
+        """
+        page = pdf_document[page_num - 1]
+        zoom = min(self.THUMB_WIDTH / page.rect.width, self.THUMB_HEIGHT / page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        return image, (pix.tobytes("png") if self.thumbnail_cache is not None else None)
+    
+    def _poll_thumbnails(self):
+        """Поток GUI: забирает готовые изображения из очереди и подставляет их в сетку"""
+        self._poll_id = None
+        if not self.dialog or not self.dialog.winfo_exists():
+            return
         
-        def check_result():
+        deadline = time.monotonic() + self.THUMB_POLL_BUDGET
+        while time.monotonic() < deadline:
             try:
-                status, data = result_queue.get_nowait()
-                
-                # Убираем сообщение о загрузке
-                loading_label.destroy()
-                
-                if status == "success":
-                    print(f"[INFO] Загружено {len(self.thumbnail_images)} миниатюр")
-                    # Инициализируем отображение (ничего не выбираем по умолчанию)
-                    self._create_thumbnail_widgets()
-                    
-                    # Настраиваем прокрутку колесиком мыши
-                    self._setup_mousewheel_scroll()
-                    
-                    # Обновляем canvas
-                    self.dialog.after(100, lambda: self.canvas.config(
-                        scrollregion=self.canvas.bbox("all")))
-                    
-                    # Устанавливаем фокус на диалог
-                    self.dialog.after(200, lambda: self.dialog.focus_set())
-                else:
-                    print(f"[ERROR] Ошибка загрузки миниатюр: {data}")
-                    # Заполняем заглушками
-                    for page_num in range(1, self.total_pages + 1):
-                        self.thumbnail_images[page_num] = None
-                    self._create_thumbnail_widgets()
-                    
+                page_num, image = self._thumb_queue.get_nowait()
             except queue.Empty:
-                self.dialog.after(100, check_result)
-        
-        # Запускаем поток
-        thread = threading.Thread(target=thumbnail_worker, daemon=True)
-        thread.start()
-        
-        # Запускаем проверку результата
-        self.dialog.after(100, check_result)
+                break
+            
+            if page_num is None:
+                # Документ не открылся - оставшиеся страницы остаются заглушками
+                self._render_failed.update(range(1, self.total_pages + 1))
+                self._render_failed.difference_update(self._thumb_ready)
+                for failed_page in self._render_failed:
+                    self._show_thumbnail_image(failed_page)
+                self.thumbnail_progress_label.config(text="Ошибка загрузки")
+                return
+            
+            # Повторный рендер вытесненной миниатюры в прогрессе не учитывается
+            if page_num not in self._thumb_ready and page_num not in self._render_failed:
+                self._thumbnails_done += 1
+            if image is None:
+                self._render_failed.add(page_num)
+            else:
+                self._thumb_ready.add(page_num)
+                if image is not self.THUMB_ON_DISK:
+                    self._remember_photo(page_num, ImageTk.PhotoImage(image))
+            self._show_thumbnail_image(page_num)
+        
+        if self._thumbnails_done < self.total_pages:
+            self.thumbnail_progress_label.config(
+                text=f"Загружено: {self._thumbnails_done}/{self.total_pages} страниц"
+            )
+            self._poll_id = self.dialog.after(self.THUMB_POLL_MS, self._poll_thumbnails)
+        else:
+            print(f"[INFO] Загружено {len(self._thumb_ready)} миниатюр")
+            self.thumbnail_progress_label.config(text="")
+    
+    def _stop_thumbnail_rendering(self):
+        """Останавливает рендер (окно закрыто) и освобождает документ"""
+        self._render_stop.set()
+        if self._poll_id:
+            try:
+                self.dialog.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        if self._score_poll_id:
+            try:
+                self.dialog.after_cancel(self._score_poll_id)
+            except Exception:
+                pass
+            self._score_poll_id = None
+        # Потоки дорабатывают не больше одной страницы
+        for thread in (self._render_thread, self._score_thread):
+            if thread is not None:
+                thread.join(timeout=5)
+        self._render_thread = self._score_thread = None
+        if self._own_session is not None:
+            self._own_session.close()
+            self._own_session = None
     
-    def _load_thumbnails(self) -> bool:
-        """Загружает миниатюры страниц PDF"""
+    def _on_canvas_yscroll(self, first, last):
+        """Прокрутка canvas: обновляет полосу прокрутки, видимые строки и приоритет рендера"""
+        self._vsb.set(first, last)
+        self._on_viewport_change()
+    
+    def _on_viewport_change(self):
+        self._layout_visible_rows()
+        self._schedule_viewport_update()
+    
+    def _schedule_viewport_update(self):
+        """Откладывает пересчёт видимых страниц до конца прокрутки"""
+        if not self.dialog or not self._render_pending:
+            return
+        if self._viewport_timer:
+            self.dialog.after_cancel(self._viewport_timer)
+        self._viewport_timer = self.dialog.after(100, self._update_render_priority)
+    
+    def _update_render_priority(self):
+        """Видимые страницы, ещё не отрисованные, ставятся в начало очереди рендера"""
+        self._viewport_timer = None
+        visible = self._visible_pages()
+        with self._render_lock:
+            self._render_priority = [p for p in visible if p in self._render_pending]
+    
+    def _visible_pages(self) -> List[int]:
+        """Страницы в видимой области canvas"""
+        first_page, last_page = self._visible_page_range(buffer_rows=0)
+        return list(range(first_page, last_page + 1))
+    
+    def _visible_page_range(self, buffer_rows: int):
+        """Первая и последняя страница видимых строк сетки (плюс buffer_rows строк сверху и снизу)"""
+        if not self._cell_height or not self.canvas or not self.canvas.winfo_exists():
+            return 1, 0
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(max(self.canvas.winfo_height(), 1))
+        first_row = max(0, int(top // self._cell_height) - buffer_rows)
+        last_row = int(bottom // self._cell_height) + buffer_rows
+        first_page = first_row * self.THUMB_COLUMNS + 1
+        last_page = min(self.total_pages, (last_row + 1) * self.THUMB_COLUMNS)
+        return first_page, last_page
+    
+    # ============ ФОНОВАЯ ОЦЕНКА СТРАНИЦ ============
+    def _start_page_scoring(self):
+        """Запускает оценку страниц по текстовому слою и опрос её результатов"""
         if not HAS_PDF_LIBS:
-            print("[INFO] Используются заглушки для миниатюр")
-            return False
+            return
+        self._document_session()
+        self._score_thread = threading.Thread(target=self._score_worker, daemon=True)
+        self._score_thread.start()
+        self._score_poll_id = self.dialog.after(self.THUMB_POLL_MS, self._poll_scores)
+    
+    def _score_worker(self):
+        """Фоновый поток: оценка каждой страницы (ключевые слова, правила отбора парсера, геометрия текста)"""
+        for page_num in range(1, self.total_pages + 1):
+            if self._render_stop.is_set():
+                return
+            try:
+                with self._open_document() as pdf_document:
+                    page = pdf_document[page_num - 1]
+                    text = page.get_text("text") or ""
+                    words = page.get_text("words")
+                level = page_relevance_level(text, words)
+            except Exception as e:
+                print(f"[WARNING] Не удалось оценить страницу {page_num}: {e}")
+                level = 0
+            self._score_queue.put((page_num, level))
+    
+    def _poll_scores(self):
+        """Поток GUI: отметки оценки на миниатюрах и автовыбор вероятных спецификаций"""
+        self._score_poll_id = None
+        if not self.dialog or not self.dialog.winfo_exists():
+            return
         
-        # Создаем прогресс-бар
-        progress_dialog = ProgressDialog(
-            self.dialog, "Загрузка миниатюр", 
-            f"Генерация миниатюр для {self.total_pages} страниц..."
-        )
+        preselected = False
+        while True:
+            try:
+                page_num, level = self._score_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.page_scores[page_num] = level
+            if level == 2 and not self._selection_touched:
+                self.selected_pages.add(page_num)
+                preselected = True
+            thumb_data = self.thumbnail_widgets.get(page_num)
+            if thumb_data:
+                self._draw_score_badge(thumb_data["canvas"], page_num)
+                self._update_thumbnail_visual(thumb_data["canvas"], thumb_data["selection_rect"],
+                                              thumb_data["checkmark"], thumb_data["status_label"],
+                                              page_num in self.selected_pages)
+        
+        if preselected:
+            self._update_range_entry()
+        self._update_stats()
         
-        try:
-            # Открываем PDF
-            pdf_document = fitz.open(self.pdf_path)
-            
-            for page_num in range(1, self.total_pages + 1):
-                try:
-                    # Обновляем прогресс
-                    percent = int((page_num / self.total_pages) * 100)
-                    progress_dialog.update(
-                        percent,
-                        f"Страница {page_num} из {self.total_pages}"
-                    )
-                    
-                    # Обновляем информацию в интерфейсе
-                    self.thumbnail_progress_label.config(
-                        text=f"Загружено: {page_num}/{self.total_pages} страниц"
-                    )
-                    self.dialog.update_idletasks()
-                    
-                    # Получаем страницу (0-based индекс)
-                    page = pdf_document[page_num - 1]
-                    
-                    # Рендерим страницу в изображение с низким разрешением
-                    pix = page.get_pixmap(matrix=fitz.Matrix(0.25, 0.25))
-                    
-                    # Конвертируем в PIL Image
-                    img_data = pix.tobytes("ppm")
-                    img_pil = Image.open(BytesIO(img_data))
-                    
-                    # Изменяем размер для миниатюры
-                    thumb_width = 140
-                    thumb_height = 180
-                    img_pil.thumbnail((thumb_width, thumb_height), Image.Resampling.LANCZOS)
-                    
-                    # Конвертируем в PhotoImage для Tkinter
-                    photo_img = ImageTk.PhotoImage(img_pil)
-                    self.thumbnail_images[page_num] = photo_img
-                    
-                except Exception as e:
-                    print(f"[ERROR] Ошибка загрузки миниатюры страницы {page_num}: {e}")
-                    self.thumbnail_images[page_num] = None
-            
-            pdf_document.close()
-            progress_dialog.close()
-            
-            # Очищаем метку прогресса после завершения
-            self.thumbnail_progress_label.config(text="")
-            return True
-            
-        except Exception as e:
-            print(f"[ERROR] Ошибка загрузки миниатюр: {e}")
-            if progress_dialog:
-                progress_dialog.close()
-            self.thumbnail_progress_label.config(text="Ошибка загрузки")
-            return False
+        if len(self.page_scores) < self.total_pages:
+            self._score_poll_id = self.dialog.after(self.THUMB_POLL_MS * 2, self._poll_scores)
+        else:
+            likely = sum(1 for level in self.page_scores.values() if level == 2)
+            print(f"[INFO] Оценка страниц завершена: вероятных спецификаций {likely} из {self.total_pages}")
+    
+    def _draw_score_badge(self, thumb_canvas, page_num):
+        """Цветная отметка оценки страницы в левом верхнем углу миниатюры"""
+        thumb_canvas.delete("badge")
+        color = self.SCORE_BADGE_COLORS.get(self.page_scores.get(page_num))
+        if color:
+            thumb_canvas.create_oval(9, 9, 23, 23, fill=color, outline="white", tags="badge")
+    
+    def _document_session(self) -> PDFDocumentSession:
+        """Сессия документа: переданная вызывающим кодом или собственная (закрывается при очистке)"""
+        if self.session is not None:
+            return self.session
+        if self._own_session is None:
+            self._own_session = PDFDocumentSession(self.pdf_path)
+        return self._own_session
+    
+    @contextmanager
+    def _open_document(self):
+        """Документ PyMuPDF сессии под её блокировкой (открывается один раз)"""
+        with self._document_session().fitz_document() as pdf_document:
+            yield pdf_document
     
     def _setup_mousewheel_scroll(self):
         """Настраивает прокрутку колесиком мыши"""
@@ -473,55 +750,130 @@ class PdfPageSelector:
         # Привязываем событие
         self.mousewheel_id = self.canvas.bind_all("<MouseWheel>", on_mousewheel)
     
+    # ============ ВИРТУАЛЬНАЯ СЕТКА МИНИАТЮР ============
     def _create_thumbnail_widgets(self):
-        """Создает все виджеты миниатюр один раз (без мигания)"""
-        # Рассчитываем количество колонок
-        cols = 10  # Увеличиваем количество колонок для полноэкранного режима
-        
-        for i, page_num in enumerate(range(1, self.total_pages + 1)):
-            # Создаем виджет миниатюры
-            thumb_data = self._create_single_thumbnail(page_num)
-            
-            # Размещаем в сетке
-            row = i // cols
-            col = i % cols
-            thumb_data["frame"].grid(row=row, column=col, padx=10, pady=10, sticky="nw")
-            
-            # Сохраняем все элементы виджета
-            self.thumbnail_widgets[page_num] = thumb_data
-        
-        # Обновляем размер canvas
-        self.thumbnails_frame.update_idletasks()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        """
+        Готовит сетку миниатюр: размер ячейки по первому виджету, область прокрутки на все страницы.
+        Виджеты создаются только для видимых строк, поэтому время и память не зависят от числа страниц
+        """
+        slot = self._create_thumbnail_slot()
+        # Размер ячейки - по виджету с двухстрочным статусом (самый высокий вариант)
+        slot["status_label"].config(text="✅ Выбрана\nдля обработки")
+        slot["frame"].update_idletasks()
+        self._cell_width = slot["frame"].winfo_reqwidth() + 2 * self.THUMB_PADDING
+        self._cell_height = slot["frame"].winfo_reqheight() + 2 * self.THUMB_PADDING
+        self._free_slots.append(slot)
+        
+        rows = (self.total_pages + self.THUMB_COLUMNS - 1) // self.THUMB_COLUMNS
+        self.canvas.config(scrollregion=(0, 0, self.THUMB_COLUMNS * self._cell_width,
+                                         rows * self._cell_height))
+        self._layout_visible_rows()
         
         # Обновляем статистику
         self._update_stats()
     
-    def _create_single_thumbnail(self, page_num):
-        """Создает один виджет миниатюры страницы и возвращает все его элементы"""
-        is_selected = page_num in self.selected_pages
-        
+    def _layout_visible_rows(self):
+        """Назначает виджеты страницам видимых строк; виджеты ушедших из вида строк идут в пул"""
+        if not self._cell_height:
+            return
+        first_page, last_page = self._visible_page_range(self.THUMB_BUFFER_ROWS)
+        
+        for page_num in [p for p in self.thumbnail_widgets if p < first_page or p > last_page]:
+            slot = self.thumbnail_widgets.pop(page_num)
+            slot["page_num"] = None
+            # Виджет в пуле не держит миниатюру - её PhotoImage может быть вытеснен из памяти
+            slot["canvas"].delete("content")
+            slot["canvas"].image = None
+            # Вне области прокрутки - не видно и не перерисовывается
+            self.canvas.coords(slot["window"], *self.OFFSCREEN)
+            self._free_slots.append(slot)
+        
+        for page_num in range(first_page, last_page + 1):
+            if page_num not in self.thumbnail_widgets:
+                slot = self._free_slots.pop() if self._free_slots else self._create_thumbnail_slot()
+                self._bind_slot(slot, page_num)
+    
+    def _bind_slot(self, slot, page_num):
+        """Показывает в виджете из пула страницу page_num"""
+        slot["page_num"] = page_num
+        slot["page_label"].config(text=f"Страница {page_num}")
+        self._draw_thumbnail_content(slot["canvas"], page_num)
+        self._draw_score_badge(slot["canvas"], page_num)
+        self._update_thumbnail_visual(slot["canvas"], slot["selection_rect"], slot["checkmark"],
+                                      slot["status_label"], page_num in self.selected_pages)
+        row, col = divmod(page_num - 1, self.THUMB_COLUMNS)
+        self.canvas.coords(slot["window"],
+                           col * self._cell_width + self.THUMB_PADDING,
+                           row * self._cell_height + self.THUMB_PADDING)
+        self.thumbnail_widgets[page_num] = slot
+    
+    def _create_thumbnail_slot(self):
+        """Создает виджет миниатюры (без страницы) и возвращает все его элементы"""
         # Основной фрейм
-        thumb_frame = ttk.Frame(self.thumbnails_frame, relief="solid", borderwidth=2)
+        thumb_frame = ttk.Frame(self.canvas, relief="solid", borderwidth=2)
         
         # Номер страницы
-        page_label = ttk.Label(thumb_frame, text=f"Страница {page_num}", 
-                               font=("Segoe UI", 9, "bold"))
+        page_label = ttk.Label(thumb_frame, text="", font=("Segoe UI", 9, "bold"))
         page_label.pack(pady=(8, 0))
         
         # Область миниатюры (Canvas)
-        thumb_canvas = tk.Canvas(thumb_frame, width=140, height=180,
+        thumb_canvas = tk.Canvas(thumb_frame, width=self.THUMB_WIDTH, height=self.THUMB_HEIGHT,
                                  bg="white", highlightthickness=0)
         thumb_canvas.pack(pady=8)
         
-        # Загружаем миниатюру или создаем заглушку
-        if page_num in self.thumbnail_images and self.thumbnail_images[page_num] is not None:
+        # Индикатор выбора (прямоугольник и галочка)
+        selection_rect = thumb_canvas.create_rectangle(5, 5, 135, 175, 
+                                                      outline="#cccccc", width=1)
+        checkmark = thumb_canvas.create_text(130, 20, text="", 
+                                           font=("Segoe UI", 14, "bold"), fill="#0066cc")
+        
+        # Статус
+        status_label = ttk.Label(thumb_frame, text="⏸ Пропустить", font=("Segoe UI", 9))
+        status_label.pack(pady=(0, 8))
+        
+        slot = {
+            "frame": thumb_frame,
+            "canvas": thumb_canvas,
+            "page_label": page_label,
+            "selection_rect": selection_rect,
+            "checkmark": checkmark,
+            "status_label": status_label,
+            "page_num": None
+        }
+        
+        # Обработчик клика - по странице, которую виджет показывает сейчас
+        def on_click(event, s=slot):
+            if s["page_num"] is not None:
+                self._toggle_page_selection_smooth(s["page_num"])
+        
+        thumb_frame.bind("<Button-1>", on_click)
+        thumb_canvas.bind("<Button-1>", on_click)
+        page_label.bind("<Button-1>", on_click)
+        status_label.bind("<Button-1>", on_click)
+        
+        slot["window"] = self.canvas.create_window(*self.OFFSCREEN, window=thumb_frame, anchor="nw")
+        return slot
+    
+    def _draw_thumbnail_content(self, thumb_canvas, page_num):
+        """Рисует миниатюру страницы или заглушку (элементы с тегом "content" под рамкой выбора)"""
+        thumb_canvas.delete("content")
+        thumb_canvas.image = None
+        photo_img = self._thumbnail_photo(page_num)
+        if photo_img is not None:
             # Реальная миниатюра
-            photo_img = self.thumbnail_images[page_num]
-            thumb_canvas.create_image(70, 90, image=photo_img)
+            thumb_canvas.config(bg="white")
+            thumb_canvas.create_image(self.THUMB_WIDTH // 2, self.THUMB_HEIGHT // 2,
+                                      image=photo_img, tags="content")
             
             # Сохраняем ссылку на изображение
             thumb_canvas.image = photo_img
+        elif HAS_PDF_LIBS and page_num not in self._render_failed:
+            # Страница ещё в очереди рендера
+            thumb_canvas.config(bg="#f5f5f5")
+            thumb_canvas.create_text(70, 80, text="⏳", font=("Segoe UI", 14),
+                                     fill="#999999", tags="content")
+            thumb_canvas.create_text(70, 105, text=f"Страница {page_num}",
+                                     font=("Segoe UI", 9), fill="#999999", tags="content")
         else:
             # Заглушка с цветом в зависимости от типа контента
             if page_num % 3 == 0:
@@ -536,43 +888,55 @@ class PdfPageSelector:
             
             thumb_canvas.config(bg=bg_color)
             thumb_canvas.create_text(70, 60, text=thumb_text, 
-                                     font=("Segoe UI", 10, "bold"), fill="#333333")
+                                     font=("Segoe UI", 10, "bold"), fill="#333333", tags="content")
             thumb_canvas.create_text(70, 90, text=f"Страница {page_num}", 
-                                     font=("Segoe UI", 9), fill="#666666")
-        
-        # Индикатор выбора (прямоугольник и галочка)
-        selection_rect = thumb_canvas.create_rectangle(5, 5, 135, 175, 
-                                                      outline="#cccccc", width=1)
-        checkmark = thumb_canvas.create_text(130, 20, text="", 
-                                           font=("Segoe UI", 14, "bold"), fill="#0066cc")
-        
-        # Статус
-        status_text = "⏸ Пропустить" if not is_selected else "✅ Выбрана для обработки"
-        status_label = ttk.Label(thumb_frame, text=status_text, 
-                                 font=("Segoe UI", 9))
-        status_label.pack(pady=(0, 8))
-        
-        # Обработчик клика
-        def on_click(event, p=page_num):
-            self._toggle_page_selection_smooth(p)
-        
-        thumb_frame.bind("<Button-1>", on_click)
-        thumb_canvas.bind("<Button-1>", on_click)
-        page_label.bind("<Button-1>", on_click)
-        status_label.bind("<Button-1>", on_click)
-        
-        # Обновляем визуальное состояние
-        self._update_thumbnail_visual(thumb_canvas, selection_rect, checkmark, status_label, is_selected)
-        
-        # Возвращаем все элементы виджета
-        return {
-            "frame": thumb_frame,
-            "canvas": thumb_canvas,
-            "selection_rect": selection_rect,
-            "checkmark": checkmark,
-            "status_label": status_label,
-            "page_num": page_num
-        }
+                                     font=("Segoe UI", 9), fill="#666666", tags="content")
+        thumb_canvas.tag_lower("content")
+    
+    def _remember_photo(self, page_num: int, photo_img):
+        """
+        Запоминает PhotoImage страницы. Сверх страниц с виджетами и THUMB_MEMORY_EXTRA_ROWS строк
+        вытесняются давно не показанные миниатюры (их можно восстановить из дискового кэша)
+        """
+        self.thumbnail_images[page_num] = photo_img
+        self.thumbnail_images.move_to_end(page_num)
+        limit = len(self.thumbnail_widgets) + self.THUMB_COLUMNS * self.THUMB_MEMORY_EXTRA_ROWS
+        excess = len(self.thumbnail_images) - limit
+        if excess <= 0:
+            return
+        for old_page in [p for p in self.thumbnail_images if p not in self.thumbnail_widgets][:excess]:
+            del self.thumbnail_images[old_page]
+    
+    def _thumbnail_photo(self, page_num: int):
+        """
+        PhotoImage готовой миниатюры: из памяти или из дискового кэша. Если в кэше её нет,
+        страница снова ставится в рендер. None - миниатюра ещё не готова
+        """
+        photo_img = self.thumbnail_images.get(page_num)
+        if photo_img is not None:
+            self.thumbnail_images.move_to_end(page_num)
+            return photo_img
+        if page_num not in self._thumb_ready:
+            return None
+        png_data = None
+        if self.thumbnail_cache is not None and self._file_hash:
+            png_data = self.thumbnail_cache.get(self._file_hash, page_num, self._thumb_size_key())
+        if png_data is not None:
+            try:
+                photo_img = ImageTk.PhotoImage(Image.open(BytesIO(png_data)).convert("RGB"))
+            except Exception as e:
+                print(f"[WARNING] Повреждённая миниатюра в кэше (стр. {page_num}): {e}")
+        if photo_img is None:
+            self._request_render(page_num)
+            return None
+        self._remember_photo(page_num, photo_img)
+        return photo_img
+    
+    def _show_thumbnail_image(self, page_num):
+        """Подставляет готовую миниатюру (или заглушку ошибки) в уже созданный виджет"""
+        thumb_data = self.thumbnail_widgets.get(page_num)
+        if thumb_data:
+            self._draw_thumbnail_content(thumb_data["canvas"], page_num)
     
     def _update_thumbnail_visual(self, canvas, selection_rect, checkmark, status_label, is_selected):
         """Обновляет визуальное состояние одной миниатюры (без пересоздания)"""
@@ -587,6 +951,7 @@ class PdfPageSelector:
     
     def _toggle_page_selection_smooth(self, page_num):
         """Переключает выбор страницы без мигания"""
+        self._selection_touched = True
         if page_num in self.selected_pages:
             self.selected_pages.remove(page_num)
         else:
@@ -615,9 +980,13 @@ class PdfPageSelector:
     def _update_stats(self):
         """Обновляет статистику выбора"""
         if self.stats_label:
-            self.stats_label.config(
-                text=f"Выбрано страниц: {len(self.selected_pages)} из {self.total_pages}"
-            )
+            text = f"Выбрано страниц: {len(self.selected_pages)} из {self.total_pages}"
+            if self.page_scores:
+                likely = sum(1 for level in self.page_scores.values() if level == 2)
+                text += f"  |  Вероятные спецификации: {likely}"
+                if len(self.page_scores) < self.total_pages:
+                    text += f" (оценено {len(self.page_scores)} из {self.total_pages})"
+            self.stats_label.config(text=text)
     
     def _update_range_entry(self):
         """Обновляет поле ввода на основе выбранных страниц"""
@@ -671,7 +1040,8 @@ class PdfPageSelector:
         
         # Если поле пустое - очищаем выбор
         if not range_str:
-            self._clear_all()
+            if self.selected_pages:
+                self._clear_all()
             return
         
         # Парсим диапазон
@@ -689,6 +1059,7 @@ class PdfPageSelector:
             return
         
         self.selected_pages = new_selection
+        self._selection_touched = True
         
         # Обновляем все миниатюры (но без пересоздания)
         for page_num, thumb_data in self.thumbnail_widgets.items():
@@ -748,6 +1119,7 @@ class PdfPageSelector:
     
     def _select_all(self):
         """Выбрать все страницы"""
+        self._selection_touched = True
         self.selected_pages = set(range(1, self.total_pages + 1))
         
         # Обновляем все миниатюры
@@ -765,6 +1137,7 @@ class PdfPageSelector:
     
     def _clear_all(self):
         """Очистить все выборы"""
+        self._selection_touched = True
         self.selected_pages.clear()
         
         # Обновляем все миниатюры
@@ -803,9 +1176,19 @@ class PdfPageSelector:
     
     def _cleanup(self):
         """Очистка ресурсов"""
+        # Останавливаем фоновый рендер
+        self._stop_thumbnail_rendering()
+        if self._viewport_timer:
+            try:
+                self.dialog.after_cancel(self._viewport_timer)
+            except Exception:
+                pass
+            self._viewport_timer = None
+        
         # Очищаем миниатюры из памяти
         self.thumbnail_images.clear()
         self.thumbnail_widgets.clear()
+        self._free_slots.clear()
         
         # Отменяем таймер, если он активен
         if self._apply_timer:
@@ -1,13 +1,66 @@
 # pdf_parser.py
 import pandas as pd
 import traceback
-from typing import Optional, List, Dict, Any, Callable
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple
 import re
 import os
-import glob
+import time
+import threading
 from datetime import datetime
 import json
+from contextlib import ExitStack, contextmanager
 
+from pdf_cache import PDFParseCache, file_content_hash
+from pdf_memory import MemoryMonitor, TableSpill, SpilledPage
+from pdf_ocr import OCRQueue, find_tesseract, find_image_only_pages
+from pdf_document import PDFDocumentSession, get_page_count
+from pdf_scoring import (RADIATOR_KEYWORDS, PAGE_MIN_TEXT, score_page_text, score_table_text,
+                         page_is_relevant)
+
+# Версия логики извлечения таблиц. Меняется при любом изменении результата парсинга страницы,
+# чтобы дисковый кэш не отдавал устаревшие таблицы
+PARSER_VERSION = "2.2"
+
+# Строковые представления пустых значений - заменяются на '' при очистке таблиц
+_NA_STRINGS = ['nan', 'None', 'NoneType', '<NA>', 'NaT', 'NULL', 'null', 'NaN', 'N/A', 'n/a']
+_NA_REPLACEMENTS = {value: '' for value in _NA_STRINGS}
+# OCR-артефакт "удвоенная буква" (ББ -> Б): пары схлопываются слева направо, цифры и знаки не трогаются
+_DOUBLE_CHAR_RE = re.compile(r'(.)\1', re.DOTALL)
+
+
+def _collapse_double_letter(match) -> str:
+    char = match.group(1)
+    return char if char.isalpha() else match.group(0)
+
+
+class ParseCancelled(Exception):
+    """Парсинг PDF отменён через CancellationToken"""
+
+
+class PageTimeBudgetExceeded(Exception):
+    """Страница не уложилась в лимит времени page_time_budget и пропускается"""
+
+
+class CancellationToken:
+    """
+    Флаг отмены парсинга. Выставляется из любого потока (например, кнопкой в GUI),
+    парсер проверяет его между страницами и между стратегиями извлечения таблиц.
+    Выполняющаяся стратегия не прерывается; в параллельном режиме рабочие процессы при отмене завершаются
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ParseCancelled("Парсинг PDF отменён пользователем")
 
 class PDFParser:
     """
@@ -15,87 +68,312 @@ class PDFParser:
     Автоматизирует чтение, парсинг и переподбор данных из PDF в Excel
     Теперь с пропуском нерелевантных страниц для ускорения обработки
     """
-    def __init__(self, progress_callback: Optional[Callable[[int, int], None]] = None):
+    # Параллельная обработка: минимальное число страниц и максимальный размер блока на процесс
+    PARALLEL_MIN_PAGES = 8
+    PARALLEL_CHUNK_PAGES = 8
+
+    # Стратегии поиска таблиц pdfplumber (порядок по умолчанию)
+    TABLE_STRATEGIES = [
+        {"name": "СТРАТЕГИЯ ПО УМОЛЧАНИЮ", "params": {}},
+        {"name": "ЛИНИИ+ЛИНИИ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "lines"}},
+        {"name": "ТЕКСТ+ТЕКСТ", "params": {"vertical_strategy": "text", "horizontal_strategy": "text"}},
+        {"name": "ЛИНИИ+ТЕКСТ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "text"}},
+        {"name": "ТЕКСТ+ЛИНИИ", "params": {"vertical_strategy": "text", "horizontal_strategy": "lines"}},
+        {"name": "СНИППЕТЫ", "params": {"snap_tolerance": 5, "join_tolerance": 5}},
+    ]
+    # Минимальный балл признаков радиаторов, при котором таблица принимается
+    TABLE_SCORE_THRESHOLD = 3
+    # Сколько страниц с найденными таблицами проходят все стратегии, прежде чем включится адаптивный порядок
+    ADAPTIVE_WARMUP_PAGES = 3
+
+    # Область таблицы спецификации: начала слов шапки (нижний регистр) и слов основной надписи (штампа)
+    TABLE_REGION_HEADER_WORDS = ('наименован', 'кол-во', 'кол.', 'количе', 'коли-')
+    TABLE_REGION_STAMP_WORDS = ('кол.уч',)
+    # Допуск по вертикали (pt): строка шапки и отступ над ней без линии; линия над шапкой ищется в 2x допуске
+    TABLE_REGION_MARGIN = 30
+    # Если область занимает почти всю страницу, страница не обрезается
+    TABLE_REGION_MAX_AREA = 0.95
+
+    # Политики движка парсинга (iter_parse):
+    # выбор страниц - явный список, диапазон, автоотбор страниц с таблицами до обработки
+    PAGE_POLICIES = ("explicit", "range", "auto")
+    # стратегии - адаптивный порядок TABLE_STRATEGIES, все стратегии, две быстрые текстовые стратегии
+    STRATEGY_POLICIES = ("adaptive", "full", "fast")
+    # Режим записи дискового кэша страниц для каждой политики стратегий
+    STRATEGY_CACHE_MODES = {"adaptive": "universal", "full": "full", "fast": "optimized"}
+
+    def __init__(self, progress_callback: Optional[Callable[[int, int], None]] = None,
+                 use_cache: bool = True, cache_dir: Optional[str] = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 page_time_budget: Optional[float] = None,
+                 bounded_memory: bool = False,
+                 memory_ceiling_mb: Optional[float] = None,
+                 debug_mode: bool = False,
+                 use_ocr: bool = True):
         """
         Инициализация парсера
         :param progress_callback: Функция обратного вызова для отслеживания прогресса: callback(current_page, total_pages)
+        :param use_cache: Использовать дисковый кэш таблиц и вердиктов страниц между запусками
+        :param cache_dir: Каталог дискового кэша (None = cache/pdf рядом с программой)
+        :param cancel_token: Токен отмены - при cancel() парсинг прерывается с ParseCancelled
+        :param page_time_budget: Лимит времени на страницу в секундах (None = без лимита).
+                                 Страница, превысившая лимит, пропускается и попадает в сводку.
+                                 Проверяется между стратегиями: одна зависшая стратегия лимитом не прерывается
+        :param bounded_memory: Режим ограниченной памяти: кэши объектов страницы сбрасываются после
+                               обработки, принятые таблицы выгружаются во временные файлы
+        :param memory_ceiling_mb: Лимит RSS процесса в МБ - в режиме ограниченной памяти при превышении
+                                  PDF переоткрывается (освобождаются внутренние кэши pdfminer);
+                                  без bounded_memory только учитывается пик памяти
+        :param debug_mode: Отладочный режим: DEBUG-сообщения и подробный анализ таблиц и итогового
+                           результата (статистика по столбцам, ключевым словам). По умолчанию выключен
+        :param use_ocr: Распознавать страницы-сканы (без текстового слоя) локальным Tesseract, если он установлен
         """
         self.supported_types = {"VK-PROF", "K-PROF"}
-        self.debug_mode = True  # ВКЛЮЧАЕМ ОТЛАДКУ ПО УМОЛЧАНИЮ
+        self.debug_mode = debug_mode
         self.analysis_results = {}
         self.progress_callback = progress_callback
         
+        # Отмена и лимит времени на страницу (проверяются между страницами и между стратегиями)
+        self.cancel_token = cancel_token
+        self.page_time_budget = page_time_budget
+        self._page_deadline: Optional[float] = None
+        self.pages_over_budget: List[int] = []
+        
+        # Режим ограниченной памяти и лимит RSS
+        self.bounded_memory = bounded_memory
+        self.memory_ceiling_mb = memory_ceiling_mb
+        
+        # Открытый документ текущего вызова iter_parse (общий с окном выбора страниц) или None
+        self._session: Optional[PDFDocumentSession] = None
+        
+        # Кэш текстового слоя страниц текущего документа: номер страницы -> текст/слова
+        # Каждая страница декодируется не более одного раза на файл
+        self._page_cache_key = None
+        self._page_text_cache: Dict[int, str] = {}
+        self._page_words_cache: Dict[int, List[Dict[str, Any]]] = {}
+        
+        # OCR страниц-сканов: путь к tesseract или None (OCR недоступен / выключен)
+        self.tesseract_cmd = find_tesseract() if use_ocr else None
+        # Страницы-сканы текущего документа: номер страницы -> хэш изображения
+        self._image_pages: Optional[Dict[int, str]] = None
+        
+        # Вердикты релевантности страниц текущего документа (в памяти): номер страницы -> bool
+        self._page_verdicts: Dict[int, bool] = {}
+        # Быстрый предварительный отбор страниц через PyMuPDF (если установлен)
+        self.use_triage = True
+        # Поиск таблиц только в области спецификации (шапка + линии), без штампа и рамки
+        self.use_table_region = True
+        
+        # Дисковый кэш страниц (по хэшу содержимого PDF); хэш считается один раз на документ.
+        # Версия кэша зависит от настроек, меняющих результат (OCR, область таблицы), - см. _cache_version()
+        self.parse_cache = PDFParseCache(cache_dir, self._cache_version()) if use_cache else None
+        self._document_hash: Optional[str] = None
+        
+        # Статистика стратегий текущего документа: имя стратегии -> число страниц, где она победила
+        self._strategy_wins: Dict[str, int] = {}
+        self._strategy_pages_learned = 0
+        # Сколько валидных таблиц нашли стратегии на последней странице (до проверки баллов радиаторов)
+        self._page_table_candidates = 0
+        
         # Ключевые слова для быстрой проверки страниц (радиаторы и смежная тематика)
-        self.radiator_keywords = [
-            # Основные термины
-            'радиатор', 'радиаторный', 'радиаторная', 'радиаторное', 'радиаторные',
-            'стальной', 'панельный', 'панельная', 'панельное', 'панельные',
-            'отопление', 'отопительный', 'отопительная', 'отопительное', 
-            'конвектор', 'конвекторный',
-            
-            # Типы и серии
-            'тип 11', 'тип 22', 'тип 33', 'тип 21', 'тип 23', 'тип 10', 'тип 20',
-            'h33', 'h22', 'h21', 'c21', 'c22', 'h33-', 'h22-', 'h21-', 'c11',
-            'compact', 'ventil', 'гигиенический', 'hygiene', 'универсал',
-            
-            # Бренды
-            'royal', 'thermo', 'royal thermo', 'buderus', 'kermi', 'purmo', 'purmo',
-            'evra', 'hiterm', 'cv', 'ftv', 'fto', 'ftk',
-            
-            # Подключение
-            'нижним подключением', 'боковым подключением',
-            'нижнее подключение', 'боковое подключение', 'нижний подключение',
-            'универсальное подключение',
-            
-            # Размеры
-            'высотой', 'длиной', 'l=', 'высота', 'длина', 'ширина', 'глубина',
-            '500x800', '300x1000', '400x1200', '600x900',
-            
-            # Английские термины
-            'radiator', 'panel', 'heater', 'steel', 'radiators', 'convector',
-            'panel radiator', 'steel panel',
-            
-            # Для спецификаций
-            'спецификация', 'ведомость', 'оборудование', 'материалы',
-            'позиция', 'наименование', 'марка', 'тип',
-            
-            # Единицы измерения
-            'шт', 'шт.', 'ед', 'ед.', 'pcs', 'pc', 'qty', 'quantity',
-            'кол-во', 'количество', 'единиц',
-            
-            # Мощность
-            'вт', 'ватт', 'watt', 'qn', 'qp', 'мощность', 'теплоотдача',
-            
-            # Регистры
-            'рг-', 'регистр', 'регистровый',
-        ]
+        self.radiator_keywords = list(RADIATOR_KEYWORDS)
     
     def get_pdf_page_count(self, file_path: str) -> int:
         """
-        Получить количество страниц в PDF файле
+        Получить количество страниц в PDF файле (из каталога документа, страницы не разбираются)
         :param file_path: Путь к PDF файлу
         :return: Количество страниц
         """
-        try:
-            import pdfplumber
-            with pdfplumber.open(file_path) as pdf:
-                return len(pdf.pages)
-        except Exception as e:
-            self._log(f"❌ Ошибка при получении количества страниц: {e}", "ERROR")
-            raise RuntimeError(f"Не удалось определить количество страниц в PDF: {e}")
+        total_pages = get_page_count(file_path)
+        if total_pages is None:
+            self._log(f"❌ Ошибка при получении количества страниц: {file_path}", "ERROR")
+            raise RuntimeError(f"Не удалось определить количество страниц в PDF: {file_path}")
+        return total_pages
     def _log(self, message: str, level: str = "INFO"):
-        """Логирование только в консоль"""
+        """Логирование только в консоль (сообщения уровня DEBUG - только в отладочном режиме)"""
+        if level == "DEBUG" and not self.debug_mode:
+            return
         timestamp = datetime.now().strftime('%H:%M:%S')
         log_message = f"[{timestamp}][{level}] {message}"
         print(log_message)
 
+    # ============ ОТМЕНА И ЛИМИТ ВРЕМЕНИ ============
+    def _raise_if_cancelled(self):
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+    def _check_page_interrupts(self, page_num: int):
+        """
+        Проверка между стратегиями: отмена парсинга и лимит времени текущей страницы.
+        Выполняющуюся стратегию (один вызов extract_tables) прервать нельзя: отмена и лимит
+        срабатывают после её завершения. В параллельном режиме при отмене процессы завершаются
+        принудительно, в последовательном - дожидаемся конца текущей стратегии
+        """
+        self._raise_if_cancelled()
+        if self._page_deadline is not None and time.monotonic() > self._page_deadline:
+            raise PageTimeBudgetExceeded(f"Страница {page_num}: превышен лимит времени {self.page_time_budget} с")
+
+    # ============ ОГРАНИЧЕННАЯ ПАМЯТЬ ============
+    def _release_page(self, page, page_num: int):
+        """Сбрасывает кэши объектов страницы pdfplumber (символы, линии, прямоугольники) и её текста"""
+        try:
+            page.close()
+        except AttributeError:
+            # Старые версии pdfplumber: Page.close() нет
+            page.flush_cache()
+        self._page_text_cache.pop(page_num, None)
+        self._page_words_cache.pop(page_num, None)
+
+    def _reopen_if_over_ceiling(self, pdf, file_path: str, memory: MemoryMonitor, pdf_stack: ExitStack):
+        """
+        Переоткрывает PDF, если память процесса превысила лимит (режим ограниченной памяти),
+        не чаще, чем разрешает MemoryMonitor.release_due(). Возвращает актуальный объект PDF
+        """
+        if not memory.release_due():
+            return pdf
+        import gc
+        import pdfplumber
+        self._log(f"🧹 Память {memory.last_mb:.0f} МБ > лимит {memory.ceiling_mb:.0f} МБ: PDF переоткрывается", "WARNING")
+        self._page_text_cache.clear()
+        self._page_words_cache.clear()
+        if self._session is not None:
+            pdf = None
+            gc.collect()
+            return self._session.reopen_plumber()
+        pdf.close()
+        gc.collect()
+        return pdf_stack.enter_context(pdfplumber.open(file_path))
+
+    @contextmanager
+    def _open_fitz(self, file_path: str):
+        """Документ PyMuPDF: общий из сессии или открытый на время блока"""
+        if self._session is not None:
+            with self._session.fitz_document() as doc:
+                yield doc
+        else:
+            import fitz  # PyMuPDF
+            with fitz.open(file_path) as doc:
+                yield doc
+
+    def _retain_tables(self, spill: Optional[TableSpill], page_num: int, page_tables):
+        """В режиме ограниченной памяти таблицы страницы выгружаются на диск, остаётся ссылка"""
+        if spill is None or not page_tables or isinstance(page_tables, SpilledPage):
+            return page_tables
+        return spill.put(page_num, page_tables)
+
+    # ============ КЭШ ТЕКСТА СТРАНИЦ ============
+    def _cache_version(self) -> str:
+        """
+        Версия дискового кэша страниц: с OCR и без него результаты страниц-сканов различаются,
+        без поиска области таблицы таблицы не обрезаются - кэши раздельные
+        """
+        version = PARSER_VERSION
+        if self.tesseract_cmd:
+            version += "-ocr"
+        if not self.use_table_region:
+            version += "-noregion"
+        return version
+
+    def _bind_page_cache(self, file_path: Optional[str]):
+        """
+        Привязывает кэш текста к документу. Кэш сбрасывается, только если
+        открыт другой файл (или файл изменился на диске)
+        """
+        if not file_path:
+            return
+        # use_table_region можно переключить между вызовами - дисковый кэш следует за настройкой
+        if self.parse_cache is not None:
+            self.parse_cache.parser_version = self._cache_version()
+        try:
+            doc_key = (os.path.abspath(file_path), os.path.getmtime(file_path), os.path.getsize(file_path))
+        except OSError:
+            doc_key = (os.path.abspath(file_path), None, None)
+        if doc_key != self._page_cache_key:
+            self._page_cache_key = doc_key
+            self._page_text_cache = {}
+            self._page_words_cache = {}
+            self._document_hash = None
+            self._page_verdicts = {}
+            self._image_pages = None
+            # Новый документ - адаптивный выбор стратегий обучается заново
+            self._strategy_wins = {}
+            self._strategy_pages_learned = 0
+
+    def _get_page_text(self, page, page_num: int) -> str:
+        """Текст страницы (из кэша или однократное извлечение). Пустая строка, если текста нет"""
+        if page_num not in self._page_text_cache:
+            self._page_text_cache[page_num] = page.extract_text() or ""
+        return self._page_text_cache[page_num]
+
+    def _get_page_words(self, page, page_num: int) -> List[Dict[str, Any]]:
+        """Слова страницы с координатами (из кэша или однократное извлечение)"""
+        if page_num not in self._page_words_cache:
+            self._page_words_cache[page_num] = page.extract_words()
+        return self._page_words_cache[page_num]
+
+    # ============ ДИСКОВЫЙ КЭШ СТРАНИЦ ============
+    def _get_document_hash(self) -> Optional[str]:
+        """Хэш содержимого текущего документа (None, если кэш выключен или файл недоступен)"""
+        if self.parse_cache is None or self._page_cache_key is None:
+            return None
+        if self._document_hash is None:
+            try:
+                if self._session is not None:
+                    self._document_hash = self._session.content_hash()
+                else:
+                    self._document_hash = file_content_hash(self._page_cache_key[0])
+            except OSError as e:
+                self._log(f"⚠️ Не удалось вычислить хэш PDF для кэша: {e}", "WARNING")
+                return None
+        return self._document_hash
+
+    def _cached_verdict(self, page_num: int) -> Optional[bool]:
+        if page_num in self._page_verdicts:
+            return self._page_verdicts[page_num]
+        doc_hash = self._get_document_hash()
+        verdict = self.parse_cache.get_verdict(doc_hash, page_num) if doc_hash else None
+        if verdict is not None:
+            self._page_verdicts[page_num] = verdict
+        return verdict
+
+    def _store_verdict(self, page_num: int, verdict: bool):
+        self._page_verdicts[page_num] = verdict
+        doc_hash = self._get_document_hash()
+        if doc_hash:
+            self.parse_cache.put_verdict(doc_hash, page_num, verdict)
+
+    def _cached_tables(self, page_num: int, mode: str) -> Optional[List[pd.DataFrame]]:
+        doc_hash = self._get_document_hash()
+        return self.parse_cache.get_tables(doc_hash, page_num, mode) if doc_hash else None
+
+    def _store_tables(self, page_num: int, mode: str, tables: List[pd.DataFrame]):
+        doc_hash = self._get_document_hash()
+        if doc_hash:
+            self.parse_cache.put_tables(doc_hash, page_num, mode, tables)
+
+    def _cached_page_result(self, page_num: int, mode: str = "universal"):
+        """
+        Результат страницы из дискового кэша
+        :return: (есть_в_кэше, таблицы или None для пропущенной страницы)
+        """
+        verdict = self._cached_verdict(page_num)
+        if verdict is False:
+            return True, None
+        if verdict:
+            tables = self._cached_tables(page_num, mode)
+            if tables is not None:
+                return True, tables
+        return False, None
+
     def _log_table_info(self, table: List, table_name: str):
-        """Логирование информации о таблице"""
+        """Логирование информации о таблице (только в отладочном режиме)"""
+        if not self.debug_mode:
+            return
         if not table:
             self._log(f"📭 Таблица {table_name}: ПУСТАЯ", "DEBUG")
             return
         rows_count = len(table)
-        cols_count = max(len(row) for row in table) if table else 0
+        cols_count = max(len(row) for row in table)
         non_empty_cells = sum(1 for row in table for cell in row if cell and str(cell).strip())
         self._log(f"📊 Таблица {table_name}: {rows_count} строк, {cols_count} колонок, {non_empty_cells} непустых ячеек", "DEBUG")
         for i, row in enumerate(table[:2]):
@@ -106,53 +384,86 @@ class PDFParser:
     def _should_process_page(self, page, page_num: int) -> bool:
         """
         Быстрая проверка, стоит ли обрабатывать страницу
-        Возвращает True если на странице есть признаки таблиц с радиаторами
+        Возвращает True если на странице есть признаки таблиц с радиаторами.
+        Вердикт берётся из дискового кэша, если страница уже проверялась
+        """
+        verdict = self._cached_verdict(page_num)
+        if verdict is not None:
+            self._log(f"📄 Страница {page_num}: вердикт из кэша - {'ОБРАБОТКА' if verdict else 'ПРОПУСК'}", "CACHE")
+            return verdict
+        
+        verdict = self._evaluate_page_relevance(page, page_num)
+        self._store_verdict(page_num, verdict)
+        return verdict
+
+    # ============ БЫСТРЫЙ ОТБОР СТРАНИЦ ЧЕРЕЗ PYMUPDF ============
+    def _triage_pages(self, file_path: str, page_nums: List[int]) -> Optional[List[int]]:
+        """
+        Предварительный отбор страниц: текст берётся через PyMuPDF (fitz), который декодирует
+        текстовый слой в разы быстрее pdfplumber, и оценивается теми же правилами.
+        Отбор только отрицательный: страница без признаков радиаторов в тексте PyMuPDF
+        пропускается сразу, а окончательное решение по кандидатам принимает обычная проверка
+        через pdfplumber (тексты библиотек могут различаться на OCR-слоях и (cid:..) шрифтах).
+        :return: Список страниц-кандидатов или None, если PyMuPDF недоступен
         """
+        if not self.use_triage:
+            return None
+        try:
+            import fitz  # PyMuPDF
+        except ImportError:
+            return None
+        
+        pending = [page_num for page_num in page_nums if self._cached_verdict(page_num) is None]
+        rejected = set()
+        if pending:
+            started = datetime.now()
+            try:
+                with self._open_fitz(file_path) as doc:
+                    for page_num in pending:
+                        text = doc[page_num - 1].get_text("text") or ""
+                        if not self._is_relevant_text(text, page_num):
+                            rejected.add(page_num)
+            except Exception as e:
+                self._log(f"⚠️ Быстрый отбор страниц (PyMuPDF) не выполнен: {e}", "WARNING")
+                return None
+            for page_num in rejected:
+                self._store_verdict(page_num, False)
+            elapsed = (datetime.now() - started).total_seconds()
+            self._log(f"⚡ Быстрый отбор PyMuPDF: {len(pending)} стр. за {elapsed:.2f} с, отсеяно {len(rejected)}")
+        
+        # Страницы с уже известным положительным вердиктом или ещё не решённые - кандидаты
+        candidates = [page_num for page_num in page_nums if self._cached_verdict(page_num) is not False]
+        self._log(f"⚡ Страниц-кандидатов для pdfplumber: {len(candidates)} из {len(page_nums)}")
+        return candidates
+
+    def _evaluate_page_relevance(self, page, page_num: int) -> bool:
+        """Анализ текста страницы на признаки таблиц с радиаторами"""
+        try:
+            # 1. Извлекаем текст страницы (из кэша, если уже декодирован)
+            text = self._get_page_text(page, page_num)
+            return self._is_relevant_text(text, page_num)
+        except Exception as e:
+            self._log(f"⚠️ Ошибка при проверке страницы {page_num}: {e}", "DEBUG")
+            # В случае ошибки лучше обработать страницу (безопасный режим)
+            return True
+
+    def _is_relevant_text(self, text: str, page_num: int) -> bool:
+        """Решение по тексту страницы: есть ли признаки таблиц с радиаторами"""
         try:
-            # 1. Извлекаем текст страницы
-            text = page.extract_text()
-            
             # 2. Если текст очень короткий (< 50 символов) - вероятно, это чертеж/схема
-            if not text or len(text.strip()) < 50:
+            if not text or len(text.strip()) < PAGE_MIN_TEXT:
                 self._log(f"📄 Страница {page_num}: ПРОПУСК (мало текста, вероятно чертеж)", "SKIP")
                 return False
             
             text_lower = text.lower()
             
-            # 3. Проверяем наличие ключевых слов (РАСШИРЕННЫЙ СПИСОК)
-            found_keywords = []
-            for keyword in self.radiator_keywords:
-                if keyword in text_lower:
-                    found_keywords.append(keyword)
-            
-            # 4. Проверяем специфические паттерны радиаторов (РАСШИРЕННЫЕ)
-            radiator_patterns = [
-                r'\b[HСCКK]\d{1,2}[-\s]*\d{3,4}[-\s]*\d{3,4}\b',  # H33-200-1000, C21-300-600
-                r'\bPURMO\s+[CHK]\s*\d{1,2}',  # PURMO C 21, PURMO H 20
-                r'\bтип\s*\d+\s*[Ll]\s*[=:]\s*\d+\s*мм',
-                r'\bвысотой\s*\d+\s*мм',
-                r'\bдлин[аой]\s*\d+\s*мм',
-                r'\b\d{3,4}\s*[xх×]\s*\d{3,4}\s*Вт\b',  # 500x800 Вт
-                r'\b[Qq][нp]\s*[=:]\s*\d+\s*Вт\b',  # Qн=2356 Вт
-                r'\b(?:радиатор|конвектор)\s*[^.]{0,50}\d+\s*шт\b',  # радиатор ... 2 шт
-            ]
-            
-            found_patterns = []
-            for pattern in radiator_patterns:
-                if re.search(pattern, text_lower, re.IGNORECASE):
-                    found_patterns.append(pattern)
-            
-            # 5. Ищем столбец "Количество" или "Кол-во" (разные варианты)
-            has_quantity_column = re.search(
-                r'коли[ -]?чество|кол[ -]?во|ед\.|шт\.|pcs|pc|qty|единиц|штук',
-                text_lower
-            )
-            
-            # 6. Ищем спецификации/ведомости
-            has_spec_header = re.search(
-                r'спецификация|ведомость|оборудован[иея]|материал[ыов]|позиция|наименование',
-                text_lower
-            )
+            # 3-6. Ключевые слова, паттерны радиаторов, столбец количества и заголовок
+            # спецификации - предкомпилированные наборы правил, один проход по тексту (pdf_scoring)
+            page_score = score_page_text(text_lower, self.radiator_keywords)
+            found_keywords = page_score['keywords']
+            found_patterns = page_score['patterns']
+            has_quantity_column = 'количество' in page_score['features']
+            has_spec_header = 'спецификация' in page_score['features']
             
             # 7. Логируем что нашли
             if found_keywords:
@@ -163,19 +474,14 @@ class PDFParser:
                 self._log(f"📄 Страница {page_num}: есть столбец количества", "CHECK")
             if has_spec_header:
                 self._log(f"📄 Страница {page_num}: есть заголовок спецификации", "CHECK")
+            if 'модель_PURMO' in page_score['features']:
+                self._log(f"📄 Страница {page_num}: найдены модели PURMO", "CHECK")
             
-            # 8. Критерии для обработки страницы (БОЛЕЕ ГИБКИЕ):
+            # 8. Критерии для обработки страницы (БОЛЕЕ ГИБКИЕ, общие с окном выбора страниц):
             # - Есть ключевые слова ИЛИ паттерны
             # - И (столбец количества ИЛИ заголовок спецификации)
-            should_process = (
-                (len(found_keywords) >= 1 or len(found_patterns) >= 1) and 
-                (has_quantity_column or has_spec_header)
-            )
-            
-            # Дополнительный критерий: если есть четкие модели PURMO, обрабатываем
-            if not should_process and re.search(r'PURMO\s+[CHK]\s*\d{1,2}', text_lower):
-                self._log(f"📄 Страница {page_num}: найдены модели PURMO, обрабатываем", "CHECK")
-                should_process = True
+            # - Либо четкие модели PURMO
+            should_process = page_is_relevant(page_score)
             
             if not should_process:
                 self._log(f"📄 Страница {page_num}: ПРОПУСК (нет признаков таблиц с радиаторами)", "SKIP")
@@ -404,7 +710,12 @@ class PDFParser:
                         start_page: int = 1, 
                         end_page: Optional[int] = None,
                         max_pages: Optional[int] = None,
-                        pages: Optional[List[int]] = None) -> pd.DataFrame:
+                        pages: Optional[List[int]] = None,
+                        workers: int = 1,
+                        page_policy: Optional[str] = None,
+                        strategy_policy: str = "adaptive",
+                        bounded_memory: Optional[bool] = None,
+                        session: Optional[PDFDocumentSession] = None) -> pd.DataFrame:
         """
         ГЛАВНЫЙ МЕТОД - парсит ЛЮБОЙ PDF в DataFrame с оптимизацией скорости
         Пропускает страницы без признаков таблиц с радиаторами
@@ -415,8 +726,64 @@ class PDFParser:
         :param end_page: Номер последней страницы для обработки (None = до конца) - используется если pages=None
         :param max_pages: Максимальное количество страниц для обработки - используется если pages=None
         :param pages: Список конкретных страниц для обработки (номера с 1). Если задан, игнорирует start_page/end_page/max_pages
+        :param workers: Количество рабочих процессов (1 = последовательная обработка).
+                        Параллельный режим включается, если страниц не меньше PARALLEL_MIN_PAGES
+        :param page_policy: Политика выбора страниц (PAGE_POLICIES), по умолчанию explicit при заданном pages, иначе range
+        :param strategy_policy: Политика стратегий извлечения таблиц (STRATEGY_POLICIES)
+        :param bounded_memory: Режим ограниченной памяти для этого вызова (None = настройка парсера)
+        :param session: Уже открытый документ (PDFDocumentSession) - файл не открывается повторно
         :return: DataFrame с результатами парсинга
         """
+        result_df = pd.DataFrame()
+        for event in self.iter_parse(file_path, start_page=start_page, end_page=end_page, max_pages=max_pages,
+                                     pages=pages, workers=workers, extract_radiators=False,
+                                     page_policy=page_policy, strategy_policy=strategy_policy,
+                                     bounded_memory=bounded_memory, session=session):
+            if event['page'] is None:
+                result_df = event['result']
+        return result_df
+
+    def iter_parse(self, file_path: str,
+                   start_page: int = 1,
+                   end_page: Optional[int] = None,
+                   max_pages: Optional[int] = None,
+                   pages: Optional[List[int]] = None,
+                   workers: int = 1,
+                   extract_radiators: bool = True,
+                   page_policy: Optional[str] = None,
+                   strategy_policy: str = "adaptive",
+                   bounded_memory: Optional[bool] = None,
+                   session: Optional[PDFDocumentSession] = None) -> Iterator[Dict[str, Any]]:
+        """
+        ДВИЖОК ПАРСИНГА - генератор результатов по мере готовности страниц.
+        Все способы загрузки PDF (parse_to_dataframe, parse_optimized, quick_parse_only_tables,
+        parse_with_lazy_loading, ...) работают через него, поэтому кэш текста, быстрый отбор страниц,
+        дисковый кэш, параллельность и ограничение памяти действуют везде.
+        Параметры те же, что у parse_to_dataframe.
+        
+        Политики выбора страниц (page_policy):
+            explicit - список pages; range - диапазон start_page/end_page/max_pages;
+            auto - страницы списка/диапазона сначала проверяются на признаки таблиц с радиаторами,
+                   обрабатываются и учитываются в прогрессе только подходящие
+        Политики стратегий (strategy_policy):
+            adaptive - TABLE_STRATEGIES, после обучения лучшая стратегия первой и ранний выход;
+            full - все TABLE_STRATEGIES на каждой странице; fast - две текстовые стратегии, самая длинная таблица
+        
+        Событие страницы (страницы из кэша - сразу, остальные - по мере обработки,
+        в параллельном режиме порядок страниц может не совпадать с порядком в документе):
+            {'page': номер, 'tables': список принятых таблиц (None = страница пропущена),
+             'table': лучшая таблица страницы или None, 'radiators': распознанные радиаторы таблицы,
+             'done': готово страниц, 'total': всего страниц}
+        Последнее событие - итог, такой же, как возвращает parse_to_dataframe:
+            {'page': None, 'result': DataFrame, 'done': ..., 'total': ...,
+             'pages_over_budget': страницы, пропущенные по лимиту времени,
+             'peak_rss_mb': пик памяти процесса в МБ или None}
+        При отмене через cancel_token генератор завершается исключением ParseCancelled.
+        
+        :param extract_radiators: Распознавать радиаторы в таблице каждой страницы (ключ 'radiators')
+        :param session: Уже открытый документ (PDFDocumentSession): документы pdfplumber и PyMuPDF
+                        и хэш файла берутся из сессии и не закрываются по окончании
+        """
         try:
             import pdfplumber
         except ImportError:
@@ -425,8 +792,21 @@ class PDFParser:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"❌ ФАЙЛ НЕ НАЙДЕН: {file_path}")
         
+        if page_policy is None:
+            page_policy = "explicit" if pages is not None else "range"
+        if page_policy not in self.PAGE_POLICIES:
+            raise ValueError(f"Неизвестная политика выбора страниц: {page_policy} (допустимо: {self.PAGE_POLICIES})")
+        if page_policy == "explicit" and pages is None:
+            raise ValueError("Политика выбора страниц explicit требует список pages")
+        if strategy_policy not in self.STRATEGY_POLICIES:
+            raise ValueError(f"Неизвестная политика стратегий: {strategy_policy} (допустимо: {self.STRATEGY_POLICIES})")
+        cache_mode = self.STRATEGY_CACHE_MODES[strategy_policy]
+        bounded = self.bounded_memory if bounded_memory is None else bounded_memory
+        
         self._log("🚀" * 50)
         self._log(f"🚀 ЗАПУСК ОПТИМИЗИРОВАННОГО ПАРСИНГА PDF: {os.path.basename(file_path)}")
+        self._log(f"⚙️  Политики: страницы - {page_policy}, стратегии - {strategy_policy}"
+                  f"{', ограниченная память' if bounded else ''}")
         
         # Определяем режим работы
         if pages is not None:
@@ -449,8 +829,21 @@ class PDFParser:
             all_tables = []
             total_pages_processed = 0
             total_pages_skipped = 0
+            self.pages_over_budget = []
+            memory = MemoryMonitor(self.memory_ceiling_mb)
+            memory.sample()
             
-            with pdfplumber.open(file_path) as pdf:
+            self._bind_page_cache(file_path)
+            if session is not None and os.path.abspath(session.file_path) == os.path.abspath(file_path):
+                self._session = session
+            with ExitStack() as pdf_stack:
+                if self._session is not None:
+                    pdf = self._session.plumber()
+                else:
+                    pdf = pdf_stack.enter_context(pdfplumber.open(file_path))
+                spill = pdf_stack.enter_context(TableSpill()) if bounded else None
+                if spill is not None:
+                    self._log(f"🧹 РЕЖИМ ОГРАНИЧЕННОЙ ПАМЯТИ: таблицы страниц выгружаются в {spill.dir}")
                 total_pages_in_pdf = len(pdf.pages)
                 self._log(f"📄 ОБНАРУЖЕНО СТРАНИЦ В PDF: {total_pages_in_pdf}")
                 
@@ -507,48 +900,136 @@ class PDFParser:
                     # Создаем список всех страниц в диапазоне
                     pages_to_process = list(range(start_page, end_page + 1))
                 
+                if page_policy == "auto":
+                    # Автоотбор: сначала находим все страницы с признаками таблиц радиаторов
+                    # (быстрый отбор PyMuPDF + проверка pdfplumber), обрабатываем только их
+                    self._log("🔍 Автоматически ищу страницы с таблицами...")
+                    # Страницы-сканы до OCR оценить нельзя - они остаются в списке
+                    scanned = self._find_ocr_pages(file_path, pages_to_process)
+                    text_pages = [page_num for page_num in pages_to_process if page_num not in scanned]
+                    triaged = self._triage_pages(file_path, text_pages)
+                    selected_pages = list(scanned)
+                    for page_num in (triaged if triaged is not None else text_pages):
+                        self._raise_if_cancelled()
+                        if self._should_process_page(pdf.pages[page_num - 1], page_num):
+                            selected_pages.append(page_num)
+                    selected_pages.sort()
+                    self._log(f"✅ Найдено страниц с таблицами: {len(selected_pages)} из {len(pages_to_process)}")
+                    pages_to_process = selected_pages
+                
                 self._log(f"📄 ФИНАЛЬНЫЙ СПИСОК СТРАНИЦ ДЛЯ ОБРАБОТКИ: {pages_to_process[:10]}{'...' if len(pages_to_process) > 10 else ''}")
                 self._log(f"📄 ВСЕГО ДЛЯ ОБРАБОТКИ: {len(pages_to_process)} стр.")
                 
-                # Быстрый анализ структуры только первых страниц
-                analysis_pages = min(3, len(pages_to_process))
-                for i in range(analysis_pages):
-                    page_idx = pages_to_process[i] - 1
-                    if page_idx < len(pdf.pages):
-                        page = pdf.pages[page_idx]
-                        text_preview = page.extract_text()[:100] if page.extract_text() else "Нет текста"
-                        self._log(f"🔍 Превью стр. {pages_to_process[i]}: {text_preview}...")
-                
                 # Обрабатываем только выбранные страницы
-                for idx, page_num in enumerate(pages_to_process):
-                    page_idx = page_num - 1
-                    page = pdf.pages[page_idx]
-                    
-                    # 🔥 ВЫЗЫВАЕМ ОБРАТНЫЙ ВЫЗОВ ПРОГРЕССА (если задан)
+                # page_results: номер страницы -> список таблиц (None = страница пропущена)
+                # Страницы, уже обработанные ранее, берём из дискового кэша
+                page_results = {}
+                pages_missing = []
+                for page_num in pages_to_process:
+                    hit, cached_tables = self._cached_page_result(page_num, cache_mode)
+                    if hit:
+                        page_results[page_num] = cached_tables
+                    else:
+                        pages_missing.append(page_num)
+                if page_results:
+                    self._log(f"💾 Из кэша: {len(page_results)} стр., к обработке: {len(pages_missing)} стр.")
                     if self.progress_callback:
-                        # Прогресс относительно общего количества обрабатываемых страниц
-                        current_in_range = idx + 1
-                        total_in_range = len(pages_to_process)
-                        self.progress_callback(current_in_range, total_in_range)
-                    
-                    # 🔥 БЫСТРАЯ ПРОВЕРКА: СТОИТ ЛИ ОБРАБАТЫВАТЬ ЭТУ СТРАНИЦУ?
-                    if not self._should_process_page(page, page_num):
+                        self.progress_callback(len(page_results), len(pages_to_process))
+                
+                total_events = len(pages_to_process)
+                events_done = 0
+                for page_num in sorted(page_results):
+                    events_done += 1
+                    yield self._page_event(page_num, page_results[page_num], events_done, total_events,
+                                           extract_radiators)
+                    page_results[page_num] = self._retain_tables(spill, page_num, page_results[page_num])
+                
+                # 🔠 Страницы-сканы - в очередь OCR (отдельный пул), текстовые страницы её не ждут
+                ocr_jobs = {}
+                scanned = self._find_ocr_pages(file_path, pages_missing)
+                if scanned:
+                    ocr_queue = pdf_stack.enter_context(OCRQueue(
+                        self.tesseract_cmd,
+                        os.path.join(self.parse_cache.cache_dir, "ocr") if self.parse_cache else None))
+                    ocr_jobs = {ocr_queue.submit(file_path, page_num, image_hash): page_num
+                                for page_num, image_hash in scanned.items()}
+                    pages_missing = [page_num for page_num in pages_missing if page_num not in scanned]
+                    self._log(f"🔠 Страниц-сканов в очереди OCR: {len(scanned)} ({sorted(scanned)[:10]})")
+                
+                # ⚡ Быстрый отбор: страницы без признаков радиаторов не открываются в pdfplumber
+                candidates = self._triage_pages(file_path, pages_missing)
+                if candidates is not None:
+                    candidate_set = set(candidates)
+                    for page_num in pages_missing:
+                        if page_num not in candidate_set:
+                            page_results[page_num] = None
+                            events_done += 1
+                            yield self._page_event(page_num, None, events_done, total_events, extract_radiators)
+                    pages_missing = candidates
+                
+                # Быстрый анализ структуры только первых необработанных страниц
+                for page_num in pages_missing[:3]:
+                    page = pdf.pages[page_num - 1]
+                    text_preview = self._get_page_text(page, page_num)[:100] or "Нет текста"
+                    self._log(f"🔍 Превью стр. {page_num}: {text_preview}...")
+                
+                use_parallel = workers > 1 and len(pages_missing) >= self.PARALLEL_MIN_PAGES
+                if use_parallel:
+                    offset = len(page_results)
+                    for page_num, page_tables in self._iter_pages_parallel(file_path, pages_missing, workers,
+                                                                           progress_offset=offset,
+                                                                           progress_total=len(pages_to_process),
+                                                                           strategy_policy=strategy_policy,
+                                                                           bounded_memory=bounded):
+                        events_done += 1
+                        yield self._page_event(page_num, page_tables, events_done, total_events, extract_radiators)
+                        page_results[page_num] = self._retain_tables(spill, page_num, page_tables)
+                        memory.sample()
+                else:
+                    for page_num in pages_missing:
+                        self._raise_if_cancelled()
+                        page = pdf.pages[page_num - 1]
+                        page_tables = self._process_page_cached(page, page_num, strategy_policy)
+                        page_results[page_num] = page_tables
+                        if bounded:
+                            self._release_page(page, page_num)
+                        events_done += 1
+                        yield self._page_event(page_num, page_tables, events_done, total_events,
+                                               extract_radiators)
+                        page_results[page_num] = self._retain_tables(spill, page_num, page_tables)
+                        del page_tables
+                        if bounded:
+                            pdf = self._reopen_if_over_ceiling(pdf, file_path, memory, pdf_stack)
+                        else:
+                            memory.sample()
+                        
+                        # 🔥 ВЫЗЫВАЕМ ОБРАТНЫЙ ВЫЗОВ ПРОГРЕССА (если задан)
+                        if self.progress_callback:
+                            # Прогресс относительно общего количества обрабатываемых страниц
+                            self.progress_callback(len(page_results), len(pages_to_process))
+                        
+                        self._log(f"📖 Прогресс: {len(page_results)}/{len(pages_to_process)} (в PDF: стр. {page_num}/{total_pages_in_pdf})")
+                
+                # Распознанные страницы-сканы - по мере готовности OCR
+                for page_num, page_tables in self._iter_ocr_pages(ocr_jobs, strategy_policy):
+                    events_done += 1
+                    yield self._page_event(page_num, page_tables, events_done, total_events, extract_radiators)
+                    page_results[page_num] = self._retain_tables(spill, page_num, page_tables)
+                    memory.sample()
+                    if self.progress_callback:
+                        self.progress_callback(len(page_results), len(pages_to_process))
+                
+                # Собираем результаты строго в порядке страниц
+                for page_num in pages_to_process:
+                    page_tables = page_results.get(page_num)
+                    if page_tables is None:
                         total_pages_skipped += 1
                         continue
-                    
-                    self._log(f"\n📖 {'='*60}")
-                    self._log(f"📖 ОБРАБОТКА СТРАНИЦЫ {page_num} (в PDF: стр. {page_num}/{total_pages_in_pdf})")
-                    self._log(f"📖 Прогресс: {idx + 1}/{len(pages_to_process)}")
-                    self._log(f"📖 {'='*60}")
-                    
-                    page_tables = self._extract_tables_universal(page, page_num)
                     if page_tables:
+                        if isinstance(page_tables, SpilledPage):
+                            page_tables = page_tables.load()
                         all_tables.extend(page_tables)
                         total_pages_processed += 1
-                    
-                    # Анализ текста только если есть таблицы
-                    if page_tables:
-                        self._extract_and_analyze_text(page, page_num)
             
             # Сводка по обработке
             self._log(f"\n📊 {'='*60}")
@@ -564,6 +1045,13 @@ class PDFParser:
             self._log(f"📊 Обработано страниц: {total_pages_processed}")
             self._log(f"📊 Пропущено страниц: {total_pages_skipped}")
             self._log(f"📊 Найдено таблиц: {len(all_tables)}")
+            memory.sample()
+            if memory.peak_mb is not None:
+                ceiling_info = f" (лимит {memory.ceiling_mb:.0f} МБ)" if memory.ceiling_mb else ""
+                self._log(f"📊 Пик памяти (RSS): {memory.peak_mb:.0f} МБ{ceiling_info}")
+            if self.pages_over_budget:
+                self._log(f"📊 Пропущено по лимиту времени ({self.page_time_budget} с/стр.): "
+                          f"{sorted(self.pages_over_budget)}", "WARNING")
             
             if pages_to_process and (min(pages_to_process) > 1 or max(pages_to_process) < total_pages_in_pdf):
                 self._log(f"📊 Парсинг выполнен не полностью: обработано {len(pages_to_process)} из {total_pages_in_pdf} страниц")
@@ -571,7 +1059,8 @@ class PDFParser:
             if max_pages and len(pages_to_process) >= max_pages:
                 self._log(f"📊 Достигнуто ограничение max_pages: {max_pages}")
                 
-            self._log(f"📊 Экономия времени: {(total_pages_skipped/len(pages_to_process))*100:.1f}% страниц пропущено")
+            if pages_to_process:
+                self._log(f"📊 Экономия времени: {(total_pages_skipped/len(pages_to_process))*100:.1f}% страниц пропущено")
             self._log(f"📊 {'='*60}")
             
             if all_tables:
@@ -586,6 +1075,9 @@ class PDFParser:
                 
                 self._log(f"📊 Выбрано {len(best_tables)} лучших таблиц из {len(all_tables)}")
                 result_df = self._merge_all_tables(best_tables)
+                if strategy_policy == "fast" and len(best_tables) == 1:
+                    # Быстрый режим всегда чистит пустые строки/столбцы, даже у единственной таблицы
+                    result_df = self._final_cleanup(result_df)
             else:
                 result_df = pd.DataFrame()
             
@@ -605,12 +1097,271 @@ class PDFParser:
             else:
                 self._log("⚠️ ВНИМАНИЕ: В PDF НЕ НАЙДЕНО ТАБЛИЧНЫХ ДАННЫХ")
             
-            return result_df
+            yield {'page': None, 'result': result_df, 'done': len(pages_to_process), 'total': len(pages_to_process),
+                   'pages_over_budget': sorted(self.pages_over_budget), 'peak_rss_mb': memory.peak_mb}
             
+        except GeneratorExit:
+            # Потребитель прекратил чтение результатов - это не ошибка
+            raise
+        except ParseCancelled:
+            self._log(f"⛔ ПАРСИНГ ОТМЕНЁН: {os.path.basename(file_path)}", "WARNING")
+            raise
         except Exception as e:
             error_msg = f"❌ КРИТИЧЕСКАЯ ОШИБКА ПАРСИНГА {file_path}:\n{str(e)}\n{traceback.format_exc()}"
             self._log(error_msg, "ERROR")
             raise RuntimeError(error_msg)
+        finally:
+            self._session = None
+
+    def _page_event(self, page_num: int, page_tables: Optional[List[pd.DataFrame]],
+                    done: int, total: int, extract_radiators: bool = True) -> Dict[str, Any]:
+        """Событие потокового парсинга для одной готовой страницы"""
+        best_table = page_tables[0] if page_tables else None
+        radiators = []
+        if extract_radiators and best_table is not None:
+            radiators = self.extract_radiators_from_dataframe(self._replace_na_values(best_table))
+        return {'page': page_num, 'tables': page_tables, 'table': best_table, 'radiators': radiators,
+                'done': done, 'total': total}
+
+    # ============ ОБРАБОТКА ОДНОЙ СТРАНИЦЫ ============
+    def _process_page(self, page, page_num: int, strategy_policy: str = "adaptive") -> Optional[List[pd.DataFrame]]:
+        """
+        Полная обработка одной страницы: быстрая проверка, извлечение таблиц, анализ текста
+        :param strategy_policy: Политика стратегий извлечения таблиц (STRATEGY_POLICIES)
+        :return: Список таблиц страницы или None, если страница пропущена
+        """
+        self._raise_if_cancelled()
+        if self.page_time_budget:
+            self._page_deadline = time.monotonic() + self.page_time_budget
+        try:
+            # 🔥 БЫСТРАЯ ПРОВЕРКА: СТОИТ ЛИ ОБРАБАТЫВАТЬ ЭТУ СТРАНИЦУ?
+            if not self._should_process_page(page, page_num):
+                return None
+            
+            self._log(f"\n📖 {'='*60}")
+            self._log(f"📖 ОБРАБОТКА СТРАНИЦЫ {page_num}")
+            self._log(f"📖 {'='*60}")
+            
+            page_tables = self._extract_page_tables(page, page_num, strategy_policy)
+            
+            # Анализ текста только если есть таблицы
+            if page_tables:
+                self._extract_and_analyze_text(page, page_num)
+            return page_tables
+        except PageTimeBudgetExceeded as e:
+            # Результат не кэшируется - при следующем открытии страница будет обработана снова
+            self._log(f"⏱️ {e} - страница пропущена", "WARNING")
+            self.pages_over_budget.append(page_num)
+            return None
+        finally:
+            self._page_deadline = None
+
+    def _process_page_cached(self, page, page_num: int,
+                             strategy_policy: str = "adaptive") -> Optional[List[pd.DataFrame]]:
+        """_process_page с использованием дискового кэша (результат сохраняется в кэш)"""
+        cache_mode = self.STRATEGY_CACHE_MODES[strategy_policy]
+        hit, page_tables = self._cached_page_result(page_num, cache_mode)
+        if hit:
+            self._log(f"💾 Страница {page_num}: результат из кэша ({len(page_tables) if page_tables is not None else 'пропуск'})", "CACHE")
+            return page_tables
+        page_tables = self._process_page(page, page_num, strategy_policy)
+        if page_tables is not None:
+            self._store_tables(page_num, cache_mode, page_tables)
+        return page_tables
+
+    def _extract_page_tables(self, page, page_num: int, strategy_policy: str = "adaptive") -> List[pd.DataFrame]:
+        """
+        Таблицы страницы по политике стратегий. Если найдена область спецификации, стратегии
+        работают только по ней; поиск по всей странице - только если в области не нашлось
+        ни одной валидной таблицы (таблицы, отброшенные по баллам, повторно не ищутся)
+        """
+        region = self._detect_table_region(page, page_num) if self.use_table_region else None
+        if region is not None:
+            try:
+                region_page = page.crop(region)
+            except ValueError as e:
+                self._log(f"⚠️ Страница {page_num}: не удалось обрезать по области таблицы: {e}", "DEBUG")
+            else:
+                self._log(f"✂️ Страница {page_num}: поиск таблиц в области {tuple(round(v) for v in region)}")
+                page_tables = self._extract_tables_by_policy(region_page, page_num, strategy_policy)
+                # Таблицы в области были, но не прошли проверку баллов - на всей странице их не больше,
+                # повторный прогон стратегий только удвоил бы время страницы
+                if page_tables or self._page_table_candidates:
+                    return page_tables
+                self._log(f"↩️ Страница {page_num}: в области таблиц нет - поиск по всей странице")
+        return self._extract_tables_by_policy(page, page_num, strategy_policy)
+
+    def _extract_tables_by_policy(self, page, page_num: int, strategy_policy: str) -> List[pd.DataFrame]:
+        if strategy_policy == "fast":
+            best_table = self._extract_best_table_optimized(page, page_num)
+            return [best_table] if best_table is not None else []
+        return self._extract_tables_universal(page, page_num, adaptive=(strategy_policy == "adaptive"))
+
+    # ============ OCR СТРАНИЦ-СКАНОВ ============
+    def _find_ocr_pages(self, file_path: str, page_nums: List[int]) -> Dict[int, str]:
+        """
+        Страницы-сканы из списка, которым нужен OCR: нет текстового слоя, одно изображение на всю страницу,
+        вердикт ещё неизвестен. Пусто, если tesseract не найден (страницы идут обычным путём и пропускаются)
+        :return: Номер страницы -> хэш изображения (ключ кэша OCR)
+        """
+        if not self.tesseract_cmd or not page_nums:
+            return {}
+        if self._image_pages is None:
+            self._image_pages = {}
+        unknown = [page_num for page_num in page_nums
+                   if page_num not in self._image_pages and self._cached_verdict(page_num) is None]
+        if unknown:
+            try:
+                with self._open_fitz(file_path) as doc:
+                    self._image_pages.update(find_image_only_pages(file_path, unknown, doc))
+            except Exception as e:
+                self._log(f"⚠️ Поиск страниц-сканов не выполнен: {e}", "WARNING")
+        return {page_num: self._image_pages[page_num] for page_num in page_nums
+                if page_num in self._image_pages and self._cached_verdict(page_num) is None}
+
+    def _iter_ocr_pages(self, ocr_jobs: Dict[Any, int], strategy_policy: str) -> Iterator[tuple]:
+        """
+        Обработка страниц-сканов по мере готовности OCR: страница PDF с текстовым слоем от tesseract
+        проходит обычную проверку и извлечение таблиц под своим номером
+        :return: Генератор пар (номер страницы, список таблиц или None = страница пропущена)
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+        import pdfplumber
+        
+        pending = set(ocr_jobs)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            self._raise_if_cancelled()
+            for future in sorted(done, key=lambda f: ocr_jobs[f]):
+                page_num = ocr_jobs[future]
+                try:
+                    ocr_path = future.result()
+                except Exception as e:
+                    self._log(f"❌ OCR страницы {page_num} не выполнен: {e}", "ERROR")
+                    yield page_num, None
+                    continue
+                self._log(f"🔠 Страница {page_num}: OCR готов")
+                # Пустой текст скана в кэше страниц заменяется распознанным, после обработки - сбрасывается
+                self._page_text_cache.pop(page_num, None)
+                self._page_words_cache.pop(page_num, None)
+                with pdfplumber.open(ocr_path) as ocr_pdf:
+                    page_tables = self._process_page_cached(ocr_pdf.pages[0], page_num, strategy_policy)
+                self._page_text_cache.pop(page_num, None)
+                self._page_words_cache.pop(page_num, None)
+                yield page_num, page_tables
+
+    # ============ ОБЛАСТЬ ТАБЛИЦЫ СПЕЦИФИКАЦИИ ============
+    def _detect_table_region(self, page, page_num: int) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Прямоугольник таблицы спецификации (x0, top, x1, bottom) по словам шапки ("Наименование",
+        "Кол.") и линиям разметки: верх и ширина - по линии над шапкой, низ - по основной
+        надписи (штампу). Отсекаются рамка, штамп и всё, что выше шапки.
+        :return: Прямоугольник или None, если шапка не найдена или область - почти вся страница
+        """
+        margin = self.TABLE_REGION_MARGIN
+        header_words = []
+        stamp_tops = []
+        for word in self._get_page_words(page, page_num):
+            text = word['text'].lower()
+            if text.startswith(self.TABLE_REGION_STAMP_WORDS):
+                stamp_tops.append(word['top'])
+            elif text.startswith(self.TABLE_REGION_HEADER_WORDS):
+                header_words.append(word)
+        if not header_words:
+            return None
+        
+        # Шапка - верхняя строка заголовков (многострочные заголовки смещены не больше чем на margin)
+        header_top = min(word['top'] for word in header_words)
+        header_row = [word for word in header_words if word['top'] - header_top <= margin]
+        header_bottom = max(word['bottom'] for word in header_row)
+        header_x0 = min(word['x0'] for word in header_row)
+        header_x1 = max(word['x1'] for word in header_row)
+        
+        page_x0, page_top, page_x1, page_bottom = page.bbox
+        x0, top, x1, bottom = page_x0, header_top - margin, page_x1, page_bottom
+        
+        # Линия над шапкой, перекрывающая все заголовки, - верхняя граница таблицы и её ширина.
+        # Линия может быть нарисована отрезками по ячейкам - отрезки на одной высоте объединяются
+        ruling: Dict[float, List[float]] = {}
+        for edge in page.horizontal_edges:
+            if header_top - 2 * margin <= edge['top'] <= header_top:
+                extent = ruling.setdefault(round(edge['top']), [edge['x0'], edge['x1']])
+                extent[0], extent[1] = min(extent[0], edge['x0']), max(extent[1], edge['x1'])
+        covering = [line_top for line_top, (line_x0, line_x1) in ruling.items()
+                    if line_x0 <= header_x0 and line_x1 >= header_x1]
+        if covering:
+            line_top = max(covering)
+            x0, top, x1 = ruling[line_top][0] - 1, line_top - 1, ruling[line_top][1] + 1
+        
+        # Штамп ниже шапки - таблица заканчивается над ним
+        stamp_tops = [stamp_top for stamp_top in stamp_tops if stamp_top > header_bottom]
+        if stamp_tops:
+            bottom = min(stamp_tops) - 2
+        
+        x0, top = max(x0, page_x0), max(top, page_top)
+        x1, bottom = min(x1, page_x1), min(bottom, page_bottom)
+        if x1 <= x0 or bottom <= top:
+            return None
+        page_area = (page_x1 - page_x0) * (page_bottom - page_top)
+        if (x1 - x0) * (bottom - top) >= self.TABLE_REGION_MAX_AREA * page_area:
+            return None
+        return x0, top, x1, bottom
+
+    # ============ ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА СТРАНИЦ ============
+    def _iter_pages_parallel(self, file_path: str, pages_to_process: List[int],
+                             workers: int, progress_offset: int = 0,
+                             progress_total: Optional[int] = None,
+                             strategy_policy: str = "adaptive",
+                             bounded_memory: bool = False) -> Iterator[tuple]:
+        """
+        Обрабатывает страницы в нескольких процессах. Каждый процесс один раз открывает PDF
+        и получает блоки подряд идущих страниц. Результаты и прогресс отдаются по мере готовности блоков
+        :param progress_offset: Сколько страниц уже готово до запуска (например, взято из кэша)
+        :param progress_total: Общее число страниц для прогресса (по умолчанию len(pages_to_process))
+        :return: Генератор пар (номер страницы, список таблиц или None = страница пропущена)
+        """
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        
+        total = len(pages_to_process)
+        workers = min(workers, total)
+        # Несколько блоков на процесс - для равномерной загрузки и плавного прогресса
+        chunk_size = max(1, min(self.PARALLEL_CHUNK_PAGES, -(-total // (workers * 4))))
+        chunks = [pages_to_process[i:i + chunk_size] for i in range(0, total, chunk_size)]
+        self._log(f"⚡ ПАРАЛЛЕЛЬНЫЙ РЕЖИМ: {workers} процессов, {len(chunks)} блоков по {chunk_size} стр.")
+        
+        pages_done = 0
+        executor = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_init_page_worker,
+                                       initargs=(file_path, self.debug_mode,
+                                                 self.parse_cache.cache_dir if self.parse_cache else None,
+                                                 dict(self._page_verdicts), self.page_time_budget,
+                                                 bounded_memory, self.memory_ceiling_mb,
+                                                 self.tesseract_cmd is not None,
+                                                 self.use_triage, self.use_table_region))
+        finished = False
+        try:
+            pending = {executor.submit(_process_page_range, chunk, strategy_policy) for chunk in chunks}
+            while pending:
+                # Короткий таймаут ожидания - чтобы отмена срабатывала, не дожидаясь конца блока
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                self._raise_if_cancelled()
+                for future in done:
+                    chunk_results = future.result()
+                    pages_done += len(chunk_results)
+                    if self.progress_callback:
+                        self.progress_callback(progress_offset + pages_done, progress_total or total)
+                    for page_num, page_tables, over_budget in chunk_results:
+                        if over_budget:
+                            self.pages_over_budget.append(page_num)
+                        yield page_num, page_tables
+            finished = True
+        finally:
+            if finished:
+                executor.shutdown(wait=True)
+            else:
+                # Отмена или ошибка: ожидающие блоки снимаются, выполняющиеся процессы завершаются
+                # принудительно - вызов extract_tables, зависший на плотной графике, сам не прервётся
+                _terminate_executor(executor)
 
     # ============ ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ============
     def parse_to_dataframe_with_pages(self, file_path: str, pages: List[int]) -> pd.DataFrame:
@@ -625,6 +1376,7 @@ class PDFParser:
     def _analyze_pdf_structure_quick(self, pdf, max_pages: int = 3):
         """Быстрый анализ структуры PDF (только первые страницы)"""
         self._log(f"\n🔍 БЫСТРЫЙ АНАЛИЗ СТРУКТУРЫ PDF (первые {max_pages} страниц):")
+        self._bind_page_cache(getattr(pdf, 'path', None))
         try:
             metadata = pdf.metadata
             if metadata:
@@ -632,7 +1384,7 @@ class PDFParser:
             
             for i in range(min(max_pages, len(pdf.pages))):
                 page = pdf.pages[i]
-                text = page.extract_text()[:200] if page.extract_text() else "Нет текста"
+                text = self._get_page_text(page, i + 1)[:200] or "Нет текста"
                 self._log(f"📄 Страница {i+1}: {page.width:.1f}x{page.height:.1f}, текст: {text[:100]}...")
                 
         except Exception as e:
@@ -641,86 +1393,40 @@ class PDFParser:
     # ============ СТАНДАРТНЫЕ МЕТОДЫ (БЕЗ ИЗМЕНЕНИЙ) ============
     def _analyze_pdf_structure(self, pdf):
         self._log("\n🔍 АНАЛИЗ СТРУКТУРЫ PDF:")
+        self._bind_page_cache(getattr(pdf, 'path', None))
         try:
             metadata = pdf.metadata
             if metadata:
                 self._log(f"📋 Метаданные PDF: {json.dumps(metadata, indent=2, default=str)}")
             for i in range(min(3, len(pdf.pages))):
                 page = pdf.pages[i]
-                self._log(f"📄 Страница {i+1}: {page.width:.1f}x{page.height:.1f}, слов: {len(page.extract_words())}")
+                self._log(f"📄 Страница {i+1}: {page.width:.1f}x{page.height:.1f}, слов: {len(self._get_page_words(page, i + 1))}")
         except Exception as e:
             self._log(f"⚠️ Ошибка анализа структуры PDF: {e}", "DEBUG")
 
-    def _extract_tables_universal(self, page, page_num: int) -> List[pd.DataFrame]:
-        tables_df = []
-        strategies = [
-            {"name": "СТРАТЕГИЯ ПО УМОЛЧАНИЮ", "params": {}},
-            {"name": "ЛИНИИ+ЛИНИИ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "lines"}},
-            {"name": "ТЕКСТ+ТЕКСТ", "params": {"vertical_strategy": "text", "horizontal_strategy": "text"}},
-            {"name": "ЛИНИИ+ТЕКСТ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "text"}},
-            {"name": "ТЕКСТ+ЛИНИИ", "params": {"vertical_strategy": "text", "horizontal_strategy": "lines"}},
-            {"name": "СНИППЕТЫ", "params": {"snap_tolerance": 5, "join_tolerance": 5}},
-        ]
-        for strategy in strategies:
-            strategy_name = strategy["name"]
-            strategy_params = strategy["params"]
-            self._log(f"\n🎯 ИСПОЛЬЗУЮ СТРАТЕГИЮ: {strategy_name}")
-            self._log(f"⚙️  Параметры: {strategy_params}")
-            try:
-                tables = page.extract_tables(strategy_params)
-                if tables:
-                    self._log(f"✅ Найдено таблиц: {len(tables)}")
-                    for table_idx, table in enumerate(tables):
-                        table_name = f"Страница_{page_num}_{strategy_name}_Таблица_{table_idx+1}"
-                        self._log_table_info(table, table_name)
-                        if table and self._is_valid_table(table):
-                            df = self._table_to_dataframe(table, page_num, strategy_name, table_idx)
-                            if not df.empty:
-                                # === ФИЛЬТРАЦИЯ МУСОРНЫХ ТАБЛИЦ ===
-                                if df.shape[0] < 2 or df.shape[1] < 2:
-                                    self._log(f"❌ Пропущена таблица: слишком мелкая ({df.shape})", "DEBUG")
-                                    continue
-                                text_flat = ' '.join(df.astype(str).values.flatten())
-                                radiator_keywords = (
-                                    r'радиатор|стальной|панельный|отопительн|'
-                                    r'radiator|heater|panel\s+heater|convector|'
-                                    r'шт|шт\.|ед|ед\.|pcs|pc|pieces|qty|quantity|q-?ty|кол-?во|количество|'
-                                    r'U\d{2}-\d{3,4}-\d{3,4}|C\d{2}-\d{3,4}-\d{3,4}|'
-                                    r'[VK]\d{2}|VK-\d{2}|K-\d{2}|type\s*\d+|тип\s*\d+|'
-                                    r'compact|classic|ventil|prado|purmo|kermi|royal|ftv|fto|ftk|'
-                                    r'нижн(?:ее|ий)\s+подключ|боков\w+\s+подключ|universal'
-                                )
-                                if not re.search(radiator_keywords, text_flat, re.IGNORECASE):
-                                    self._log(f"❌ Пропущена таблица: нет признаков радиаторов", "DEBUG")
-                                    continue
-                                # === КОНЕЦ ФИЛЬТРАЦИИ ===
-                                tables_df.append(df)
-                                self._log(f"✅ Таблица добавлена в результаты", "SUCCESS")
-                            else:
-                                self._log(f"⚠️ Таблица отфильтрована (пустая после очистки)", "WARNING")
-                        else:
-                            self._log(f"❌ Таблица невалидна", "DEBUG")
-                else:
-                    self._log(f"❌ Таблиц не найдено", "DEBUG")
-            except Exception as e:
-                self._log(f"❌ Ошибка стратегии {strategy_name}: {e}", "ERROR")
-                continue
-        self._log(f"📊 ИТОГО со страницы {page_num}: {len(tables_df)} валидных таблиц")
-        return tables_df    
-    
-    def _extract_tables_universal(self, page, page_num: int) -> List[pd.DataFrame]:
+    def _extract_tables_universal(self, page, page_num: int, adaptive: bool = True) -> List[pd.DataFrame]:
+        """
+        Извлекает таблицы страницы с адаптивным выбором стратегии.
+        Первые ADAPTIVE_WARMUP_PAGES страниц документа проходят все стратегии (обучение).
+        Дальше первой пробуется стратегия, чаще всего дававшая лучшую таблицу, и обработка
+        страницы завершается, как только стратегия дала таблицу с баллом >= TABLE_SCORE_THRESHOLD.
+        Остальные стратегии запускаются только как запасной вариант
+        :param adaptive: False - всегда все стратегии в исходном порядке (политика full)
+        """
         tables_df = []
-        strategies = [
-            {"name": "СТРАТЕГИЯ ПО УМОЛЧАНИЮ", "params": {}},
-            {"name": "ЛИНИИ+ЛИНИИ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "lines"}},
-            {"name": "ТЕКСТ+ТЕКСТ", "params": {"vertical_strategy": "text", "horizontal_strategy": "text"}},
-            {"name": "ЛИНИИ+ТЕКСТ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "text"}},
-            {"name": "ТЕКСТ+ЛИНИИ", "params": {"vertical_strategy": "text", "horizontal_strategy": "lines"}},
-            {"name": "СНИППЕТЫ", "params": {"snap_tolerance": 5, "join_tolerance": 5}},
-        ]
+        adaptive = adaptive and self._strategy_pages_learned >= self.ADAPTIVE_WARMUP_PAGES
+        strategies = self._ordered_strategies() if adaptive else self.TABLE_STRATEGIES
+        best_strategy = None
+        best_score = 0
+        strategies_run = 0
+        self._page_table_candidates = 0
+        if adaptive:
+            self._log(f"⚡ Адаптивный порядок стратегий: {[st['name'] for st in strategies]}", "DEBUG")
         for strategy in strategies:
             strategy_name = strategy["name"]
             strategy_params = strategy["params"]
+            self._check_page_interrupts(page_num)
+            strategies_run += 1
             self._log(f"\n🎯 ИСПОЛЬЗУЮ СТРАТЕГИЮ: {strategy_name}")
             self._log(f"⚙️  Параметры: {strategy_params}")
             try:
@@ -733,6 +1439,7 @@ class PDFParser:
                         if table and self._is_valid_table(table):
                             df = self._table_to_dataframe(table, page_num, strategy_name, table_idx)
                             if not df.empty:
+                                self._page_table_candidates += 1
                                 # === ФИЛЬТРАЦИЯ МУСОРНЫХ ТАБЛИЦ ===
                                 if df.shape[0] < 2 or df.shape[1] < 2:
                                     self._log(f"❌ Пропущена таблица: слишком мелкая ({df.shape})", "DEBUG")
@@ -741,76 +1448,16 @@ class PDFParser:
                                 # РАСШИРЕННЫЙ ПОИСК ПРИЗНАКОВ РАДИАТОРОВ
                                 text_flat = ' '.join(df.astype(str).values.flatten())
                                 
-                                # Расширенные ключевые слова для всеядности
-                                radiator_patterns = (
-                                    r'радиатор|стальной|панельный|отопительн|'  # Основные термины
-                                    r'radiator|heater|panel\s+heater|convector|'  # Английские термины
-                                    
-                                    # Ключевые слова для количества (разные варианты написания)
-                                    r'шт|шт\.|ед|ед\.|pcs|pc|pieces|qty|quantity|q-?ty|кол-?во|количество|'
-                                    
-                                    # Паттерны моделей радиаторов (PURMO, Kermi, Buderus и т.д.)
-                                    r'PURMO\s+[CHK]\s*\d{1,2}|'
-                                    r'KERMI\s+[A-Z]\d{1,2}|'
-                                    r'BUDERUS\s+[A-Z]\d{1,2}|'
-                                    r'ROYAL\s+THERMO|'
-                                    r'K-PROF|VK-PROF|CV\d{1,2}|HITERM|EVRA|'
-                                    
-                                    # Паттерны размеров (300x800, 500×1000 и т.д.)
-                                    r'\d{3,4}\s*[xх×]\s*\d{3,4}|'
-                                    
-                                    # Паттерны подключения
-                                    r'нижн(?:ее|ий)\s+подключ|боков\w+\s+подключ|нижнее|боковое|'
-                                    
-                                    # Типы и серии
-                                    r'тип\s*\d+|type\s*\d+|серия|seria|'
-                                    r'compact|classic|ventil|prado|purmo|kermi|royal|ftv|fto|ftk|'
-                                    r'universal|гигиенический|hygiene|'
-                                    
-                                    # Мощность/тепло (Ватты)
-                                    r'Вт|ватт|watt|Qн|Qp|'
-                                    
-                                    # Специфические модели из вашего PDF
-                                    r'C\s*\d{1,2}s|H\s*\d{1,2}|'
-                                    r'РГ-\d{1,3}-\d{1,3}-\d{1,2}'
-                                )
-                                
-                                # МЯГКАЯ ПРОВЕРКА: считаем баллы за найденные признаки
-                                score = 0
-                                found_patterns = []
-                                
-                                # Проверяем основные паттерны
-                                import re
-                                if re.search(r'радиатор|стальной|панельный|отопительн', text_flat, re.IGNORECASE):
-                                    score += 3
-                                    found_patterns.append('радиатор')
-                                
-                                if re.search(r'PURMO|KERMI|BUDERUS|ROYAL', text_flat, re.IGNORECASE):
-                                    score += 2
-                                    found_patterns.append('бренд')
-                                
-                                if re.search(r'\d{3,4}\s*[xх×]\s*\d{3,4}', text_flat, re.IGNORECASE):
-                                    score += 2
-                                    found_patterns.append('размеры')
-                                
-                                if re.search(r'шт|шт\.|ед|ед\.|кол-во|количество', text_flat, re.IGNORECASE):
-                                    score += 2
-                                    found_patterns.append('количество')
-                                
-                                if re.search(r'Вт|ватт|Qн|Qp', text_flat, re.IGNORECASE):
-                                    score += 1
-                                    found_patterns.append('мощность')
-                                
-                                if re.search(r'C\s*\d{1,2}s|H\s*\d{1,2}', text_flat, re.IGNORECASE):
-                                    score += 3  # Высокий балл за специфические модели PURMO
-                                    found_patterns.append('модель_PURMO')
+                                # МЯГКАЯ ПРОВЕРКА: баллы за найденные признаки (радиатор, бренд, размеры,
+                                # количество, мощность, модель PURMO) - один проход по тексту таблицы
+                                score, found_patterns = score_table_text(text_flat)
                                 
                                 # Логируем что нашли
                                 if found_patterns:
                                     self._log(f"🔍 Найдены признаки радиаторов: {set(found_patterns)} (баллы: {score})", "DEBUG")
                                 
                                 # Принимаем таблицу если есть хотя бы признаки радиаторов ИЛИ модели PURMO
-                                should_keep_table = (score >= 3)  # Минимум 3 балла
+                                should_keep_table = (score >= self.TABLE_SCORE_THRESHOLD)
                                 
                                 if not should_keep_table:
                                     self._log(f"❌ Пропущена таблица: недостаточно признаков радиаторов (баллы: {score})", "DEBUG")
@@ -819,6 +1466,9 @@ class PDFParser:
                                 self._log(f"✅ Таблица принята (баллы: {score})", "SUCCESS")
                                 # === КОНЕЦ ФИЛЬТРАЦИИ ===
                                 
+                                if score > best_score:
+                                    best_score = score
+                                    best_strategy = strategy_name
                                 tables_df.append(df)
                                 self._log(f"✅ Таблица добавлена в результаты", "SUCCESS")
                             else:
@@ -827,21 +1477,41 @@ class PDFParser:
                             self._log(f"❌ Таблица невалидна", "DEBUG")
                 else:
                     self._log(f"❌ Таблиц не найдено", "DEBUG")
+            except (ParseCancelled, PageTimeBudgetExceeded):
+                raise
             except Exception as e:
                 self._log(f"❌ Ошибка стратегии {strategy_name}: {e}", "ERROR")
                 continue
-        self._log(f"📊 ИТОГО со страницы {page_num}: {len(tables_df)} валидных таблиц")
+            
+            # ⚡ РАННИЙ ВЫХОД: таблица уже прошла порог, остальные стратегии не нужны
+            if adaptive and tables_df:
+                self._log(f"⚡ Ранний выход после стратегии {strategy_name} ({strategies_run} из {len(strategies)})")
+                break
+        
+        # Запоминаем победившую стратегию для следующих страниц документа
+        if best_strategy:
+            self._strategy_wins[best_strategy] = self._strategy_wins.get(best_strategy, 0) + 1
+            self._strategy_pages_learned += 1
+        self._log(f"📊 ИТОГО со страницы {page_num}: {len(tables_df)} валидных таблиц (стратегий запущено: {strategies_run})")
         return tables_df
 
+    def _ordered_strategies(self) -> List[Dict[str, Any]]:
+        """Стратегии в порядке убывания числа побед в текущем документе (при равенстве - исходный порядок)"""
+        return sorted(self.TABLE_STRATEGIES, key=lambda st: -self._strategy_wins.get(st["name"], 0))
+
     def _is_valid_table(self, table: List) -> bool:
         if not table or len(table) == 0:
             return False
-        total_cells = sum(len(row) for row in table)
-        non_empty_cells = sum(1 for row in table for cell in row if cell and str(cell).strip())
+        total_cells = 0
+        non_empty_cells = 0
+        for row in table:
+            total_cells += len(row)
+            non_empty_cells += sum(1 for cell in row if cell and str(cell).strip())
         fill_ratio = non_empty_cells / total_cells if total_cells > 0 else 0
         is_valid = (non_empty_cells >= 2 and fill_ratio > 0.1 and len(table) >= 1)
-        self._log(f"🔍 Анализ таблицы: {len(table)} строк, {total_cells} ячеек, {non_empty_cells} заполненных ({fill_ratio:.1%})", "DEBUG")
-        self._log(f"🔍 Таблица валидна: {is_valid}", "DEBUG")
+        if self.debug_mode:
+            self._log(f"🔍 Анализ таблицы: {len(table)} строк, {total_cells} ячеек, {non_empty_cells} заполненных ({fill_ratio:.1%})", "DEBUG")
+            self._log(f"🔍 Таблица валидна: {is_valid}", "DEBUG")
         return is_valid
 
     def _table_to_dataframe(self, table: List, page_num: int, strategy_name: str, table_idx: int) -> pd.DataFrame:
@@ -878,118 +1548,9 @@ class PDFParser:
         :param max_pages: Максимальное количество страниц для обработки
         :return: DataFrame с результатами парсинга
         """
-        try:
-            import pdfplumber
-        except ImportError:
-            raise RuntimeError("❌ БИБЛИОТЕКА PDFPLUMBER НЕ УСТАНОВЛЕНА! Выполните: pip install pdfplumber")
-        
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"❌ ФАЙЛ НЕ НАЙДЕН: {file_path}")
-        
-        self._log("🚀" * 50)
         self._log(f"🚀 ЗАПУСК ПАРСИНГА С ВЫБОРОМ СТРАНИЦ: {os.path.basename(file_path)}")
-        self._log(f"📁 Полный путь: {file_path}")
-        
-        try:
-            all_tables = []
-            total_pages_processed = 0
-            total_pages_skipped = 0
-            
-            with pdfplumber.open(file_path) as pdf:
-                total_pages = len(pdf.pages)
-                self._log(f"📄 ОБНАРУЖЕНО СТРАНИЦ В PDF: {total_pages}")
-                
-                # Корректируем диапазон страниц
-                if start_page < 1:
-                    start_page = 1
-                    self._log(f"⚠️  start_page исправлен на 1 (минимальное значение)")
-                
-                if end_page is None:
-                    end_page = total_pages
-                elif end_page > total_pages:
-                    end_page = total_pages
-                    self._log(f"⚠️  end_page исправлен на {total_pages} (максимум в файле)")
-                
-                self._log(f"📄 ДИАПАЗОН ОБРАБОТКИ: страницы с {start_page} по {end_page}")
-                
-                # Применяем ограничение max_pages
-                pages_in_range = end_page - start_page + 1
-                if max_pages and max_pages > 0 and pages_in_range > max_pages:
-                    end_page = start_page + max_pages - 1
-                    self._log(f"⚡ ОГРАНИЧЕНИЕ max_pages: обработаем страницы с {start_page} по {end_page}")
-                
-                for page_num in range(start_page, end_page + 1):
-                    page = pdf.pages[page_num - 1]
-                    
-                    # 🔥 ВЫЗЫВАЕМ ОБРАТНЫЙ ВЫЗОВ ПРОГРЕССА (если задан)
-                    if self.progress_callback:
-                        self.progress_callback(page_num - start_page + 1, end_page - start_page + 1)
-                    
-                    # 🔥 БЫСТРАЯ ПРОВЕРКА: СТОИТ ЛИ ОБРАБАТЫВАТЬ ЭТУ СТРАНИЦУ?
-                    if not self._should_process_page(page, page_num):
-                        total_pages_skipped += 1
-                        continue
-                    
-                    self._log(f"\n📖 {'='*60}")
-                    self._log(f"📖 ОБРАБОТКА СТРАНИЦЫ {page_num}/{end_page} (всего в PDF: {total_pages})")
-                    self._log(f"📖 {'='*60}")
-                    
-                    page_tables = self._extract_tables_universal(page, page_num)
-                    if page_tables:
-                        all_tables.extend(page_tables)
-                        total_pages_processed += 1
-                    
-                    # Анализ текста только если есть таблицы
-                    if page_tables:
-                        self._extract_and_analyze_text(page, page_num)
-            
-            # Сводка по обработке
-            self._log(f"\n📊 {'='*60}")
-            self._log(f"📊 СВОДКА ПО ПАРСИНГУ С ВЫБОРОМ СТРАНИЦ:")
-            self._log(f"📊 Всего страниц в PDF: {total_pages}")
-            self._log(f"📊 Запрошенный диапазон: {start_page}-{end_page}")
-            self._log(f"📊 Обработано страниц: {total_pages_processed}")
-            self._log(f"📊 Пропущено страниц: {total_pages_skipped}")
-            self._log(f"📊 Найдено таблиц: {len(all_tables)}")
-            self._log(f"📊 {'='*60}")
-            
-            if all_tables:
-                # Выбираем только лучшие таблицы (без дублирования страниц)
-                best_tables = []
-                pages_processed = set()
-                for table in all_tables:
-                    page = table['_source_page'].iloc[0] if '_source_page' in table.columns else 0
-                    if page not in pages_processed:
-                        best_tables.append(table)
-                        pages_processed.add(page)
-                
-                self._log(f"📊 Выбрано {len(best_tables)} лучших таблиц из {len(all_tables)}")
-                result_df = self._merge_all_tables(best_tables)
-            else:
-                result_df = pd.DataFrame()
-            
-            result_df = self._replace_na_values(result_df)
-            self._analyze_final_result(result_df, file_path)
-            
-            if not result_df.empty:
-                self._log(f"✅ УСПЕХ! СОЗДАН DATAFRAME: {result_df.shape}")
-                # Извлекаем радиаторы из результата
-                radiators = self.extract_radiators_from_dataframe(result_df)
-                self._log(f"✅ Извлечено {len(radiators)} позиций радиаторов")
-                # Показываем примеры найденных радиаторов
-                if radiators:
-                    self._log("📋 Примеры найденных радиаторов:")
-                    for i, rad in enumerate(radiators[:5]):
-                        self._log(f"   {i+1}. {rad['name']} - {rad['quantity']} шт. (стр. {rad['source_page']})")
-            else:
-                self._log("⚠️ ВНИМАНИЕ: В PDF НЕ НАЙДЕНО ТАБЛИЧНЫХ ДАННЫХ")
-            
-            return result_df
-            
-        except Exception as e:
-            error_msg = f"❌ КРИТИЧЕСКАЯ ОШИБКА ПАРСИНГА {file_path}:\n{str(e)}\n{traceback.format_exc()}"
-            self._log(error_msg, "ERROR")
-            raise RuntimeError(error_msg)
+        return self.parse_to_dataframe(file_path, start_page=start_page, end_page=end_page, max_pages=max_pages,
+                                       page_policy="range")
 
     def _clean_table_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
@@ -998,14 +1559,10 @@ class PDFParser:
         self._log(f"🧹 Начало очистки DataFrame: {original_shape}", "DEBUG")
         df = df.astype(str)
         df = df.apply(lambda x: x.str.strip())
-        df = df.replace({
-            '': '', 'nan': '', 'None': '', '<NA>': '', 'NaT': '',
-            'NULL': '', 'null': '', 'NaN': '', 'N/A': '', 'n/a': ''
-        })
-        mask_rows = df.astype(str).apply(lambda x: x.str.strip() != '').any(axis=1)
-        df = df[mask_rows]
-        mask_cols = df.astype(str).apply(lambda x: x.str.strip() != '').any(axis=0)
-        df = df.loc[:, mask_cols]
+        df = df.replace(_NA_REPLACEMENTS)
+        # Значения уже строки без пробелов по краям - маска заполненности считается один раз
+        non_empty = df.ne('')
+        df = df.loc[non_empty.any(axis=1), non_empty.any(axis=0)]
         if not df.empty:
             df = df.reset_index(drop=True)
             new_columns = [f"Col_{i}" for i in range(len(df.columns))]
@@ -1015,7 +1572,7 @@ class PDFParser:
 
     def _extract_and_analyze_text(self, page, page_num: int):
         try:
-            text = page.extract_text()
+            text = self._get_page_text(page, page_num)
             if text:
                 lines = text.split('\n')
                 self._log(f"📝 Текст страницы {page_num}: {len(lines)} строк")
@@ -1063,10 +1620,10 @@ class PDFParser:
         if df.empty:
             return df
         original_shape = df.shape
-        mask = df.astype(str).apply(lambda x: x.str.strip() != '').any(axis=1)
-        df = df[mask]
-        mask_cols = df.astype(str).apply(lambda x: x.str.strip() != '').any(axis=0)
-        df = df.loc[:, mask_cols]
+        # Одна строковая копия: по ней и пустые строки, и пустые столбцы
+        # (удалённые пустые строки на маску столбцов не влияют)
+        non_empty = df.astype(str).apply(lambda x: x.str.strip() != '')
+        df = df.loc[non_empty.any(axis=1), non_empty.any(axis=0)]
         df = df.reset_index(drop=True)
         self._log(f"✅ Финальная очистка завершена: {original_shape} -> {df.shape}", "SUCCESS")
         return df
@@ -1076,35 +1633,55 @@ class PDFParser:
             return df
         self._log(f"\n🛡️  ЗАЩИТА ОТ PD.NA В DATAFRAME: {df.shape}")
         df = df.fillna('')
-        na_patterns = ['nan', 'None', 'NoneType', '<NA>', 'NaT', 'NULL', 'null', 'NaN', 'N/A', 'n/a']
-        for pattern in na_patterns:
-            count = (df == pattern).sum().sum()
-            if count > 0:
-                self._log(f"   🔄 Заменяю '{pattern}': {count} значений")
-        df = df.replace(na_patterns, '')
-        for col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
+        # Один проход поиска пустых значений, счётчики по видам - из найденных ячеек
+        na_mask = df.isin(_NA_STRINGS)
+        if na_mask.values.any():
+            counts = pd.Series(df.values[na_mask.values]).value_counts()
+            for pattern in _NA_STRINGS:
+                if counts.get(pattern, 0) > 0:
+                    self._log(f"   🔄 Заменяю '{pattern}': {counts[pattern]} значений")
+            df = df.mask(na_mask, '')
+        df = df.astype(str).apply(lambda x: x.str.strip())
         self._log(f"✅ Защита от pd.NA применена успешно", "SUCCESS")
         return df
 
     def _analyze_final_result(self, df: pd.DataFrame, file_path: str):
+        """
+        Сводка итогового результата в analysis_results.
+        Подробный анализ (заполненность и уникальные значения столбцов, ключевые слова) - только
+        в отладочном режиме; все статистики считаются по одной строковой копии таблицы
+        """
+        if df.empty:
+            if self.debug_mode:
+                self._log("❌ DataFrame пуст - анализ невозможен")
+            return
+        # После _replace_na_values все ячейки - строки без пробелов по краям
+        non_empty = df.ne('')
+        self.analysis_results[file_path] = {
+            'shape': df.shape,
+            'columns': list(df.columns),
+            'total_rows': len(df),
+            'non_empty_rows': int(non_empty.any(axis=1).sum()),
+            'timestamp': datetime.now().isoformat()
+        }
+        if not self.debug_mode:
+            return
+        
         self._log(f"\n📊 {'='*60}")
         self._log(f"📊 ДЕТАЛЬНЫЙ АНАЛИЗ ФИНАЛЬНОГО РЕЗУЛЬТАТА")
         self._log(f"📊 {'='*60}")
-        if df.empty:
-            self._log("❌ DataFrame пуст - анализ невозможен")
-            return
         self._log(f"📏 РАЗМЕР: {df.shape}")
         self._log(f"🔢 Строк: {len(df)}, Колонок: {len(df.columns)}")
+        filled_counts = non_empty.sum()
+        unique_counts = df.nunique()
         for col in df.columns:
-            non_empty = (df[col].str.strip() != '').sum()
-            unique_count = df[col].nunique()
-            sample_values = df[col].head(3).tolist()
-            self._log(f"   {col}: {non_empty}/{len(df)} заполнено, {unique_count} уникальных")
-            self._log(f"     Примеры: {sample_values}")
+            self._log(f"   {col}: {filled_counts[col]}/{len(df)} заполнено, {unique_counts[col]} уникальных")
+            self._log(f"     Примеры: {df[col].head(3).tolist()}")
+        # Все ячейки одним столбцом в нижнем регистре - ключевые слова ищутся по нему без копий таблицы
+        cells_lower = pd.Series(df.to_numpy(dtype=str).ravel()).str.lower()
         radiator_keywords = ['K-PROF', 'VK-PROF', 'радиатор', 'Buderus', 'радиаторный']
         for keyword in radiator_keywords:
-            count = df.astype(str).apply(lambda x: x.str.contains(keyword, case=False, na=False)).sum().sum()
+            count = int(cells_lower.str.contains(keyword.lower(), regex=False).sum())
             if count > 0:
                 self._log(f"   ✅ '{keyword}': найдено {count} упоминаний", "SUCCESS")
             else:
@@ -1112,13 +1689,6 @@ class PDFParser:
         if '_source_page' in df.columns:
             pages_used = df['_source_page'].nunique()
             self._log(f"📄 ИСПОЛЬЗОВАНО СТРАНИЦ: {pages_used}")
-        self.analysis_results[file_path] = {
-            'shape': df.shape,
-            'columns': list(df.columns),
-            'total_rows': len(df),
-            'non_empty_rows': (df.astype(str).apply(lambda x: x.str.strip() != '')).any(axis=1).sum(),
-            'timestamp': datetime.now().isoformat()
-        }
 
     def auto_detect_column_mapping(self, df: pd.DataFrame) -> Dict[str, str]:
         self._log(f"\n🔍 АВТОМАТИЧЕСКОЕ ОПРЕДЕЛЕНИЕ КОЛОНОК:")
@@ -1144,47 +1714,39 @@ class PDFParser:
         self._log(f"📋 ИТОГО сопоставлено: {len(mapping)} колонок")
         return mapping
 
-    def batch_process_directory(self, directory_path: str = "."):
+    def batch_process_directory(self, directory_path: str = ".", workers: Optional[int] = None,
+                                recursive: bool = False, resume: bool = False,
+                                report_path: Optional[str] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Пакетная обработка каталога (см. pdf_batch.batch_process) в пуле процессов. Настройки парсера - как у self.
+        По умолчанию, как и раньше, - только файлы самого каталога и ничего не пишется на диск:
+        манифест (для продолжения прерванного запуска) - только при resume, сводная книга Excel - только при report_path
+        :return: Полный путь файла -> запись (status: success / empty / error, shape, время, ...)
+        """
+        from pdf_batch import batch_process
         self._log(f"\n📂 ПАКЕТНАЯ ОБРАБОТКА ДИРЕКТОРИИ: {directory_path}")
         if not os.path.exists(directory_path):
             self._log(f"❌ Директория не существует: {directory_path}", "ERROR")
             return
-        pdf_files = glob.glob(os.path.join(directory_path, "*.pdf"))
-        self._log(f"📄 Найдено PDF файлов: {len(pdf_files)}")
-        if not pdf_files:
-            self._log("❌ PDF файлы не найдены", "ERROR")
-            return
-        results = {}
-        for pdf_file in pdf_files:
-            try:
-                self._log(f"\n{'='*80}")
-                self._log(f"🔄 ОБРАБОТКА ФАЙЛА: {os.path.basename(pdf_file)}")
-                self._log(f"{'='*80}")
-                df = self.parse_to_dataframe(pdf_file)
-                if not df.empty:
-                    results[pdf_file] = {
-                        'status': 'success',
-                        'shape': df.shape
-                    }
-                else:
-                    results[pdf_file] = {
-                        'status': 'empty',
-                        'shape': (0, 0)
-                    }
-            except Exception as e:
-                self._log(f"❌ Ошибка обработки файла {pdf_file}: {e}", "ERROR")
-                results[pdf_file] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
-        success_count = sum(1 for r in results.values() if r['status'] == 'success')
-        empty_count = sum(1 for r in results.values() if r['status'] == 'empty')
-        error_count = sum(1 for r in results.values() if r['status'] == 'error')
-        self._log(f"\n📊 СВОДНЫЙ ОТЧЕТ ПО ПАКЕТНОЙ ОБРАБОТКЕ:")
-        self._log(f"✅ Успешно: {success_count} файлов")
-        self._log(f"⚠️  Пустые: {empty_count} файлов") 
-        self._log(f"❌ Ошибки: {error_count} файлов")
-        return results
+        parser_options = {
+            'use_cache': self.parse_cache is not None,
+            'cache_dir': self.parse_cache.cache_dir if self.parse_cache is not None else None,
+            'page_time_budget': self.page_time_budget,
+            'bounded_memory': self.bounded_memory,
+            'memory_ceiling_mb': self.memory_ceiling_mb,
+            'debug_mode': self.debug_mode,
+            # Как у рабочих процессов страниц: use_ocr - есть ли tesseract у этого парсера
+            'use_ocr': self.tesseract_cmd is not None,
+            'use_triage': self.use_triage,
+            'use_table_region': self.use_table_region,
+        }
+        results = batch_process(directory_path, workers=workers, recursive=recursive, resume=resume,
+                                report_path=report_path, parser_options=parser_options,
+                                cancel_token=self.cancel_token,
+                                save_manifest=resume, save_report=report_path is not None)
+        for record in results.values():
+            record['shape'] = (record.get('rows') or 0, record.get('columns') or 0)
+        return {os.path.join(directory_path, key.replace('/', os.sep)): record for key, record in results.items()}
 
     def parse_optimized(self, file_path: str, 
                     start_page: int = 1, 
@@ -1200,131 +1762,65 @@ class PDFParser:
         :param pages: Список конкретных страниц для обработки (номера с 1)
         :return: DataFrame с результатами парсинга
         """
-        try:
-            import pdfplumber
-        except ImportError:
-            raise RuntimeError("❌ БИБЛИОТЕКА PDFPLUMBER НЕ УСТАНОВЛЕНА!")
-        
-        self._log("🚀 ЗАПУСК ОПТИМИЗИРОВАННОГО ПАРСИНГА")
-        self._log(f"📁 Файл: {os.path.basename(file_path)}")
-        
-        # Логируем параметры
-        if start_page != 1:
-            self._log(f"📄 Начальная страница: {start_page}")
-        if end_page:
-            self._log(f"📄 Конечная страница: {end_page}")
-        if max_pages:
-            self._log(f"⚡ Ограничение: не более {max_pages} страниц")
-            
-        all_tables = []
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                total_pages_in_pdf = len(pdf.pages)
-                self._log(f"📄 Найдено страниц: {total_pages_in_pdf}")
-                
-                # Корректируем диапазон страниц
-                if start_page < 1:
-                    start_page = 1
-                
-                if end_page is None:
-                    end_page = total_pages_in_pdf
-                elif end_page > total_pages_in_pdf:
-                    end_page = total_pages_in_pdf
-                
-                # Применяем ограничение max_pages
-                pages_in_range = end_page - start_page + 1
-                if max_pages and max_pages > 0 and pages_in_range > max_pages:
-                    end_page = start_page + max_pages - 1
-                
-                self._log(f"📄 Обрабатываем страницы: {start_page}-{end_page}")
-                
-                for page_num in range(start_page, end_page + 1):
-                    page = pdf.pages[page_num - 1]
-                    
-                    # 🔥 БЫСТРАЯ ПРОВЕРКА СТРАНИЦЫ (добавлено)
-                    if not self._should_process_page(page, page_num):
-                        continue
-                    
-                    self._log(f"\n📖 ОБРАБОТКА СТРАНИЦЫ {page_num}/{end_page}")
-                    strategies = [
-                        {"name": "ТЕКСТ+ТЕКСТ", "params": {"vertical_strategy": "text", "horizontal_strategy": "text", "snap_tolerance": 8}},
-                        {"name": "ЛИНИИ+ТЕКСТ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "text", "snap_tolerance": 8}},
-                    ]
-                    best_table_for_page = None
-                    for strategy in strategies:
-                        strategy_name = strategy["name"]
-                        strategy_params = strategy["params"]
-                        self._log(f"🎯 Тестируем стратегию: {strategy_name}")
-                        try:
-                            tables = page.extract_tables(strategy_params)
-                            if tables:
-                                for table_idx, table in enumerate(tables):
-                                    if table and self._is_valid_table(table):
-                                        df = self._table_to_dataframe(table, page_num, strategy_name, table_idx)
-                                        if not df.empty:
-                                            df = self._fix_ocr_artifacts(df)
-                                            if best_table_for_page is None or len(df) > len(best_table_for_page):
-                                                best_table_for_page = df
-                                                self._log(f"✅ Найдена лучшая таблица: {df.shape}")
-                        except Exception as e:
-                            self._log(f"❌ Ошибка в стратегии {strategy_name}: {e}", "DEBUG")
-                            continue
-                    if best_table_for_page is not None:
-                        all_tables.append(best_table_for_page)
-                        self._log(f"📊 Добавлена таблица со страницы {page_num}: {best_table_for_page.shape}")
-                    else:
-                        self._log(f"⚠️ На странице {page_num} не найдено валидных таблиц")
-            
-            self._log(f"\n📊 ВСЕГО НАЙДЕНО ТАБЛИЦ: {len(all_tables)}")
-            if not all_tables:
-                self._log("❌ Нет таблиц для обработки")
-                return pd.DataFrame()
-            
-            result_df = pd.concat(all_tables, ignore_index=True)
-            result_df = self._final_cleanup(result_df)
-            result_df = self._replace_na_values(result_df)
-            self._analyze_final_result(result_df, file_path)
-            
-            if result_df.empty:
-                self._log("⚠️ ВНИМАНИЕ: В PDF НЕ НАЙДЕНО ТАБЛИЧНЫХ ДАННЫХ")
-            else:
-                self._log(f"✅ УСПЕХ! СОЗДАН DATAFRAME: {result_df.shape}")
-            
-            return result_df
-            
-        except Exception as e:
-            error_msg = f"❌ ОШИБКА ПАРСИНГА: {str(e)}\n{traceback.format_exc()}"
-            self._log(error_msg, "ERROR")
-            raise RuntimeError(error_msg)
+        self._log("🚀 ЗАПУСК ОПТИМИЗИРОВАННОГО ПАРСИНГА (быстрые стратегии)")
+        return self.parse_to_dataframe(file_path, start_page=start_page, end_page=end_page, max_pages=max_pages,
+                                       pages=pages, strategy_policy="fast")
+
+    def _extract_best_table_optimized(self, page, page_num: int) -> Optional[pd.DataFrame]:
+        """Быстрый режим: две текстовые стратегии, берётся самая длинная валидная таблица страницы"""
+        strategies = [
+            {"name": "ТЕКСТ+ТЕКСТ", "params": {"vertical_strategy": "text", "horizontal_strategy": "text", "snap_tolerance": 8}},
+            {"name": "ЛИНИИ+ТЕКСТ", "params": {"vertical_strategy": "lines", "horizontal_strategy": "text", "snap_tolerance": 8}},
+        ]
+        best_table_for_page = None
+        self._page_table_candidates = 0
+        for strategy in strategies:
+            strategy_name = strategy["name"]
+            strategy_params = strategy["params"]
+            self._check_page_interrupts(page_num)
+            self._log(f"🎯 Тестируем стратегию: {strategy_name}")
+            try:
+                tables = page.extract_tables(strategy_params)
+                if tables:
+                    for table_idx, table in enumerate(tables):
+                        if table and self._is_valid_table(table):
+                            df = self._table_to_dataframe(table, page_num, strategy_name, table_idx)
+                            if not df.empty:
+                                self._page_table_candidates += 1
+                                df = self._fix_ocr_artifacts(df)
+                                if best_table_for_page is None or len(df) > len(best_table_for_page):
+                                    best_table_for_page = df
+                                    self._log(f"✅ Найдена лучшая таблица: {df.shape}")
+            except Exception as e:
+                self._log(f"❌ Ошибка в стратегии {strategy_name}: {e}", "DEBUG")
+                continue
+        return best_table_for_page
 
     def _fix_ocr_artifacts(self, df: pd.DataFrame) -> pd.DataFrame:
         self._log("🔧 ИСПРАВЛЕНИЕ OCR-АРТЕФАКТОВ...")
         fixed_count = 0
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                for idx in df.index:
-                    original_value = str(df.at[idx, col])
-                    if original_value and any(original_value[i] == original_value[i+1] for i in range(len(original_value)-1) if original_value[i].isalpha()):
-                        fixed_value = self._fix_double_chars(original_value)
-                        if fixed_value != original_value:
-                            df.at[idx, col] = fixed_value
-                            fixed_count += 1
+        for col_idx in range(df.shape[1]):
+            column = df.iloc[:, col_idx]
+            if column.dtype != 'object':
+                continue
+            # Схлопывание удвоенных букв регулярным выражением по всему столбцу (только строковые ячейки)
+            is_text = column.map(type) == str
+            if not is_text.any():
+                continue
+            original = column[is_text]
+            fixed = original.str.replace(_DOUBLE_CHAR_RE, _collapse_double_letter, regex=True)
+            changed = fixed != original
+            if changed.any():
+                positions = is_text.to_numpy().nonzero()[0][changed.to_numpy()]
+                df.iloc[positions, col_idx] = fixed[changed].to_numpy()
+                fixed_count += int(changed.sum())
         self._log(f"   🔄 Исправлено {fixed_count} значений с OCR-артефактами")
         return df
 
     def _fix_double_chars(self, text: str) -> str:
         if not text or len(text) < 2:
             return text
-        result = []
-        i = 0
-        while i < len(text):
-            if (i + 1 < len(text) and text[i] == text[i+1] and text[i].isalpha()):
-                result.append(text[i])
-                i += 2
-            else:
-                result.append(text[i])
-                i += 1
-        return ''.join(result)
+        return _DOUBLE_CHAR_RE.sub(_collapse_double_letter, text)
 
     def quick_test(self, file_path: str):
         self._log("⚡ БЫСТРЫЙ ТЕСТ ПАРСИНГА")
@@ -1387,13 +1883,14 @@ class PDFParser:
         
         # Получаем информацию о PDF
         try:
+            self._bind_page_cache(file_path)
             with pdfplumber.open(file_path) as pdf:
                 total_pages = len(pdf.pages)
                 # Получаем превью первых 5 страниц
                 page_previews = []
                 for i in range(min(5, total_pages)):
                     page = pdf.pages[i]
-                    text = page.extract_text()
+                    text = self._get_page_text(page, i + 1)
                     if text:
                         preview = text[:150].replace('\n', ' ') + "..." if len(text) > 150 else text
                     else:
@@ -1637,110 +2134,13 @@ class PDFParser:
     # ============ НОВЫЙ МЕТОД: БЫСТРЫЙ ПАРСИНГ ТОЛЬКО С ТАБЛИЦАМИ ============
     def quick_parse_only_tables(self, file_path: str) -> pd.DataFrame:
         """
-        Быстрый парсинг только страниц с таблицами (автоматический выбор)
+        Быстрый парсинг только страниц с таблицами (автоматический выбор, политика страниц auto)
         
         :param file_path: Путь к PDF файлу
         :return: DataFrame с результатами парсинга
         """
         self._log("⚡ ЗАПУСК БЫСТРОГО ПАРСИНГА ТОЛЬКО СТРАНИЦ С ТАБЛИЦАМИ")
-        
-        try:
-            import pdfplumber
-        except ImportError:
-            raise RuntimeError("❌ БИБЛИОТЕКА PDFPLUMBER НЕ УСТАНОВЛЕНА!")
-        
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"❌ ФАЙЛ НЕ НАЙДЕН: {file_path}")
-        
-        all_tables = []
-        pages_with_tables = []
-        
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                total_pages = len(pdf.pages)
-                self._log(f"📄 Всего страниц: {total_pages}")
-                self._log("🔍 Автоматически ищу страницы с таблицами...")
-                
-                # Сначала находим все страницы с таблицами
-                for page_num in range(1, total_pages + 1):
-                    page = pdf.pages[page_num - 1]
-                    
-                    if self._should_process_page(page, page_num):
-                        pages_with_tables.append(page_num)
-                
-                self._log(f"✅ Найдено страниц с таблицами: {len(pages_with_tables)}")
-                
-                if not pages_with_tables:
-                    self._log("❌ Не найдено страниц с таблицами радиаторов")
-                    return pd.DataFrame()
-                
-                # Обрабатываем только страницы с таблицами
-                for i, page_num in enumerate(pages_with_tables):
-                    page = pdf.pages[page_num - 1]
-                    
-                    if self.progress_callback:
-                        self.progress_callback(i + 1, len(pages_with_tables))
-                    
-                    self._log(f"📖 Обрабатываю страницу с таблицей {i+1}/{len(pages_with_tables)}: стр. {page_num}")
-                    
-                    page_tables = self._extract_tables_universal(page, page_num)
-                    if page_tables:
-                        all_tables.extend(page_tables)
-                
-                self._log(f"📊 Найдено таблиц: {len(all_tables)}")
-                
-                if all_tables:
-                    result_df = self._merge_all_tables(all_tables)
-                    result_df = self._replace_na_values(result_df)
-                    self._analyze_final_result(result_df, file_path)
-                    return result_df
-                else:
-                    return pd.DataFrame()
-                    
-        except Exception as e:
-            error_msg = f"❌ ОШИБКА БЫСТРОГО ПАРСИНГА: {str(e)}\n{traceback.format_exc()}"
-            self._log(error_msg, "ERROR")
-            raise RuntimeError(error_msg)
-
-    # ============ НОВЫЙ КЛАСС ДЛЯ ЛЕНИВОЙ ЗАГРУЗКИ ============
-    class LazyPDFReader:
-        """Ленивый загрузчик PDF - загружает страницы только при обращении"""
-        def __init__(self, file_path: str):
-            self.file_path = file_path
-            self._pdf = None
-            self._total_pages = None
-        
-        def __enter__(self):
-            return self
-        
-        def __exit__(self, exc_type, exc_val, exc_tb):
-            if self._pdf:
-                self._pdf.close()
-        
-        @property
-        def total_pages(self) -> int:
-            if self._total_pages is None:
-                import pdfplumber
-                with pdfplumber.open(self.file_path) as temp_pdf:
-                    self._total_pages = len(temp_pdf.pages)
-            return self._total_pages
-        
-        def get_page(self, page_num: int):
-            """Получить страницу по номеру (начиная с 1)"""
-            if page_num < 1 or page_num > self.total_pages:
-                raise IndexError(f"Страница {page_num} вне диапазона 1-{self.total_pages}")
-            
-            if self._pdf is None:
-                import pdfplumber
-                self._pdf = pdfplumber.open(self.file_path)
-            
-            return self._pdf.pages[page_num - 1]
-        
-        def close(self):
-            """Закрыть PDF файл"""
-            if self._pdf:
-                self._pdf.close()
-                self._pdf = None
+        return self.parse_to_dataframe(file_path, page_policy="auto")
 
     # ============ НОВЫЙ МЕТОД: ПАРСИНГ С ЛЕНИВОЙ ЗАГРУЗКОЙ ============
     def parse_with_lazy_loading(self, file_path: str, 
@@ -1749,6 +2149,7 @@ class PDFParser:
                                 max_pages: Optional[int] = None) -> pd.DataFrame:
         """
         Парсинг с ленивой загрузкой страниц - экономит память
+        (движок в режиме ограниченной памяти: кэши страниц сбрасываются, таблицы выгружаются на диск)
         
         :param file_path: Путь к PDF файлу
         :param start_page: Номер первой страницы (начиная с 1)
@@ -1756,123 +2157,83 @@ class PDFParser:
         :param max_pages: Максимальное количество страниц
         :return: DataFrame с результатами парсинга
         """
-        try:
-            import pdfplumber
-        except ImportError:
-            raise RuntimeError("❌ БИБЛИОТЕКА PDFPLUMBER НЕ УСТАНОВЛЕНА! Выполните: pip install pdfplumber")
-        
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"❌ ФАЙЛ НЕ НАЙДЕН: {file_path}")
-        
-        self._log("🚀" * 50)
         self._log(f"🚀 ЗАПУСК ПАРСИНГА С ЛЕНИВОЙ ЗАГРУЗКОЙ: {os.path.basename(file_path)}")
-        self._log(f"📁 Полный путь: {file_path}")
-        
-        try:
-            all_tables = []
-            total_pages_processed = 0
-            total_pages_skipped = 0
-            
-            with self.LazyPDFReader(file_path) as lazy_pdf:
-                total_pages = lazy_pdf.total_pages
-                self._log(f"📄 ОБНАРУЖЕНО СТРАНИЦ В PDF: {total_pages}")
-                
-                # Корректируем диапазон страниц
-                if start_page < 1:
-                    start_page = 1
-                
-                if end_page is None:
-                    end_page = total_pages
-                elif end_page > total_pages:
-                    end_page = total_pages
-                
-                # Применяем ограничение max_pages
-                pages_in_range = end_page - start_page + 1
-                if max_pages and max_pages > 0 and pages_in_range > max_pages:
-                    end_page = start_page + max_pages - 1
-                
-                self._log(f"📄 ДИАПАЗОН ОБРАБОТКИ: страницы {start_page}-{end_page}")
-                
-                for page_num in range(start_page, end_page + 1):
-                    # 🔥 ВЫЗЫВАЕМ ОБРАТНЫЙ ВЫЗОВ ПРОГРЕССА (если задан)
-                    if self.progress_callback:
-                        self.progress_callback(page_num - start_page + 1, end_page - start_page + 1)
-                    
-                    # 🔥 ЛЕНИВАЯ ЗАГРУЗКА: страница загружается только здесь
-                    page = lazy_pdf.get_page(page_num)
-                    
-                    # 🔥 БЫСТРАЯ ПРОВЕРКА: СТОИТ ЛИ ОБРАБАТЫВАТЬ ЭТУ СТРАНИЦУ?
-                    if not self._should_process_page(page, page_num):
-                        total_pages_skipped += 1
-                        # Освобождаем память
-                        del page
-                        continue
-                    
-                    self._log(f"\n📖 {'='*60}")
-                    self._log(f"📖 ОБРАБОТКА СТРАНИЦЫ {page_num}/{end_page} (ленивая загрузка)")
-                    self._log(f"📖 {'='*60}")
-                    
-                    page_tables = self._extract_tables_universal(page, page_num)
-                    if page_tables:
-                        all_tables.extend(page_tables)
-                        total_pages_processed += 1
-                    
-                    # Анализ текста только если есть таблицы
-                    if page_tables:
-                        self._extract_and_analyze_text(page, page_num)
-                    
-                    # Освобождаем память после обработки страницы
-                    del page
-                    import gc
-                    gc.collect()
-            
-            # Сводка по обработке
-            self._log(f"\n📊 {'='*60}")
-            self._log(f"📊 СВОДКА ПО ПАРСИНГУ (ленивая загрузка):")
-            self._log(f"📊 Всего страниц в PDF: {total_pages}")
-            self._log(f"📊 Диапазон обработки: {start_page}-{end_page}")
-            self._log(f"📊 Обработано страниц: {total_pages_processed}")
-            self._log(f"📊 Пропущено страниц: {total_pages_skipped}")
-            self._log(f"📊 Найдено таблиц: {len(all_tables)}")
-            self._log(f"📊 {'='*60}")
-            
-            if all_tables:
-                # Выбираем только лучшие таблицы (без дублирования страниц)
-                best_tables = []
-                pages_processed = set()
-                for table in all_tables:
-                    page = table['_source_page'].iloc[0] if '_source_page' in table.columns else 0
-                    if page not in pages_processed:
-                        best_tables.append(table)
-                        pages_processed.add(page)
-                
-                self._log(f"📊 Выбрано {len(best_tables)} лучших таблиц из {len(all_tables)}")
-                result_df = self._merge_all_tables(best_tables)
-            else:
-                result_df = pd.DataFrame()
-            
-            result_df = self._replace_na_values(result_df)
-            self._analyze_final_result(result_df, file_path)
-            
-            if not result_df.empty:
-                self._log(f"✅ УСПЕХ! СОЗДАН DATAFRAME: {result_df.shape}")
-                # Извлекаем радиаторы из результата
-                radiators = self.extract_radiators_from_dataframe(result_df)
-                self._log(f"✅ Извлечено {len(radiators)} позиций радиаторов")
-            else:
-                self._log("⚠️ ВНИМАНИЕ: В PDF НЕ НАЙДЕНО ТАБЛИЧНЫХ ДАННЫХ")
-            
-            return result_df
-            
-        except Exception as e:
-            error_msg = f"❌ ОШИБКА ПАРСИНГА С ЛЕНИВОЙ ЗАГРУЗКОЙ {file_path}:\n{str(e)}\n{traceback.format_exc()}"
-            self._log(error_msg, "ERROR")
-            raise RuntimeError(error_msg)
+        return self.parse_to_dataframe(file_path, start_page=start_page, end_page=end_page, max_pages=max_pages,
+                                       page_policy="range", bounded_memory=True)
+
+# ============ ФУНКЦИИ РАБОЧИХ ПРОЦЕССОВ (ПАРАЛЛЕЛЬНЫЙ РЕЖИМ) ============
+# Должны быть на уровне модуля, чтобы передаваться в дочерние процессы
+_worker_parser = None
+_worker_pdf = None
+_worker_memory = None
+
+
+def _terminate_executor(executor):
+    """Останавливает пул процессов без ожидания: ожидающие задачи снимаются, живые процессы завершаются"""
+    # Список процессов - до shutdown(): после него пул его сбрасывает
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=1)
+
+
+def _init_page_worker(file_path: str, debug_mode: bool = False, cache_dir: Optional[str] = None,
+                      page_verdicts: Optional[Dict[int, bool]] = None,
+                      page_time_budget: Optional[float] = None,
+                      bounded_memory: bool = False,
+                      memory_ceiling_mb: Optional[float] = None,
+                      use_ocr: bool = True,
+                      use_triage: bool = True,
+                      use_table_region: bool = True):
+    """
+    Инициализация рабочего процесса: один парсер и один открытый PDF на процесс.
+    Настройки, влияющие на извлечение и версию дискового кэша (OCR, отбор, область таблицы), - как у главного парсера
+    """
+    global _worker_parser, _worker_pdf, _worker_memory
+    import pdfplumber
+    _worker_parser = PDFParser(use_cache=cache_dir is not None, cache_dir=cache_dir,
+                               bounded_memory=bounded_memory, memory_ceiling_mb=memory_ceiling_mb,
+                               use_ocr=use_ocr)
+    _worker_memory = MemoryMonitor(memory_ceiling_mb)
+    _worker_parser.debug_mode = debug_mode
+    _worker_parser.page_time_budget = page_time_budget
+    _worker_parser.use_triage = use_triage
+    _worker_parser.use_table_region = use_table_region
+    _worker_parser._bind_page_cache(file_path)
+    # Вердикты быстрого отбора из главного процесса - страницы не проверяются повторно
+    _worker_parser._page_verdicts.update(page_verdicts or {})
+    _worker_pdf = pdfplumber.open(file_path)
+
+
+def _process_page_range(page_nums: List[int], strategy_policy: str = "adaptive") -> List[tuple]:
+    """
+    Обрабатывает блок страниц в рабочем процессе:
+    [(номер страницы, таблицы или None, превышен ли лимит времени), ...]
+    """
+    global _worker_pdf
+    results = []
+    for page_num in page_nums:
+        page = _worker_pdf.pages[page_num - 1]
+        page_tables = _worker_parser._process_page_cached(page, page_num, strategy_policy)
+        results.append((page_num, page_tables, page_num in _worker_parser.pages_over_budget))
+        if _worker_parser.bounded_memory:
+            _worker_parser._release_page(page, page_num)
+        if _worker_parser.bounded_memory and _worker_memory is not None and _worker_memory.release_due():
+            import gc
+            import pdfplumber
+            _worker_pdf.close()
+            gc.collect()
+            _worker_pdf = pdfplumber.open(_worker_parser._page_cache_key[0])
+    return results
+
 
 # ============ ТЕСТОВЫЙ БЛОК ============
 if __name__ == "__main__":
     # Тестирование нового функционала
-    parser = PDFParser()
+    parser = PDFParser(debug_mode=True)
     
     # Тестовый PDF файл
     test_pdf = "03_2023-72.206, 72.208-ОВ_секция 1.pdf"
@@ -0,0 +1,228 @@
+# pdf_scoring.py
+import re
+from typing import List, Tuple, Dict, Iterable
+
+
+class RuleSet:
+    """
+    Набор правил-признаков, проверяемых за один проход по тексту.
+    Все правила компилируются один раз в общее выражение вида (?=(?P<r0>...)|(?P<r1>...)|...),
+    поэтому текст сканируется один раз, а не отдельным re.search на каждое правило.
+    Правило, которое могло быть перекрыто другим правилом в той же позиции, дополнительно
+    проверяется только в позициях совпадений - результат совпадает с поштучным re.search.
+
+    Правило: (имя признака, регулярное выражение, вес).
+    Для отдельного правила флаги можно переопределить внутри выражения, например (?-i:...)
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, str, int]], flags: int = re.IGNORECASE):
+        self.rules = list(rules)
+        self.names = [name for name, _, _ in self.rules]
+        self.weights = {name: weight for name, _, weight in self.rules}
+        self._compiled = [re.compile(pattern, flags) for _, pattern, _ in self.rules]
+        combined = '|'.join(f'(?P<r{idx}>{pattern})' for idx, (_, pattern, _) in enumerate(self.rules))
+        self._combined = re.compile(f'(?=(?:{combined}))', flags)
+
+    def scan(self, text: str) -> List[str]:
+        """Имена сработавших признаков (в порядке объявления правил)"""
+        if not text:
+            return []
+        fired = set()
+        positions = []
+        for match in self._combined.finditer(text):
+            fired.add(int(match.lastgroup[1:]))
+            positions.append(match.start())
+            if len(fired) == len(self.rules):
+                break
+
+        # Правила, не сработавшие ни разу, могли быть перекрыты в уже найденных позициях
+        if positions and len(fired) < len(self.rules):
+            for idx, compiled in enumerate(self._compiled):
+                if idx not in fired and any(compiled.match(text, pos) for pos in positions):
+                    fired.add(idx)
+
+        return [self.names[idx] for idx in sorted(fired)]
+
+    def score(self, text: str) -> Tuple[int, List[str]]:
+        """Сумма весов сработавших признаков и их имена"""
+        fired = self.scan(text)
+        return sum(self.weights[name] for name in fired), fired
+
+
+class KeywordSet:
+    """
+    Поиск списка ключевых слов (точное вхождение подстроки) одним выражением.
+    Длинные слова стоят в чередовании раньше коротких, поэтому слово, входящее в найденное
+    более длинное в той же позиции ('радиатор' в 'радиаторный'), отдельно не засчитывается
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        self._regex = re.compile('|'.join(re.escape(keyword) for keyword in ordered)) if ordered else None
+
+    def find(self, text: str) -> List[str]:
+        """Найденные ключевые слова (в порядке исходного списка)"""
+        if not text or self._regex is None:
+            return []
+        found = set(self._regex.findall(text))
+        return [keyword for keyword in self.keywords if keyword in found]
+
+    def contains_any(self, text: str) -> bool:
+        return bool(text) and self._regex is not None and self._regex.search(text) is not None
+
+
+# ============ КЛЮЧЕВЫЕ СЛОВА СТРАНИЦЫ (радиаторы и смежная тематика) ============
+RADIATOR_KEYWORDS = (
+    # Основные термины
+    'радиатор', 'радиаторный', 'радиаторная', 'радиаторное', 'радиаторные',
+    'стальной', 'панельный', 'панельная', 'панельное', 'панельные',
+    'отопление', 'отопительный', 'отопительная', 'отопительное', 
+    'конвектор', 'конвекторный',
+    
+    # Типы и серии
+    'тип 11', 'тип 22', 'тип 33', 'тип 21', 'тип 23', 'тип 10', 'тип 20',
+    'h33', 'h22', 'h21', 'c21', 'c22', 'h33-', 'h22-', 'h21-', 'c11',
+    'compact', 'ventil', 'гигиенический', 'hygiene', 'универсал',
+    
+    # Бренды
+    'royal', 'thermo', 'royal thermo', 'buderus', 'kermi', 'purmo', 'purmo',
+    'evra', 'hiterm', 'cv', 'ftv', 'fto', 'ftk',
+    
+    # Подключение
+    'нижним подключением', 'боковым подключением',
+    'нижнее подключение', 'боковое подключение', 'нижний подключение',
+    'универсальное подключение',
+    
+    # Размеры
+    'высотой', 'длиной', 'l=', 'высота', 'длина', 'ширина', 'глубина',
+    '500x800', '300x1000', '400x1200', '600x900',
+    
+    # Английские термины
+    'radiator', 'panel', 'heater', 'steel', 'radiators', 'convector',
+    'panel radiator', 'steel panel',
+    
+    # Для спецификаций
+    'спецификация', 'ведомость', 'оборудование', 'материалы',
+    'позиция', 'наименование', 'марка', 'тип',
+    
+    # Единицы измерения
+    'шт', 'шт.', 'ед', 'ед.', 'pcs', 'pc', 'qty', 'quantity',
+    'кол-во', 'количество', 'единиц',
+    
+    # Мощность
+    'вт', 'ватт', 'watt', 'qn', 'qp', 'мощность', 'теплоотдача',
+    
+    # Регистры
+    'рг-', 'регистр', 'регистровый',
+)
+
+# ============ ПРИЗНАКИ СТРАНИЦЫ (быстрый отбор страниц) ============
+# Текст страницы приводится к нижнему регистру; имена признаков используются в логах
+PAGE_RULES = RuleSet([
+    ('модель_HCK', r'\b[HСCКK]\d{1,2}[-\s]*\d{3,4}[-\s]*\d{3,4}\b', 1),  # H33-200-1000, C21-300-600
+    ('PURMO_тип', r'\bPURMO\s+[CHK]\s*\d{1,2}', 1),  # PURMO C 21, PURMO H 20
+    ('тип_L', r'\bтип\s*\d+\s*[Ll]\s*[=:]\s*\d+\s*мм', 1),
+    ('высота', r'\bвысотой\s*\d+\s*мм', 1),
+    ('длина', r'\bдлин[аой]\s*\d+\s*мм', 1),
+    ('размер_Вт', r'\b\d{3,4}\s*[xх×]\s*\d{3,4}\s*Вт\b', 1),  # 500x800 Вт
+    ('мощность_Q', r'\b[Qq][нp]\s*[=:]\s*\d+\s*Вт\b', 1),  # Qн=2356 Вт
+    ('радиатор_шт', r'\b(?:радиатор|конвектор)\s*[^.]{0,50}\d+\s*шт\b', 1),  # радиатор ... 2 шт
+    # Служебные признаки (без учёта регистра не нужны - текст уже в нижнем регистре)
+    ('количество', r'(?-i:коли[ -]?чество|кол[ -]?во|ед\.|шт\.|pcs|pc|qty|единиц|штук)', 0),
+    ('спецификация', r'(?-i:спецификация|ведомость|оборудован[иея]|материал[ыов]|позиция|наименование)', 0),
+    ('модель_PURMO', r'(?-i:PURMO\s+[CHK]\s*\d{1,2})', 0),
+])
+PAGE_SERVICE_FEATURES = ('количество', 'спецификация', 'модель_PURMO')
+
+# ============ ПРИЗНАКИ ТАБЛИЦЫ (приём извлечённой таблицы) ============
+TABLE_RULES = RuleSet([
+    ('радиатор', r'радиатор|стальной|панельный|отопительн', 3),
+    ('бренд', r'PURMO|KERMI|BUDERUS|ROYAL', 2),
+    ('размеры', r'\d{3,4}\s*[xх×]\s*\d{3,4}', 2),
+    ('количество', r'шт|шт\.|ед|ед\.|кол-во|количество', 2),
+    ('мощность', r'Вт|ватт|Qн|Qp', 1),
+    ('модель_PURMO', r'C\s*\d{1,2}s|H\s*\d{1,2}', 3),  # Высокий балл за специфические модели PURMO
+])
+
+_keyword_sets: Dict[Tuple[str, ...], KeywordSet] = {}
+
+
+def keyword_set(keywords: Iterable[str]) -> KeywordSet:
+    """Скомпилированный набор ключевых слов (один на каждый уникальный список)"""
+    key = tuple(keywords)
+    if key not in _keyword_sets:
+        _keyword_sets[key] = KeywordSet(key)
+    return _keyword_sets[key]
+
+
+def score_page_text(text_lower: str, keywords: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Признаки страницы за один проход по каждому набору правил.
+    :param text_lower: Текст страницы в нижнем регистре
+    :param keywords: Ключевые слова радиаторной тематики
+    :return: {'keywords': [...], 'patterns': [...], 'features': [...все сработавшие признаки...]}
+    """
+    features = PAGE_RULES.scan(text_lower)
+    return {
+        'keywords': keyword_set(keywords).find(text_lower),
+        'patterns': [name for name in features if name not in PAGE_SERVICE_FEATURES],
+        'features': features,
+    }
+
+
+def score_table_text(text: str) -> Tuple[int, List[str]]:
+    """Баллы таблицы по признакам радиаторов и список сработавших признаков"""
+    return TABLE_RULES.score(text)
+
+
+# ============ РЕЛЕВАНТНОСТЬ СТРАНИЦЫ (отбор страниц, окно выбора страниц) ============
+# Меньше символов на странице - вероятно, чертёж или схема
+PAGE_MIN_TEXT = 50
+# Геометрия таблицы: столбцы - левые границы слов, повторяющиеся во многих строках страницы
+TABLE_MIN_ROWS = 8
+TABLE_MIN_COLUMNS = 4
+
+
+def page_is_relevant(page_score: Dict[str, List[str]]) -> bool:
+    """
+    Правило отбора страницы парсером по признакам score_page_text():
+    (ключевые слова или паттерны радиаторов) и (столбец количества или заголовок спецификации),
+    либо чёткие модели PURMO
+    """
+    features = page_score['features']
+    return (
+        (bool(page_score['keywords']) or bool(page_score['patterns'])) and
+        ('количество' in features or 'спецификация' in features)
+    ) or 'модель_PURMO' in features
+
+
+def looks_like_table(words) -> bool:
+    """
+    Табличная геометрия текста: не меньше TABLE_MIN_COLUMNS левых границ слов (с точностью 5 pt),
+    каждая из которых повторяется не меньше чем в TABLE_MIN_ROWS строках.
+    У сплошного текста и выносок чертежа таких выровненных столбцов нет
+    :param words: Слова страницы PyMuPDF: (x0, y0, x1, y1, текст, ...)
+    """
+    rows: Dict[int, set] = {}
+    for word in words:
+        rows.setdefault(round(word[1] / 3), set()).add(round(word[0] / 5))
+    if len(rows) < TABLE_MIN_ROWS:
+        return False
+    column_rows: Dict[int, int] = {}
+    for row_columns in rows.values():
+        for column in row_columns:
+            column_rows[column] = column_rows.get(column, 0) + 1
+    return sum(1 for count in column_rows.values() if count >= TABLE_MIN_ROWS) >= TABLE_MIN_COLUMNS
+
+
+def page_relevance_level(text: str, words, keywords: Iterable[str] = RADIATOR_KEYWORDS) -> int:
+    """
+    Дешёвая оценка страницы по текстовому слою (без извлечения таблиц):
+    2 - вероятная спецификация (правило отбора парсера и табличная геометрия),
+    1 - возможная (одно из двух), 0 - признаков нет
+    """
+    if not text or len(text.strip()) < PAGE_MIN_TEXT:
+        return 0
+    relevant = page_is_relevant(score_page_text(text.lower(), keywords))
+    return int(relevant) + int(looks_like_table(words))
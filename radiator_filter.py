@@ -0,0 +1,77 @@
+# radiator_filter.py
+import re
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# ============ ГРУБЫЙ ФИЛЬТР СТРОК РАДИАТОРОВ ============
+# Строка спецификации похожа на радиатор, если содержит хотя бы одно слово из списка (без учёта регистра).
+# Общий для загрузки Excel/CSV/ODS, PDF и потокового чтения таблиц (spec_readers)
+RADIATOR_ROW_KEYWORDS = (
+    'радиатор', 'radiator', 'панель', 'panel', 'отопительный', 'heating',
+    'k-profil', 'vk-profil', 'compact', 'ventil', 'prado', 'royal', 'purmo',
+    'тип', 'type', 'fto', 'ftv', 'ftk', 'u22', 'c22', 'u11', 'c11',
+    'нижнее подключение', 'боковое подключение', 'universal', 'classic'
+)
+
+# Одно выражение на все слова: строка (в нижнем регистре) сканируется один раз
+RADIATOR_ROW_RE = re.compile('|'.join(re.escape(keyword) for keyword in RADIATOR_ROW_KEYWORDS))
+
+
+def is_radiator_row_loose(row_text: str) -> bool:
+    """Упрощённая проверка: содержит ли строка признаки радиатора (даже частично)."""
+    if not row_text or not isinstance(row_text, str):
+        return False
+    return RADIATOR_ROW_RE.search(row_text.lower()) is not None
+
+
+def row_text(cells: Iterable[Any]) -> str:
+    """Текст строки таблицы для фильтра: непустые ячейки через пробел"""
+    return ' '.join(str(cell) for cell in cells if cell is not None and cell == cell and cell != '')
+
+
+# ============ ВЕКТОРНЫЙ ФИЛЬТР ДЛЯ DATAFRAME ============
+def keyword_pattern(keywords: Iterable[str]) -> re.Pattern:
+    """Скомпилированное чередование ключевых слов (точное вхождение подстроки)"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+def contains_any(texts: pd.Series, keywords) -> pd.Series:
+    """
+    Маска строк, содержащих хотя бы одно слово: один str.contains на весь столбец.
+    :param keywords: Список слов или готовое выражение (re.Pattern)
+    """
+    pattern = keywords if isinstance(keywords, re.Pattern) else keyword_pattern(keywords)
+    return texts.str.contains(pattern, regex=True, na=False)
+
+
+def row_text_series(df: pd.DataFrame, columns: Optional[Sequence[int]] = None) -> pd.Series:
+    """
+    Текст каждой строки DataFrame, собранный по столбцам (а не по строкам):
+    непустые ячейки через пробел, как в row_text()
+    :param columns: Позиции столбцов (None - все)
+    """
+    positions = range(df.shape[1]) if columns is None else columns
+    text = np.full(len(df), '', dtype=object)
+    for position in positions:
+        column = df.iloc[:, position]
+        present = column.notna()
+        # Пропуски заменяются до astype(str): в новых pandas astype(str) оставляет NaN как есть
+        values = column.astype(object).where(present, '').astype(str).to_numpy(dtype=object)
+        present = present.to_numpy()
+        # Пробел только между непустыми частями
+        separator = np.where(present & (text != ''), ' ', '')
+        text = np.where(present, text + separator + values, text)
+    return pd.Series(text, index=df.index, dtype=object)
+
+
+def radiator_row_mask(df: pd.DataFrame, columns: Optional[Sequence[int]] = None) -> pd.Series:
+    """
+    Векторный аналог is_radiator_row_loose для всех строк DataFrame:
+    текст строк собирается один раз, ключевые слова ищутся одним выражением.
+    :return: Булева маска с индексом df
+    """
+    if df.empty:
+        return pd.Series(False, index=df.index, dtype=bool)
+    return contains_any(row_text_series(df, columns).str.lower(), RADIATOR_ROW_RE)
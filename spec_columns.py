@@ -0,0 +1,134 @@
+# spec_columns.py
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from radiator_filter import RADIATOR_ROW_RE, contains_any, keyword_pattern
+
+# ============ ОПРЕДЕЛЕНИЕ ЗАГОЛОВКА И СТОЛБЦОВ СПЕЦИФИКАЦИИ ============
+# Заголовок и столбцы ищутся только в первых строках листа - загрузка не зависит от размера файла
+HEADER_SCAN_ROWS = 30
+
+# Слова заголовков по ролям столбцов (сравнение в нижнем регистре, вхождение подстроки)
+NAME_HEADER_KEYWORDS = ('наименование', 'название', 'номенклатура', 'описание', 'name')
+QTY_HEADER_KEYWORDS = ('кол-во', 'количество', 'колич', 'кол.', 'qty', 'quantity')
+ARTICLE_HEADER_KEYWORDS = ('артикул', 'art', 'код')
+
+_HEADER_PATTERNS = {
+    'name': keyword_pattern(NAME_HEADER_KEYWORDS),
+    'qty': keyword_pattern(QTY_HEADER_KEYWORDS),
+    'art': keyword_pattern(ARTICLE_HEADER_KEYWORDS),
+}
+
+# Артикул - одно "слово" с цифрами не короче 5 символов (7724722050, FTV-22-500)
+_ARTICLE_RE = r'[\w\-./]*\d[\w\-./]*'
+ARTICLE_MIN_LENGTH = 5
+# Даты и дробные числа (цены, суммы) похожи на артикул - без заголовка "артикул" столбец с ними не артикул
+_DATE_RE = r'\d{1,2}[./]\d{1,2}[./]\d{2,4}'
+_DECIMAL_RE = r'-?\d+[.,]\d{1,2}'
+
+# Количество радиаторов в строке спецификации - положительное число до этого предела
+QTY_MAX_VALUE = 100000
+
+# Минимальная уверенность, при которой столбец считается найденным
+MIN_CONFIDENCE = 0.3
+
+
+def _column_texts(df: pd.DataFrame) -> pd.DataFrame:
+    """Текст ячеек в нижнем регистре, пустые ячейки - ''"""
+    return pd.DataFrame(
+        {position: df.iloc[:, position].astype(object).where(df.iloc[:, position].notna(), '')
+            .astype(str).str.strip().str.lower()
+         for position in range(df.shape[1])},
+        index=df.index)
+
+
+def _header_hits(texts: pd.DataFrame, role: str) -> pd.DataFrame:
+    """Булева таблица: ячейка похожа на заголовок столбца роли"""
+    pattern = _HEADER_PATTERNS[role]
+    return pd.DataFrame({position: contains_any(texts[position], pattern) for position in texts.columns},
+                        index=texts.index)
+
+
+def _share(mask: pd.DataFrame, filled: pd.DataFrame) -> pd.Series:
+    """Доля непустых ячеек столбца, для которых выполняется условие"""
+    counts = filled.sum()
+    return (mask & filled).sum() / counts.where(counts > 0, 1)
+
+
+def detect_spec_columns(df: pd.DataFrame, scan_rows: int = HEADER_SCAN_ROWS,
+                        use_labels: bool = False,
+                        roles: Iterable[str] = ('name', 'qty', 'art')) -> Dict[str, object]:
+    """
+    Находит строку заголовка и столбцы наименования, количества и артикула по первым scan_rows строкам.
+    Каждый столбец оценивается целиком (операции pandas над столбцом, без перебора ячеек):
+    слово заголовка, доля чисел-количеств, доля наименований радиаторов, доля артикулов.
+    :param use_labels: Заголовки столбцов df (а не строка листа) - строка заголовка
+    :param roles: Какие столбцы искать; каждому столбцу достаётся не больше одной роли
+    :return: {'header_row': метка строки заголовка или None,
+              'name_col'/'qty_col'/'art_col': позиция столбца или None,
+              'confidence': {'name'/'qty'/'art': уверенность 0..1}}
+    """
+    roles = tuple(roles)
+    result = {'header_row': None, 'name_col': None, 'qty_col': None, 'art_col': None,
+              'confidence': {role: 0.0 for role in roles}}
+    if df.shape[1] == 0:
+        return result
+
+    window = df.iloc[:scan_rows]
+    texts = _column_texts(window)
+    if use_labels:
+        labels = pd.Series([str(label).strip().lower() for label in df.columns])
+        header_hits = {role: contains_any(labels, _HEADER_PATTERNS[role]).to_numpy() for role in roles}
+        data = texts
+    else:
+        hits = {role: _header_hits(texts, role) for role in roles}
+        # Строка заголовка - первая строка с наибольшим числом ролей
+        roles_per_row = sum(hit.any(axis=1).astype(int) for hit in hits.values())
+        if len(roles_per_row) and roles_per_row.max() > 0:
+            header_position = int(np.argmax(roles_per_row.to_numpy()))
+            result['header_row'] = texts.index[header_position]
+            header_hits = {role: hit.iloc[header_position].to_numpy() for role, hit in hits.items()}
+            data = texts.iloc[header_position + 1:]
+        else:
+            header_hits = {role: np.zeros(texts.shape[1], dtype=bool) for role in roles}
+            data = texts
+
+    # Признаки содержимого столбцов под заголовком
+    filled = data != ''
+    numbers = data.apply(lambda column: pd.to_numeric(
+        column.str.replace(' ', '', regex=False).str.replace(',', '.', regex=False), errors='coerce'))
+    qty_like = (numbers > 0) & (numbers < QTY_MAX_VALUE)
+    radiator_like = data.apply(lambda column: contains_any(column, RADIATOR_ROW_RE))
+    article_like = data.apply(lambda column: column.str.fullmatch(_ARTICLE_RE)
+                              & (column.str.len() >= ARTICLE_MIN_LENGTH))
+    date_or_price = data.apply(lambda column: column.str.match(_DATE_RE) | column.str.fullmatch(_DECIMAL_RE))
+    text_like = filled & numbers.isna()
+
+    content = {
+        'name': 0.7 * _share(radiator_like, filled) + 0.3 * _share(text_like, filled),
+        'qty': _share(qty_like, filled),
+        'art': _share(article_like, filled) * (1 - _share(radiator_like, filled)),
+    }
+    if 'art' in roles:
+        # Даты и цены засчитываются артикулами, только если заголовок называет столбец артикулом
+        strict_art = _share(article_like & ~date_or_price, filled) * (1 - _share(radiator_like, filled))
+        content['art'] = content['art'].where(pd.Series(header_hits['art'], index=texts.columns), strict_art)
+    scores = {role: pd.Series(0.5 * header_hits[role], index=texts.columns) + 0.5 * content[role]
+              for role in roles}
+
+    # Роли распределяются по убыванию уверенности: один столбец - одна роль
+    candidates = sorted(((score, role, position)
+                         for role, column_scores in scores.items()
+                         for position, score in column_scores.items()),
+                        key=lambda item: -item[0])
+    taken = set()
+    for score, role, position in candidates:
+        if score < MIN_CONFIDENCE or result[f'{role}_col'] is not None or position in taken:
+            continue
+        result[f'{role}_col'] = int(position)
+        result['confidence'][role] = round(float(score), 3)
+        taken.add(position)
+    return result
+
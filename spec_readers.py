@@ -0,0 +1,391 @@
+# spec_readers.py
+import csv
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from radiator_filter import is_radiator_row_loose, row_text
+from spec_columns import detect_spec_columns
+
+# Форматы таблиц, которые читаются построчно
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+XLS_EXTENSIONS = ('.xls',)
+ODS_EXTENSIONS = ('.ods',)
+TEXT_EXTENSIONS = ('.csv', '.tsv', '.txt')
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + XLS_EXTENSIONS + ODS_EXTENSIONS + TEXT_EXTENSIONS
+
+# Кодировка и разделитель текстовых таблиц определяются по началу файла
+TEXT_SAMPLE_BYTES = 64 * 1024
+# Кандидаты в разделители в порядке предпочтения
+TEXT_DELIMITERS = '\t;,|'
+# Однобайтные кириллические кодировки в порядке предпочтения (при равной оценке выбирается первая)
+CYRILLIC_ENCODINGS = ('cp1251', 'koi8-r', 'cp866', 'mac-cyrillic', 'iso8859-5')
+_CYRILLIC_ALIASES = {'windows-1251', 'cp1251', 'koi8-r', 'ibm866', 'cp866', 'maccyrillic',
+                     'mac-cyrillic', 'iso-8859-5', 'iso8859-5'}
+
+# Лист берётся в объединение, если на нём не меньше этой доли строк радиаторов от лучшего листа
+SHEET_MIN_SHARE = 0.1
+# Книги меньше этого размера читаются по листам в одном процессе
+PARALLEL_SCAN_MIN_BYTES = 1024 * 1024
+
+# Первые строки листа всегда сохраняются целиком - по ним определяется заголовок таблицы
+HEADER_WINDOW_ROWS = 20
+
+# Пространства имён OpenDocument (content.xml)
+_ODS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+_ODS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+_ODS_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+
+def _normalize_cell(value: Any) -> Any:
+    """Значение ячейки как у pd.read_excel: пустые - None, целые дробные числа - int"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _strip_trailing_empty(row: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    end = len(row)
+    while end and row[end - 1] is None:
+        end -= 1
+    return row[:end]
+
+
+# ============ ПОСТРОЧНОЕ ЧТЕНИЕ ЛИСТА ============
+def iter_xlsx_rows(file_path: str, sheet_index: int = 0) -> Iterator[Tuple[Any, ...]]:
+    """Строки листа .xlsx/.xlsm: openpyxl в режиме read_only, лист в память не загружается"""
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_index]
+        for row in sheet.iter_rows(values_only=True):
+            yield tuple(_normalize_cell(value) for value in row)
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(file_path: str, sheet_index: int = 0) -> Iterator[Tuple[Any, ...]]:
+    """Строки листа .xls (xlrd, листы загружаются по требованию)"""
+    import xlrd
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(sheet_index)
+        for row_idx in range(sheet.nrows):
+            yield tuple(_normalize_cell(value) for value in sheet.row_values(row_idx))
+    finally:
+        book.release_resources()
+
+
+def _ods_cell_value(cell: ET.Element) -> Any:
+    value_type = cell.get(f"{{{_ODS_OFFICE}}}value-type")
+    if value_type in ('float', 'percentage', 'currency'):
+        try:
+            return float(cell.get(f"{{{_ODS_OFFICE}}}value"))
+        except (TypeError, ValueError):
+            return None
+    if value_type == 'date':
+        return cell.get(f"{{{_ODS_OFFICE}}}date-value")
+    if value_type == 'boolean':
+        return cell.get(f"{{{_ODS_OFFICE}}}boolean-value") == 'true'
+    paragraphs = [''.join(p.itertext()) for p in cell.iter(f"{{{_ODS_TEXT}}}p")]
+    return '\n'.join(paragraphs) if paragraphs else None
+
+
+def iter_ods_rows(file_path: str, sheet_index: int = 0) -> Iterator[Tuple[Any, ...]]:
+    """
+    Строки листа .ods: потоковый разбор content.xml (xml.etree.iterparse),
+    odfpy не нужен. Повторы пустых строк и ячеек в конце листа не разворачиваются
+    """
+    table_tag = f"{{{_ODS_TABLE}}}table"
+    row_tag = f"{{{_ODS_TABLE}}}table-row"
+    cell_tags = (f"{{{_ODS_TABLE}}}table-cell", f"{{{_ODS_TABLE}}}covered-table-cell")
+    rows_repeated = f"{{{_ODS_TABLE}}}number-rows-repeated"
+    columns_repeated = f"{{{_ODS_TABLE}}}number-columns-repeated"
+
+    with zipfile.ZipFile(file_path) as archive, archive.open("content.xml") as content:
+        table_number = -1
+        for event, element in ET.iterparse(content, events=("start", "end")):
+            if element.tag == table_tag:
+                if event == "start":
+                    table_number += 1
+                elif table_number == sheet_index:
+                    # Конец нужного листа
+                    return
+                continue
+            if event != "end" or element.tag != row_tag:
+                continue
+            if table_number != sheet_index:
+                # Строки других листов не разбираются, только освобождается память
+                element.clear()
+                continue
+
+            values: List[Any] = []
+            for cell in element:
+                if cell.tag not in cell_tags:
+                    continue
+                value = _normalize_cell(_ods_cell_value(cell))
+                values.extend([value] * int(cell.get(columns_repeated, 1)))
+            values = _strip_trailing_empty(tuple(values))
+            repeat = int(element.get(rows_repeated, 1)) if values else 1
+            element.clear()
+
+            for _ in range(repeat):
+                yield values
+
+
+def _decode_sample(sample: bytes, encoding: str) -> Optional[str]:
+    """Образец в заданной кодировке; многобайтный символ, обрезанный границей образца, отбрасывается"""
+    for cut in range(4):
+        try:
+            return sample[:len(sample) - cut].decode(encoding)
+        except UnicodeDecodeError as e:
+            # Ошибка не в последних байтах - кодировка не подходит
+            if e.start < len(sample) - 4:
+                return None
+    return None
+
+
+def _best_cyrillic_encoding(sample: bytes) -> str:
+    """
+    Однобайтная кириллическая кодировка, в которой образец больше всего похож на русский текст:
+    больше всего букв, при равенстве - строчных (chardet путает windows-1251 и MacCyrillic)
+    """
+    def score(encoding: str) -> Tuple[int, int]:
+        text = sample.decode(encoding, errors='ignore')
+        return (sum(1 for char in text if 'а' <= char.lower() <= 'я' or char in 'ёЁ'),
+                sum(1 for char in text if 'а' <= char <= 'я' or char == 'ё'))
+    return max(CYRILLIC_ENCODINGS, key=score)
+
+
+def _consistent_delimiter(lines: List[str]) -> str:
+    """
+    Разделитель, дающий одинаковое число полей (больше одного) в наибольшей доле строк образца.
+    При равенстве - по порядку TEXT_DELIMITERS: ';' и табуляция важнее ',', которая встречается
+    в дробных ценах выгрузок (1;Радиатор;2;12345,50)
+    """
+    best_sep, best_share = ',', 0.0
+    for sep in TEXT_DELIMITERS:
+        counts = [len(fields) for fields in csv.reader(lines, delimiter=sep)]
+        counts = [count for count in counts if count > 1]
+        if not counts:
+            continue
+        modal = max(set(counts), key=counts.count)
+        share = counts.count(modal) / len(lines)
+        if share > best_share:
+            best_sep, best_share = sep, share
+    return best_sep
+
+
+def _detect_delimiter(text: str) -> str:
+    """Разделитель: табуляция или ';' в первой строке, иначе самый согласованный по строкам образца"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return ','
+    if '\t' in lines[0]:
+        return '\t'  # TSV
+    if ';' in lines[0]:
+        return ';'   # CSV с точкой с запятой
+    return _consistent_delimiter(lines)
+
+
+def detect_text_format(file_path: str, sample_bytes: int = TEXT_SAMPLE_BYTES) -> Tuple[str, str]:
+    """
+    Кодировка и разделитель текстовой таблицы по образцу из начала файла (не больше sample_bytes):
+    BOM, проверка UTF-8, иначе chardet; разделитель - по первой строке и согласованности строк образца
+    :return: (кодировка, разделитель)
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+
+    if sample.startswith(b'\xef\xbb\xbf'):
+        encoding = 'utf-8-sig'
+        text = _decode_sample(sample[3:], 'utf-8')
+    else:
+        text = _decode_sample(sample, 'utf-8')
+        encoding = 'utf-8'
+    if text is None:
+        import chardet
+        detected = chardet.detect(sample)['encoding']
+        # Выгрузки без UTF-8 из отечественных учётных систем - обычно windows-1251
+        encoding = detected if detected else 'cp1251'
+        if encoding.lower().replace('_', '-') in _CYRILLIC_ALIASES:
+            encoding = _best_cyrillic_encoding(sample)
+        text = sample.decode(encoding, errors='ignore')
+
+    # Последняя строка образца может быть обрезана - разделитель ищется только по целым строкам
+    if len(sample) == sample_bytes and '\n' in text:
+        text = text[:text.rindex('\n')]
+    return encoding, _detect_delimiter(text)
+
+
+def iter_text_rows(file_path: str) -> Iterator[Tuple[Any, ...]]:
+    """Строки CSV/TSV/TXT (модуль csv, файл читается построчно)"""
+    encoding, sep = detect_text_format(file_path)
+    with open(file_path, 'r', encoding=encoding, errors='ignore', newline='') as f:
+        for row in csv.reader(f, delimiter=sep):
+            yield tuple(_normalize_cell(value) for value in row)
+
+
+def iter_sheet_rows(file_path: str, sheet_index: int = 0) -> Iterator[Tuple[Any, ...]]:
+    """Строки листа (по номеру с 0) таблицы любого поддерживаемого формата"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        return iter_xlsx_rows(file_path, sheet_index)
+    if extension in XLS_EXTENSIONS:
+        return iter_xls_rows(file_path, sheet_index)
+    if extension in ODS_EXTENSIONS:
+        return iter_ods_rows(file_path, sheet_index)
+    if extension in TEXT_EXTENSIONS:
+        return iter_text_rows(file_path)
+    raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+
+
+def list_sheet_names(file_path: str) -> List[str]:
+    """Имена листов книги по порядку; у текстовой таблицы один лист - имя файла"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    if extension in XLS_EXTENSIONS:
+        import xlrd
+        book = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            return list(book.sheet_names())
+        finally:
+            book.release_resources()
+    if extension in ODS_EXTENSIONS:
+        table_tag = f"{{{_ODS_TABLE}}}table"
+        names = []
+        with zipfile.ZipFile(file_path) as archive, archive.open("content.xml") as content:
+            for event, element in ET.iterparse(content, events=("start", "end")):
+                if element.tag == table_tag and event == "start":
+                    names.append(element.get(f"{{{_ODS_TABLE}}}name") or f"Лист{len(names) + 1}")
+                elif event == "end" and element.tag != table_tag:
+                    element.clear()
+        return names
+    if extension in TEXT_EXTENSIONS:
+        return [os.path.basename(file_path)]
+    raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+
+
+# ============ ЧТЕНИЕ С ФИЛЬТРОМ ============
+def _rows_to_frame(rows: List[Tuple[Any, ...]], index: List[int], width: int) -> pd.DataFrame:
+    data = [row + (None,) * (width - len(row)) for row in rows]
+    return pd.DataFrame(data, index=index, columns=range(width)).infer_objects()
+
+
+def read_spec_rows(file_path: str,
+                   row_filter: Optional[Callable[[str], bool]] = is_radiator_row_loose,
+                   header_rows: int = HEADER_WINDOW_ROWS,
+                   sheet_index: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Потоковое чтение листа спецификации: в память попадают только строки,
+    прошедшие фильтр по тексту строки, и первые header_rows строк (окно заголовка).
+    :param row_filter: Фильтр по тексту строки (None - все строки)
+    :param sheet_index: Номер листа с 0
+    :return: (отобранные строки, окно заголовка); индекс - номер строки листа с 0,
+             столбцы - номера столбцов листа, как у pd.read_excel(header=None)
+    """
+    matched, matched_index = [], []
+    header, header_index = [], []
+    width = 0
+    for row_idx, row in enumerate(iter_sheet_rows(file_path, sheet_index)):
+        # Пустые ячейки в конце строки (размер листа openpyxl/xlrd часто больше таблицы)
+        row = _strip_trailing_empty(row)
+        if not row:
+            continue
+        if row_idx < header_rows:
+            header.append(row)
+            header_index.append(row_idx)
+            width = max(width, len(row))
+        if row_filter is None or row_filter(row_text(row)):
+            matched.append(row)
+            matched_index.append(row_idx)
+            width = max(width, len(row))
+    return _rows_to_frame(matched, matched_index, width), _rows_to_frame(header, header_index, width)
+
+
+# ============ ВСЕ ЛИСТЫ КНИГИ ============
+def _scan_sheet(file_path: str, sheet_index: int, sheet_name: str,
+                row_filter: Optional[Callable[[str], bool]], header_rows: int) -> Dict[str, Any]:
+    """Один лист для scan_sheets() (выполняется в рабочем процессе)"""
+    result = {'index': sheet_index, 'name': sheet_name, 'rows': None, 'header': None,
+              'count': 0, 'error': None}
+    try:
+        result['rows'], result['header'] = read_spec_rows(file_path, row_filter, header_rows, sheet_index)
+        result['count'] = len(result['rows'])
+    except ImportError:
+        raise
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def scan_sheets(file_path: str,
+                row_filter: Optional[Callable[[str], bool]] = is_radiator_row_loose,
+                header_rows: int = HEADER_WINDOW_ROWS,
+                workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Потоковое чтение всех листов книги с фильтром строк, листы читаются параллельно в отдельных процессах
+    (разбор xlsx/ods упирается в процессор, потоки не ускоряют). Лист с ошибкой чтения не прерывает остальные
+    :param workers: Число процессов (None - по числу листов, не больше числа ядер,
+                    для книг меньше PARALLEL_SCAN_MIN_BYTES - без процессов; 1 - без процессов)
+    :return: Листы по убыванию числа отобранных строк:
+             [{'index', 'name', 'rows', 'header', 'count', 'error'}], rows/header - как у read_spec_rows()
+    """
+    names = list_sheet_names(file_path)
+    if workers is None and os.path.getsize(file_path) < PARALLEL_SCAN_MIN_BYTES:
+        # Небольшая книга читается быстрее, чем запускаются процессы
+        workers = 1
+    workers = min(len(names), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        results = [_scan_sheet(file_path, index, name, row_filter, header_rows)
+                   for index, name in enumerate(names)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_scan_sheet, file_path, index, name, row_filter, header_rows)
+                       for index, name in enumerate(names)]
+            results = [future.result() for future in futures]
+    for result in results:
+        if result['error']:
+            print(f"[ERROR] Лист '{result['name']}' не прочитан: {result['error']}")
+    # При равном числе строк сохраняется порядок листов в книге
+    return sorted(results, key=lambda result: -result['count'])
+
+
+def select_sheets(scans: List[Dict[str, Any]], min_share: float = SHEET_MIN_SHARE) -> List[Dict[str, Any]]:
+    """
+    Автоматический выбор листов из scan_sheets(): листы с отобранными строками, на которых их
+    не меньше min_share от лучшего листа (титульные листы и сводки с парой совпадений отбрасываются)
+    """
+    best = scans[0]['count'] if scans else 0
+    if best == 0:
+        return []
+    return [scan for scan in scans if scan['count'] > 0 and scan['count'] >= best * min_share]
+
+
+def sheet_layout(scan: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """
+    Структура столбцов листа из scan_sheets(): текст найденной строки заголовка по позициям и ширина листа.
+    Листы объединяются, только если структуры совпадают - иначе один выбор столбцов наименования
+    и количества не подходит ко всем листам. None - заголовок не найден, структуру не сравнить
+    """
+    header = scan['header']
+    if header is None or header.empty:
+        return None
+    header_row = detect_spec_columns(header)['header_row']
+    if header_row is None:
+        return None
+    cells = tuple('' if cell is None or cell != cell else ' '.join(str(cell).lower().split())
+                  for cell in header.loc[header_row])
+    return cells + (scan['rows'].shape[1],)
@@ -25,7 +25,6 @@ from openpyxl import Workbook  # Создание новых Excel файлов
 from openpyxl.styles import Font, Alignment, Border, Side  # Форматирование Excel (шрифты, выравнивание, границы)
 # ВНЕШНИЕ БИБЛИОТЕКИ
 import pyperclip  # Работа с буфером обмена (копирование/вставка)
-import chardet  # Определение кодировки текстовых файлов
 import sqlite3  # Работа с SQLite базами данных (пока не используется, зарезервировано)
 # СОБСТВЕННЫЕ МОДУЛИ ПРИЛОЖЕНИЯ
 # Менеджер таблицы соответствий - интерфейс сопоставления радиаторов
@@ -39,6 +38,10 @@ from parsers import RadiatorNameParser
 # Менеджер шаблонов - управление базой знаний для автоматического распознавания
 from pattern_manager import PatternManager
 from pdf_page_selector import PdfPageSelector
+# Потоковое чтение таблиц спецификаций, поиск столбцов и грубый фильтр строк радиаторов
+from spec_readers import scan_sheets, select_sheets, sheet_layout, detect_text_format, SUPPORTED_EXTENSIONS, TEXT_EXTENSIONS
+from spec_columns import detect_spec_columns
+from radiator_filter import is_radiator_row_loose, radiator_row_mask
 
 from spec_generator import SpecGenerator
 # ВЕБ-БРАУЗЕР
@@ -68,6 +71,10 @@ class RadiatorApp:
         self._modal_window_open = False
         # --- ДОБАВЛЯЕМ КОНСТАНТУ ПОРОГА СТРАНИЦ ---
         self.PDF_PAGE_THRESHOLD = 10  # Если PDF больше 10 страниц - показывать диалог выбора
+        self.PDF_PAGE_TIME_BUDGET = 60  # Лимит времени на одну страницу PDF (сек), страница сверх лимита пропускается
+        self.PDF_BOUNDED_MEMORY_PAGES = 100  # С этого числа страниц PDF парсится в режиме ограниченной памяти
+        self.PDF_MEMORY_CEILING_MB = 1500  # Лимит памяти процесса при парсинге PDF (МБ)
+        self.PDF_DEBUG = False  # Отладочный режим парсера PDF: DEBUG-сообщения и подробный анализ таблиц
                 
         try:
             icon_path = self.resource_path("icon.ico")
@@ -234,36 +241,28 @@ class RadiatorApp:
 
         result_queue = queue.Queue()
         progress = None
-
-        def get_page_count(pdf_path):
-            """Вспомогательная функция для получения количества страниц"""
-            try:
-                import PyPDF2
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    return len(pdf_reader.pages)
-            except ImportError:
-                try:
-                    import pdfplumber
-                    with pdfplumber.open(pdf_path) as pdf:
-                        return len(pdf.pages)
-                except ImportError:
-                    return None
+        # Отмена парсинга кнопкой "Отмена" в окне прогресса
+        from pdf_parser import CancellationToken, ParseCancelled
+        cancel_token = CancellationToken()
+        # Один открытый документ на подсчёт страниц, окно выбора страниц и парсинг
+        from pdf_document import PDFDocumentSession
+        session = PDFDocumentSession(file_path)
         
         def pdf_worker():
             nonlocal progress
             try:
                 from pdf_parser import PDFParser
                 
-                # ШАГ 1: Получаем количество страниц
-                total_pages = get_page_count(file_path)
+                # ШАГ 1: Получаем количество страниц (из каталога PDF, без разбора страниц)
+                total_pages = session.page_count
                 
                 # Если не удалось получить количество страниц, продолжаем как раньше
                 if total_pages is None:
                     print("[INFO] Не удалось определить количество страниц, продолжаем стандартную обработку")
                     pages_to_process = None
                     # Создаем прогресс-бар
-                    progress = self.ProgressDialog(self.root, "Загрузка PDF", "Начинаю анализ PDF-файла...")
+                    progress = self.ProgressDialog(self.root, "Загрузка PDF", "Начинаю анализ PDF-файла...",
+                                                   on_cancel=cancel_token.cancel)
                 else:
                     print(f"[INFO] PDF содержит {total_pages} страниц")
                     
@@ -274,8 +273,10 @@ class RadiatorApp:
                             parent=self.root,
                             total_pages=total_pages,
                             pdf_path=file_path,
-                            title="Выбор страниц PDF"
-                            # initial_selection пустой - ничего не выбрано по умолчанию
+                            title="Выбор страниц PDF",
+                            session=session
+                            # initial_selection не задан - вероятные страницы спецификаций выбираются
+                            # фоновой оценкой, пока пользователь сам не изменит выбор
                         )
                         pages_to_process = selector.show()
                         
@@ -288,12 +289,14 @@ class RadiatorApp:
                         
                         # Создаем прогресс-бар для основной обработки
                         progress = self.ProgressDialog(self.root, "Обработка PDF", 
-                                                    f"Обработка {len(pages_to_process)} страниц...")
+                                                    f"Обработка {len(pages_to_process)} страниц...",
+                                                    on_cancel=cancel_token.cancel)
                     else:
                         # Обрабатываем все страницы (мало страниц)
                         pages_to_process = None
                         # Создаем прогресс-бар
-                        progress = self.ProgressDialog(self.root, "Загрузка PDF", "Начинаю анализ PDF-файла...")
+                        progress = self.ProgressDialog(self.root, "Загрузка PDF", "Начинаю анализ PDF-файла...",
+                                                   on_cancel=cancel_token.cancel)
                 
                 # Обновляем прогресс
                 def update_progress(current_page: int, total_pages: int):
@@ -302,61 +305,127 @@ class RadiatorApp:
                     self.root.after(0, lambda: progress.update(percent, msg) if progress and progress.dialog.winfo_exists() else None)
 
                 # ШАГ 2: Парсинг PDF с учетом выбранных страниц
-                parser = PDFParser(progress_callback=update_progress)
+                # Большие документы - в режиме ограниченной памяти (кэши страниц сбрасываются, таблицы на диске)
+                bounded_memory = bool(total_pages and total_pages >= self.PDF_BOUNDED_MEMORY_PAGES)
+                parser = PDFParser(progress_callback=update_progress, cancel_token=cancel_token,
+                                   page_time_budget=self.PDF_PAGE_TIME_BUDGET,
+                                   bounded_memory=bounded_memory,
+                                   memory_ceiling_mb=self.PDF_MEMORY_CEILING_MB,
+                                   debug_mode=self.PDF_DEBUG)
                 
-                # Передаем страницы для обработки в парсер
-                if pages_to_process:
-                    df = parser.parse_to_dataframe(file_path, pages=pages_to_process)
-                else:
-                    df = parser.parse_to_dataframe(file_path)
-                    
-                result_queue.put(("success", df, file_path))
+                # Большие документы обрабатываем в нескольких процессах (одно ядро оставляем GUI)
+                workers = max(1, min(4, (os.cpu_count() or 1) - 1))
+                
+                # Потоковый парсинг: таблицы готовых страниц сразу уходят в GUI для предпросмотра
+                # столбцов, итоговый DataFrame - последним сообщением
+                for event in parser.iter_parse(file_path, pages=pages_to_process or None,
+                                               workers=workers, extract_radiators=False,
+                                               session=session):
+                    if event['page'] is None:
+                        if event['pages_over_budget']:
+                            print(f"[WARN] Пропущены страницы (превышен лимит {self.PDF_PAGE_TIME_BUDGET} с): "
+                                  f"{event['pages_over_budget']}")
+                        result_queue.put(("success", event['result'], file_path))
+                    elif event['table'] is not None:
+                        result_queue.put(("page", event['table'], file_path))
                 
+            except ParseCancelled:
+                result_queue.put(("cancelled", None, None))
             except Exception as e:
                 result_queue.put(("error", str(e), traceback.format_exc()))
             finally:
+                session.close()
                 # Закрываем прогресс-бар в конце
                 if progress and hasattr(progress, 'dialog') and progress.dialog.winfo_exists():
                     progress.close()
 
-        # Остальная часть метода остается БЕЗ ИЗМЕНЕНИЙ
+        # Состояние потоковой загрузки: строки радиаторов готовых страниц (каждая таблица фильтруется
+        # один раз при поступлении), столбцы, выбранные на предпросмотре (по меткам исходного DataFrame),
+        # открыт ли выбор столбцов, итог, пришедший во время выбора
+        stream = {'radiators': [], 'columns': None, 'selector_open': False, 'final': None}
+
+        def filter_radiator_rows(df):
+            """🔥 ФИЛЬТРАЦИЯ: оставляем только радиаторы (метки столбцов исходные)"""
+            return df[radiator_row_mask(df)]
+
+        def preview_columns(file_path_):
+            """Выбор столбцов по первым найденным радиаторам, пока остальные страницы ещё парсятся"""
+            preview = pd.concat(stream['radiators'], ignore_index=True, sort=False)
+            labels = list(preview.columns)
+            preview.columns = [f"Col_{i}" for i in range(len(preview.columns))]
+            stream['selector_open'] = True
+            self.last_loaded_foreign_spec_path = file_path_
+            name_col_idx, qty_col_idx = self.select_columns_interactive(preview, file_path_)
+            stream['selector_open'] = False
+            if name_col_idx is None or qty_col_idx is None:
+                # Выбор столбцов отменён - останавливаем парсинг остальных страниц, его итог не нужен
+                stream['columns'] = "cancelled"
+                cancel_token.cancel()
+                if progress and progress.dialog.winfo_exists():
+                    progress.close()
+            else:
+                stream['columns'] = (labels[name_col_idx], labels[qty_col_idx])
+            # Итог пришёл, пока открыт выбор столбцов - обрабатываем сразу
+            if stream['final'] is not None:
+                finish(*stream['final'])
+
+        def finish(df, file_path_):
+            """Итоговый DataFrame: фильтрация радиаторов и таблица соответствия"""
+            if stream['columns'] == "cancelled":
+                return
+            if df.empty:
+                messagebox.showwarning("PDF", "PDF-файл не содержит данных или не удалось распарсить.")
+                return
+
+            df_filtered = filter_radiator_rows(df)
+            if df_filtered.empty:
+                messagebox.showwarning("Предупреждение", "В PDF не найдено строк, похожих на радиаторы.")
+                return
+
+            # Столбцы, выбранные на предпросмотре, ищем в итоговом DataFrame по меткам
+            labels = list(df_filtered.columns)
+            name_col_idx = qty_col_idx = None
+            if stream['columns'] is not None:
+                name_label, qty_label = stream['columns']
+                if name_label in labels and qty_label in labels:
+                    name_col_idx, qty_col_idx = labels.index(name_label), labels.index(qty_label)
+            df_filtered.columns = [f"Col_{i}" for i in range(len(df_filtered.columns))]
+
+            self.last_loaded_foreign_spec_path = file_path_
+            if name_col_idx is None or qty_col_idx is None:
+                name_col_idx, qty_col_idx = self.select_columns_interactive(df_filtered, file_path_)
+                if name_col_idx is None or qty_col_idx is None:
+                    return
+
+            self._process_parsed_pdf_data(df_filtered, name_col_idx, qty_col_idx)
+
         def check_result():
             try:
                 status, data, extra = result_queue.get_nowait()
+
+                if status == "page":
+                    # Страница готова - продолжаем опрос (в т.ч. пока открыт выбор столбцов)
+                    self.root.after(100, check_result)
+                    radiators = filter_radiator_rows(data)
+                    if radiators.empty:
+                        return
+                    stream['radiators'].append(radiators)
+                    if stream['columns'] is None and not stream['selector_open']:
+                        preview_columns(extra)
+                    return
                 
                 # Закрываем прогресс-бар если он еще открыт
                 if progress and hasattr(progress, 'dialog') and progress.dialog.winfo_exists():
                     progress.close()
 
                 if status == "success":
-                    df = data
-                    if df.empty:
-                        messagebox.showwarning("PDF", "PDF-файл не содержит данных или не удалось распарсить.")
-                        return
-
-                    # 🔥 ФИЛЬТРАЦИЯ: оставляем только радиаторы
-                    filtered_rows = []
-                    for idx, row in df.iterrows():
-                        full_text = ' '.join(str(cell) for cell in row if pd.notna(cell))
-                        if self._is_radiator_row_loose(full_text):
-                            filtered_rows.append(row)
-
-                    if not filtered_rows:
-                        messagebox.showwarning("Предупреждение", "В PDF не найдено строк, похожих на радиаторы.")
-                        return
-
-                    df_filtered = pd.DataFrame(filtered_rows, columns=df.columns)
-                    df_filtered.columns = [f"Col_{i}" for i in range(len(df_filtered.columns))]
-
-                    self.last_loaded_foreign_spec_path = extra
-                    name_col_idx, qty_col_idx = self.select_columns_interactive(df_filtered, extra)
-                    if name_col_idx is None or qty_col_idx is None:
+                    if stream['selector_open']:
+                        stream['final'] = (data, extra)
                         return
-
-                    self._process_parsed_pdf_data(df_filtered, name_col_idx, qty_col_idx)
+                    finish(data, extra)
                 
                 elif status == "cancelled":
-                    # Пользователь отменил выбор страниц
+                    # Пользователь отменил выбор страниц или парсинг
                     print("[INFO] Обработка PDF отменена пользователем")
                     return
 
@@ -895,37 +964,26 @@ class RadiatorApp:
 
             df = pd.read_excel(file_path, engine=engine, header=None)
 
-            art_col = None
-            qty_col = None
-            header_row = 0
-            for i, row in df.iterrows():
-                for j, cell in enumerate(row):
-                    cell_str = str(cell).strip().lower()
-                    if not art_col and any(kw in cell_str for kw in ['артикул', 'art', 'код']):
-                        art_col = j
-                    if not qty_col and any(kw in cell_str for kw in ['кол-во', 'количество', 'qty']):
-                        qty_col = j
-                if art_col is not None and qty_col is not None:
-                    header_row = i
-                    break
+            # Заголовок и столбцы ищутся в первых строках листа (spec_columns), данные читаются столбцами
+            detected = detect_spec_columns(df, roles=('art', 'qty'))
+            art_col = detected['art_col']
+            qty_col = detected['qty_col']
+            print(f"[INFO] Столбцы спецификации: артикул={art_col}, кол-во={qty_col}, "
+                  f"уверенность={detected['confidence']}")
 
             if art_col is None:
                 art_col = 0
             if qty_col is None:
                 qty_col = 1 if len(df.columns) > 1 else 0
 
-            data_rows = []
-            for i in range(header_row + 1, len(df)):
-                art = str(df.iloc[i, art_col]).strip()
-                qty = df.iloc[i, qty_col]
-                if not art or art.lower() == 'итого':
-                    continue
-                try:
-                    qty = float(qty)
-                    if qty > 0:
-                        data_rows.append((art, int(qty)))
-                except (ValueError, TypeError):
-                    continue
+            start = 0
+            if detected['header_row'] is not None:
+                start = df.index.get_loc(detected['header_row']) + 1
+            arts = df.iloc[start:, art_col]
+            arts = arts.astype(object).where(arts.notna(), '').astype(str).str.strip()
+            qtys = pd.to_numeric(df.iloc[start:, qty_col], errors='coerce')
+            keep = (arts != '') & (arts.str.lower() != 'итого') & (qtys > 0) & (qtys < float('inf'))
+            data_rows = list(zip(arts[keep], qtys[keep].astype(int)))
 
             self.entry_values.clear()
             total_loaded = 0
@@ -1278,22 +1336,15 @@ class RadiatorApp:
         if not file_path:
             return
         try:
-            encodings = ['utf-8-sig', 'cp1251', 'windows-1251', 'iso-8859-1']
-            df = None
-            for encoding in encodings:
-                try:
-                    df = pd.read_csv(file_path, sep=';', encoding=encoding, header=None)
-                    has_headers = not df.iloc[0, 0].replace('.', '').isdigit()
-                    if has_headers:
-                        df = pd.read_csv(file_path, sep=';', encoding=encoding, header=0)
-                    else:
-                        df.columns = ['Артикул', 'Кол-во']
-                        df = df[df.iloc[:, 0].notna()]
-                    break
-                except UnicodeDecodeError:
-                    continue
-            if df is None:
-                raise ValueError("Не удалось определить кодировку")
+            # Кодировка и разделитель - по первым 64 КБ файла, разбор один раз C-движком pandas
+            encoding, sep = detect_text_format(file_path)
+            read_options = dict(sep=sep, encoding=encoding, encoding_errors='replace', dtype=str, engine='c')
+            first_row = pd.read_csv(file_path, header=None, nrows=1, **read_options)
+            has_headers = not str(first_row.iloc[0, 0]).replace('.', '').isdigit()
+            df = pd.read_csv(file_path, header=0 if has_headers else None, **read_options)
+            if not has_headers:
+                df.columns = ['Артикул', 'Кол-во']
+                df = df[df.iloc[:, 0].notna()]
 
             art_col = None
             qty_col = None
@@ -1374,88 +1425,83 @@ class RadiatorApp:
         try:
             _, file_extension = os.path.splitext(file_path)
             file_extension = file_extension.lower()
+            if file_extension not in SUPPORTED_EXTENSIONS:
+                messagebox.showerror("Ошибка",
+                    f"Неподдерживаемый формат файла: {file_extension}\n"
+                    "Поддерживаемые форматы: .xlsx, .xls, .xlsm, .ods, .csv, .tsv, .txt")
+                return
 
-            # 1. Определяем формат и читаем файл
-            if file_extension in ['.xlsx', '.xls', '.xlsm']:
-                # Excel файлы
-                if file_extension == '.xlsx' or file_extension == '.xlsm':
-                    engine = 'openpyxl'
-                else:  # .xls
-                    try:
-                        import xlrd
-                        engine = 'xlrd'
-                    except ImportError:
-                        messagebox.showerror("Ошибка",
-                            "Для чтения .xls файлов требуется библиотека xlrd.\n"
-                            "Установите её командой: pip install xlrd")
-                        return
-                df = pd.read_excel(file_path, header=None, engine=engine)
-            elif file_extension == '.ods':
-                # OpenDocument Format (OpenOffice/LibreOffice)
-                try:
-                    import odf
-                    df = pd.read_excel(file_path, header=None, engine='odf')
-                except ImportError:
-                    messagebox.showerror("Ошибка",
-                        "Для чтения .ods файлов требуется библиотека odfpy.\n"
-                        "Установите её командой: pip install odfpy")
-                    return
-            elif file_extension in ['.csv', '.tsv', '.txt']:
-                # Текстовые файлы с разделителями
-                try:
-                    # Автоопределение кодировки
-                    with open(file_path, 'rb') as f:
-                        raw_data = f.read()
-                    result = chardet.detect(raw_data)
-                    encoding = result['encoding'] if result['encoding'] else 'utf-8'
-
-                    # Автоопределение разделителя
-                    with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                        first_line = f.readline()
-                    if '\t' in first_line:
-                        sep = '\t'  # TSV
-                    elif ';' in first_line:
-                        sep = ';'   # CSV с точкой с запятой
-                    elif ',' in first_line:
-                        sep = ','   # CSV с запятой
-                    else:
-                        sep = None  # Попытка автоматического определения
-
-                    df = pd.read_csv(file_path, sep=sep, header=None, encoding=encoding,
-                                     on_bad_lines='skip', engine='python')
-                except Exception as e:
+            # 1. Потоковое чтение всех листов книги (листы параллельно): в память попадают только строки,
+            # похожие на радиаторы (🔥 ФИЛЬТРАЦИЯ при чтении), и первые строки листов для поиска заголовка
+            try:
+                scans = scan_sheets(file_path)
+            except ImportError:
+                messagebox.showerror("Ошибка",
+                    "Для чтения .xls файлов требуется библиотека xlrd.\n"
+                    "Установите её командой: pip install xlrd")
+                return
+            except Exception as e:
+                if file_extension in TEXT_EXTENSIONS:
                     messagebox.showerror("Ошибка",
                         f"Не удалось прочитать текстовый файл:\n{str(e)}\n"
                         "Попробуйте сохранить файл в формате Excel (.xlsx) или CSV с разделителем ';'")
                     return
-            else:
-                messagebox.showerror("Ошибка",
-                    f"Неподдерживаемый формат файла: {file_extension}\n"
-                    "Поддерживаемые форматы: .xlsx, .xls, .xlsm, .ods, .csv, .tsv, .txt")
-                return
+                raise
 
-            # 🔥 Сохраняем исходные заголовки, если они есть (первая строка с текстом)
+            # 2. Листы с радиаторами - по убыванию числа строк; несколько листов объединяются по согласию
+            chosen = select_sheets(scans)
+            if not chosen:
+                messagebox.showwarning("Предупреждение", "В файле не найдено строк, похожих на радиаторы.")
+                return
+            # Объединяются только листы с той же строкой заголовка и теми же позициями столбцов, что у лучшего:
+            # столбцы наименования и количества выбираются один раз на всю таблицу
+            best_layout = sheet_layout(chosen[0])
+            same_layout = [scan for scan in chosen
+                           if scan is chosen[0] or (best_layout is not None and sheet_layout(scan) == best_layout)]
+            other_sheets = [scan for scan in chosen if scan not in same_layout]
+            other_note = ""
+            if other_sheets:
+                other_note = (f"\n\nЛисты с другой структурой столбцов не объединяются, загрузите их отдельно: "
+                              f"{', '.join(scan['name'] for scan in other_sheets)}")
+            if len(same_layout) > 1:
+                sheet_list = "\n".join(f"• {scan['name']}: {scan['count']} строк" for scan in same_layout)
+                if messagebox.askyesno("Несколько листов",
+                        f"Радиаторы найдены на листах с одинаковой структурой:\n{sheet_list}\n\n"
+                        f"Объединить эти листы в одну таблицу соответствия?\n"
+                        f"(Нет - только лист '{chosen[0]['name']}'){other_note}"):
+                    chosen = same_layout
+                else:
+                    chosen = chosen[:1]
+            else:
+                if other_sheets:
+                    messagebox.showinfo("Несколько листов",
+                        f"Загружается лист '{chosen[0]['name']}' ({chosen[0]['count']} строк).{other_note}")
+                chosen = chosen[:1]
+            merged = len(chosen) > 1
+            print(f"[INFO] Листы спецификации: {', '.join(scan['name'] for scan in chosen)}")
+
+            frames, source_sheets = [], []
             original_headers = None
-            if not df.empty:
-                first_row = df.iloc[0].astype(str).str.lower()
-                if any('наименование' in str(cell) or 'колич' in str(cell) for cell in first_row):
-                    original_headers = df.iloc[0].copy()
-                    df = df.iloc[1:].reset_index(drop=True)
-
-            # 🔥 ФИЛЬТРАЦИЯ: оставляем только строки с радиаторами
-            filtered_rows = []
-            for idx, row in df.iterrows():
-                full_text = ' '.join(str(cell) for cell in row if pd.notna(cell))
-                if self._is_radiator_row_loose(full_text):
-                    filtered_rows.append(row)
-            if not filtered_rows:
+            # Строки объединяются в порядке листов книги, заголовки берутся с лучшего листа
+            for scan in sorted(chosen, key=lambda scan: scan['index']):
+                sheet_rows, header_window = scan['rows'], scan['header']
+                # 🔥 Сохраняем исходные заголовки, если они есть (первая строка с текстом)
+                if not header_window.empty:
+                    first_row = header_window.iloc[0].astype(str).str.lower()
+                    if any('наименование' in str(cell) or 'колич' in str(cell) for cell in first_row):
+                        if scan is chosen[0]:
+                            original_headers = header_window.iloc[0].copy()
+                        sheet_rows = sheet_rows.drop(index=header_window.index[0], errors='ignore')
+                frames.append(sheet_rows)
+                source_sheets.extend([scan['name']] * len(sheet_rows))
+            df_filtered = pd.concat(frames, ignore_index=True) if merged else frames[0].reset_index(drop=True)
+
+            if df_filtered.empty:
                 messagebox.showwarning("Предупреждение", "В файле не найдено строк, похожих на радиаторы.")
                 return
 
-            df_filtered = pd.DataFrame(filtered_rows, columns=df.columns)
-
-            # 🔥 Восстанавливаем заголовки, если были
-            if original_headers is not None:
+            # 🔥 Восстанавливаем заголовки, если были (у листов разной ширины остаются номера столбцов)
+            if original_headers is not None and len(original_headers) == len(df_filtered.columns):
                 df_filtered.columns = original_headers
 
             # - ДАЛЕЕ — обычный выбор столбцов и обработка -
@@ -1520,13 +1566,17 @@ class RadiatorApp:
                         if meteor_art:
                             source = "Автоматический подбор (распознано)"
 
-                data_for_table.append({
+                row_data = {
                     "Наименование": original_name,
                     "Кол-во": qty,
                     "Артикул METEOR": meteor_art if meteor_art else "",
                     "Наименование METEOR": meteor_name if meteor_name else "",
                     "Источник": source
-                })
+                }
+                # При объединении листов - лист, с которого взята строка
+                if merged:
+                    row_data["Лист"] = source_sheets[i]
+                data_for_table.append(row_data)
 
             correspondence_df = pd.DataFrame(data_for_table)
             if correspondence_df.empty:
@@ -1575,32 +1625,20 @@ class RadiatorApp:
         self.show_correspondence_table(df)
 
     def detect_columns(self, df):
-        """Определяет столбцы с наименованием и количеством"""
-        name_col = None
-        qty_col = None
-        # Ищем столбцы по возможным названиям
-        for col in df.columns:
-            col_lower = str(col).lower()
-            if 'наименование' in col_lower or 'art' in col_lower or 'код' in col_lower:
-                name_col = col
-            elif 'кол-во' in col_lower or 'количество' in col_lower or 'qty' in col_lower:
-                qty_col = col
-        # Если не нашли стандартные названия - анализируем содержимое
-        if name_col is None or qty_col is None:
-            for col in df.columns:
-                # Проверяем, есть ли в столбце данные, похожие на радиаторы
-                sample_values = df[col].dropna().head(5).astype(str)
-                if any('радиатор' in v.lower() or 'radiator' in v.lower() for v in sample_values):
-                    name_col = col
-                # Проверяем на числовые значения для количества
-                elif all(v.replace('.', '').isdigit() for v in sample_values):
-                    qty_col = col
-        # Если после анализа все равно не определили - берем первые два столбца
+        """
+        Определяет столбцы с наименованием и количеством (по заголовкам и первым строкам данных).
+        В приложении не вызывается, оставлен для совместимости
+        """
+        if len(df.columns) == 0:
+            return None, None
+        detected = detect_spec_columns(df, use_labels=True, roles=('name', 'qty'))
+        name_col, qty_col = detected['name_col'], detected['qty_col']
+        # Если не определили - берем первые два столбца
         if name_col is None:
-            name_col = df.columns[0]
+            name_col = 0 if qty_col != 0 else 1 % len(df.columns)
         if qty_col is None and len(df.columns) > 1:
-            qty_col = df.columns[1]
-        return name_col, qty_col
+            qty_col = 1 if name_col != 1 else 0
+        return df.columns[name_col], (df.columns[qty_col] if qty_col is not None else None)
 
     def is_radiator(self, name):
         """Проверяет, является ли строка описанием радиатора"""
@@ -3217,17 +3255,7 @@ class RadiatorApp:
 
     def _is_radiator_row_loose(self, row_text: str) -> bool:
         """Упрощённая проверка: содержит ли строка признаки радиатора (даже частично)."""
-        if not row_text or not isinstance(row_text, str):
-            return False
-        text_lower = row_text.lower()
-        # Ключевые слова радиаторов
-        radiator_keywords = [
-            'радиатор', 'radiator', 'панель', 'panel', 'отопительный', 'heating',
-            'k-profil', 'vk-profil', 'compact', 'ventil', 'prado', 'royal', 'purmo',
-            'тип', 'type', 'fto', 'ftv', 'ftk', 'u22', 'c22', 'u11', 'c11',
-            'нижнее подключение', 'боковое подключение', 'universal', 'classic'
-        ]
-        return any(kw in text_lower for kw in radiator_keywords)
+        return is_radiator_row_loose(row_text)
 
     def parse_radiator_name(self, name):
         """Парсит название радиатора и извлекает параметры (улучшенная версия)"""
@@ -3934,53 +3962,11 @@ class RadiatorApp:
 
     def find_quantity_column(self, df: pd.DataFrame) -> Optional[int]:
         """
-        Улучшенный поиск столбца с количеством.
-        Ищет столбец, где есть хотя бы 3 подряд идущих числовых значения.
-        Не ограничивается первыми 5 строками — проверяет ВСЁ.
-        Работает даже если данные начинаются со 27-й строки.
+        Поиск столбца с количеством: заголовок и доля чисел-количеств (spec_columns.detect_spec_columns).
+        Проверяется ВЕСЬ лист, а не первые строки - работает, даже если данные начинаются с 27-й строки.
+        Возвращает позицию столбца или None. В приложении не вызывается, оставлен для совместимости
         """
-        for col_idx in range(len(df.columns)):
-            numeric_count = 0
-            consecutive_numeric = 0
-            max_consecutive = 0
-            # Проверяем ВСЕ непустые значения в столбце
-            sample_values = df.iloc[:, col_idx].dropna().astype(str)
-            for val in sample_values:
-                val_clean = val.strip()
-                if not val_clean:
-                    consecutive_numeric = 0
-                    continue
-                # Убираем всё, кроме цифр, точек, запятых, слешей
-                cleaned = re.sub(r'[^\d.,/]', '', val_clean)
-                if not cleaned:
-                    consecutive_numeric = 0
-                    continue
-                try:
-                    # Обрабатываем форматы: 24, 24.0, 24/12,07, 24,07
-                    if '/' in cleaned:
-                        parts = cleaned.split('/')
-                        if len(parts) > 0 and all(p.replace('.', '').isdigit() for p in parts):
-                            float(parts[0])
-                            numeric_count += 1
-                            consecutive_numeric += 1
-                            if consecutive_numeric > max_consecutive:
-                                max_consecutive = consecutive_numeric
-                        else:
-                            consecutive_numeric = 0
-                    else:
-                        cleaned_float = cleaned.replace(',', '.')
-                        float(cleaned_float)
-                        numeric_count += 1
-                        consecutive_numeric += 1
-                        if consecutive_numeric > max_consecutive:
-                            max_consecutive = consecutive_numeric
-                except ValueError:
-                    consecutive_numeric = 0
-                    continue
-            # Если найдено хотя бы 3 подряд числа — это нужный столбец
-            if max_consecutive >= 3:
-                return col_idx
-        return None
+        return detect_spec_columns(df, scan_rows=len(df), roles=('name', 'qty'))['qty_col']
 
     def parse_quantity(self, value):
         """Преобразует значение в целое число (количество радиаторов).
@@ -4267,7 +4253,12 @@ class RadiatorApp:
                 self.totals_volume_label.config(text=f"Общий объём: {total_volume:.5f} м³") 
     
     class ProgressDialog:
-        def __init__(self, parent, title="Загрузка...", message="Пожалуйста, подождите..."):
+        def __init__(self, parent, title="Загрузка...", message="Пожалуйста, подождите...", on_cancel=None):
+            """
+            :param on_cancel: Функция отмены операции. Если задана - показывается кнопка "Отмена",
+                              закрытие окна крестиком тоже отменяет операцию
+            """
+            self.on_cancel = on_cancel
             self.dialog = tk.Toplevel(parent)
             self.dialog.title(title)
             self.dialog.resizable(False, False)
@@ -4279,7 +4270,8 @@ class RadiatorApp:
             screen_height = parent.winfo_screenheight()
             x = (screen_width - 400) // 2
             y = (screen_height - 120) // 2
-            self.dialog.geometry(f"400x120+{x}+{y}")
+            height = 160 if on_cancel else 120
+            self.dialog.geometry(f"400x{height}+{x}+{y - (height - 120) // 2}")
 
             self.label = ttk.Label(self.dialog, text=message, wraplength=380)
             self.label.pack(pady=10)
@@ -4287,18 +4279,39 @@ class RadiatorApp:
             self.progress = ttk.Progressbar(self.dialog, mode='determinate', length=360)
             self.progress.pack(padx=20, pady=(0, 10))
 
-            self.dialog.protocol("WM_DELETE_WINDOW", lambda: None)
+            self.cancel_button = None
+            self.cancelled = False
+            if on_cancel:
+                self.cancel_button = ttk.Button(self.dialog, text="Отмена", command=self.cancel)
+                self.cancel_button.pack(pady=(0, 10))
+                self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+            else:
+                self.dialog.protocol("WM_DELETE_WINDOW", lambda: None)
             self.dialog.update_idletasks()
 
         def update(self, percent: int, message: str):
             self.progress['value'] = percent
-            self.label.config(text=message)
+            if not self.cancelled:
+                self.label.config(text=message)
             self.dialog.update_idletasks()
 
+        def cancel(self):
+            """Запрос отмены: операция остановится после текущей страницы"""
+            if self.cancelled:
+                return
+            self.cancelled = True
+            self.label.config(text="Отмена... завершается текущая страница")
+            if self.cancel_button:
+                self.cancel_button.config(state='disabled')
+            self.on_cancel()
+
         def close(self):
             self.dialog.destroy()
 
 if __name__ == "__main__":
+    # Нужно для рабочих процессов параллельного парсинга PDF в собранном EXE
+    import multiprocessing
+    multiprocessing.freeze_support()
 
     try:
         root = tk.Tk()